@@ -0,0 +1,325 @@
+"""Email delivery: pluggable transports, batching, retry with backoff and a disk spool"""
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional
+
+from config.storage import data_path
+from instrumentation import get_metrics
+from rate_limiter import PRIORITY_HIGH, get_limiter
+
+if TYPE_CHECKING:
+    import requests
+
+logger = logging.getLogger(__name__)
+
+RESEND_API_URL = 'https://api.resend.com'
+
+
+class DeliveryError(Exception):
+    """A send that will not succeed if retried (bad request, invalid recipient...)"""
+
+
+class TransientDeliveryError(DeliveryError):
+    """A send that may succeed if retried (rate limit, timeout, server error)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    """Return a Retry-After header in seconds, or None if absent or not numeric"""
+    try:
+        return max(float(value), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class EmailMessage(NamedTuple):
+    sender: str
+    to: List[str]
+    subject: str
+    html: str
+    text: Optional[str] = None
+
+    def to_params(self) -> Dict:
+        """Return the message as a Resend email object"""
+        params = {'from': self.sender, 'to': list(self.to), 'subject': self.subject, 'html': self.html}
+        if self.text:
+            params['text'] = self.text
+        return params
+
+    @classmethod
+    def from_params(cls, params: Dict) -> 'EmailMessage':
+        return cls(sender=params['from'], to=list(params['to']), subject=params['subject'],
+                   html=params['html'], text=params.get('text'))
+
+
+class Transport:
+    """Interface every delivery transport implements"""
+
+    # Largest number of messages send_batch accepts in one call
+    max_batch_size = 1
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[str]:
+        """Send messages and return their provider ids; raise DeliveryError on failure"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any connections held by the transport"""
+
+
+class ResendTransport(Transport):
+    """Resend HTTP API over a pooled session, using the batch endpoint for several messages"""
+
+    max_batch_size = 100
+
+    def __init__(self, api_key: str, timeout: float = 30.0, session: Optional['requests.Session'] = None):
+        import requests
+
+        if not api_key:
+            raise ValueError("RESEND_API_KEY environment variable not set")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {api_key}',
+            'Content-Type': 'application/json',
+        })
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[str]:
+        if len(messages) == 1:
+            payload = messages[0].to_params()
+            data = self._post('/emails', payload)
+            return [data.get('id', '')]
+        payload = [message.to_params() for message in messages]
+        data = self._post('/emails/batch', payload)
+        return [item.get('id', '') for item in data.get('data', [])]
+
+    def _post(self, path, payload):
+        import requests
+
+        body = json.dumps(payload, sort_keys=True)
+        # The same payload always gets the same key, so a retried request is never sent twice
+        headers = {'Idempotency-Key': hashlib.sha256(body.encode('utf-8')).hexdigest()}
+        limiter = get_limiter('resend')
+        limiter.acquire(priority=PRIORITY_HIGH)
+        try:
+            response = self.session.post(f'{RESEND_API_URL}{path}', data=body,
+                                         headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            # Connection, TLS, timeout and protocol errors may all clear up on a retry
+            raise TransientDeliveryError(f"Resend request failed: {str(e)}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            if response.status_code == 429:
+                # Hold back every other Resend request too, not just this batch's retry
+                limiter.penalize(retry_after)
+            raise TransientDeliveryError(
+                f"Resend returned {response.status_code}: {response.text[:200]}",
+                retry_after=retry_after
+            )
+        if response.status_code >= 400:
+            raise DeliveryError(f"Resend returned {response.status_code}: {response.text[:200]}")
+        if not response.content:
+            return {}
+        try:
+            return response.json()
+        except ValueError as e:
+            raise DeliveryError(f"Resend returned {response.status_code} with a body that is not JSON: "
+                                f"{response.text[:200]}") from e
+
+    def close(self):
+        self.session.close()
+
+
+class SmtpDebugTransport(Transport):
+    """
+    Send through a local SMTP debugging server, e.g.
+    `python -m aiosmtpd -n -l localhost:1025`, instead of a real provider.
+    """
+
+    max_batch_size = 100
+
+    def __init__(self, host: str = 'localhost', port: int = 1025):
+        self.host = host
+        self.port = port
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[str]:
+        import smtplib
+        from email.message import EmailMessage as MimeMessage
+
+        ids = []
+        try:
+            with smtplib.SMTP(self.host, self.port) as smtp:
+                for message in messages:
+                    mime = MimeMessage()
+                    mime['From'] = message.sender
+                    mime['To'] = ', '.join(message.to)
+                    mime['Subject'] = message.subject
+                    mime.set_content(message.text or '')
+                    mime.add_alternative(message.html, subtype='html')
+                    smtp.send_message(mime)
+                    ids.append(f'smtp-{len(ids)}')
+        except OSError as e:
+            raise TransientDeliveryError(f"SMTP debug server unavailable: {str(e)}")
+        return ids
+
+
+class RecordingTransport(Transport):
+    """In-process transport that records every message; `failures` makes the next sends fail"""
+
+    max_batch_size = 100
+
+    def __init__(self, failures: int = 0):
+        self.messages: List[EmailMessage] = []
+        self.batches = 0
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def send_batch(self, messages: List[EmailMessage]) -> List[str]:
+        with self._lock:
+            if self.failures > 0:
+                self.failures -= 1
+                raise TransientDeliveryError("Simulated transient failure")
+            start = len(self.messages)
+            self.messages.extend(messages)
+            self.batches += 1
+            return [f'recorded-{start + i}' for i in range(len(messages))]
+
+
+class DeliveryReport:
+    """Outcome of a delivery: ids of sent messages and how many were spooled"""
+
+    def __init__(self):
+        self.sent_ids: List[str] = []
+        self.spooled = 0
+
+    @property
+    def ok(self):
+        return self.spooled == 0
+
+    def __repr__(self):
+        return f"DeliveryReport(sent={len(self.sent_ids)}, spooled={self.spooled})"
+
+
+class DeliveryService:
+    """
+    Deliver messages through a transport in provider-sized batches.
+
+    Transient failures are retried with exponential backoff and full jitter;
+    batches that still fail (or fail permanently, or with an unexpected error)
+    are spooled to disk so they can be redelivered later without rerunning the
+    search pipeline, and the remaining batches are still sent.
+    """
+
+    def __init__(self, transport: Transport, spool_dir: Optional[str] = None, max_attempts: int = 4,
+                 base_delay: float = 1.0, max_delay: float = 30.0, sleep=time.sleep):
+        self.transport = transport
+        self.spool_dir = spool_dir or data_path('outbox')
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+    def send(self, messages: List[EmailMessage]) -> DeliveryReport:
+        """Send messages, spooling any batch that cannot be delivered"""
+        metrics = get_metrics()
+        report = DeliveryReport()
+        size = max(1, self.transport.max_batch_size)
+        for start in range(0, len(messages), size):
+            batch = messages[start:start + size]
+            try:
+                with metrics.stage('send_email'):
+                    report.sent_ids.extend(self._send_with_retry(batch))
+            except Exception as e:
+                logger.error(f"Delivery failed for {len(batch)} messages, spooling: {str(e)}",
+                             exc_info=not isinstance(e, DeliveryError))
+                for message in batch:
+                    self._spool(message, str(e))
+                report.spooled += len(batch)
+        metrics.increment('emails_sent', len(report.sent_ids))
+        if report.spooled:
+            metrics.increment('emails_spooled', report.spooled)
+        logger.info(f"Delivery finished: {report}")
+        return report
+
+    def _send_with_retry(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return self.transport.send_batch(batch)
+            except TransientDeliveryError as e:
+                if attempt == self.max_attempts:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                logger.warning(f"Transient delivery error (attempt {attempt}/{self.max_attempts}), "
+                               f"retrying in {delay:.1f}s: {str(e)}")
+                self.sleep(delay)
+
+    def _spool(self, message, error):
+        payload = json.dumps({'message': message.to_params(), 'error': error, 'spooled_at': time.time()})
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+        path = os.path.join(self.spool_dir, f'{time.time_ns()}-{digest}.json')
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as spool_file:
+            spool_file.write(payload)
+        os.replace(temp_path, path)
+
+    def spooled_files(self):
+        """Return spooled message files, oldest first"""
+        return sorted(
+            os.path.join(self.spool_dir, name)
+            for name in os.listdir(self.spool_dir) if name.endswith('.json')
+        )
+
+    def redeliver_spool(self) -> DeliveryReport:
+        """Try to send every spooled message again; delivered ones leave the spool"""
+        report = DeliveryReport()
+        for path in self.spooled_files():
+            with open(path, encoding='utf-8') as spool_file:
+                message = EmailMessage.from_params(json.load(spool_file)['message'])
+            try:
+                report.sent_ids.extend(self._send_with_retry([message]))
+            except Exception as e:
+                logger.error(f"Redelivery failed for {os.path.basename(path)}: {str(e)}",
+                             exc_info=not isinstance(e, DeliveryError))
+                report.spooled += 1
+                continue
+            os.remove(path)
+        logger.info(f"Redelivery finished: {report}")
+        return report
+
+
+def transport_from_env(api_key: Optional[str] = None) -> Transport:
+    """Build the transport named by NEWS_EMAIL_TRANSPORT (resend, smtp-debug or record)"""
+    name = os.getenv('NEWS_EMAIL_TRANSPORT', 'resend').lower()
+    if name == 'smtp-debug':
+        return SmtpDebugTransport(os.getenv('NEWS_SMTP_HOST', 'localhost'),
+                                  int(os.getenv('NEWS_SMTP_PORT', '1025')))
+    if name == 'record':
+        return RecordingTransport()
+    if name != 'resend':
+        raise ValueError(f"Unknown email transport: {name}")
+    return ResendTransport(api_key or os.getenv('RESEND_API_KEY', ''))
+
+
+_services: Dict[Optional[str], DeliveryService] = {}
+_services_lock = threading.Lock()
+
+
+def get_delivery_service(api_key: Optional[str] = None) -> DeliveryService:
+    """Return a shared DeliveryService (and HTTP session) for an API key"""
+    with _services_lock:
+        service = _services.get(api_key)
+        if service is None:
+            service = DeliveryService(transport_from_env(api_key))
+            _services[api_key] = service
+        return service
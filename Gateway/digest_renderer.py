@@ -0,0 +1,149 @@
+"""Digest rendering shared by NewsReaderAgent and the EmailGateway tool"""
+from html import escape
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+DIGEST_TITLES = {
+    'radiology': 'Latest AI in Radiology Updates',
+    'surgery': 'Latest AI in Surgery Updates',
+    'medicine': 'Latest AI in Healthcare Updates',
+}
+DEFAULT_DIGEST_TITLE = 'Latest Medical AI Updates'
+
+_STYLE = """
+        body {
+            font-family: Arial, sans-serif;
+            max-width: 800px;
+            margin: 20px auto;
+            padding: 20px;
+            line-height: 1.6;
+            color: #333;
+        }
+        h1 {
+            color: #2C3E50;
+            border-bottom: 2px solid #2C3E50;
+            padding-bottom: 10px;
+            margin-bottom: 30px;
+        }
+        h2 {
+            color: #2C3E50;
+            margin: 35px 0 20px;
+        }
+        a {
+            color: #3498DB;
+        }
+        .article {
+            background: #f9f9f9;
+            border-left: 4px solid #2C3E50;
+            padding: 20px;
+            margin-bottom: 25px;
+        }
+        .article-title {
+            font-size: 18px;
+            font-weight: bold;
+            color: #2C3E50;
+            margin-bottom: 15px;
+            line-height: 1.4;
+        }
+        .article-summary {
+            margin: 15px 0;
+            text-align: justify;
+        }
+        .article-link {
+            text-decoration: none;
+            display: inline-block;
+            margin-top: 10px;
+        }
+        .article-link:hover {
+            text-decoration: underline;
+        }
+"""
+
+# Static markup is assembled once at import; rendering only joins pieces
+_DOCUMENT_HEAD = (
+    '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="UTF-8">\n'
+    f'<style>{_STYLE}</style>\n</head>\n<body>\n'
+)
+_DOCUMENT_TAIL = '</body>\n</html>\n'
+_ARTICLE_HTML = (
+    '<div class="article">\n'
+    '<div class="article-title">{title}</div>\n'
+    '<div class="article-summary">{summary}</div>\n'
+    '<a href="{url}" class="article-link">Read Full Article →</a>\n'
+    '</div>\n'
+)
+_ARTICLE_TEXT = '{number}. {title}\n{summary}\nRead the full article: {url}\n'
+# Bound on memoized article fragments, so long-running processes stay small
+_MAX_FRAGMENTS = 10000
+
+
+class RenderedDigest(NamedTuple):
+    title: str
+    html: str
+    text: str
+
+
+def digest_title(category: Optional[str]) -> str:
+    """Return the heading used for a category's digest"""
+    return DIGEST_TITLES.get(category, DEFAULT_DIGEST_TITLE)
+
+
+def render_document(body_html: str, title: Optional[str] = None) -> str:
+    """Wrap an HTML body in the shared digest document and styles"""
+    parts = [_DOCUMENT_HEAD]
+    if title:
+        parts.append(f'<h1>{escape(title)}</h1>\n')
+    parts.append(body_html)
+    parts.append(_DOCUMENT_TAIL)
+    return ''.join(parts)
+
+
+class DigestRenderer:
+    """
+    Render digests as HTML and text/plain.
+
+    Each article's HTML fragment is rendered once per renderer and reused, so
+    rendering many digests (per category or per subscriber group) that share
+    articles costs a constant amount of work per article.
+    """
+
+    def __init__(self):
+        self._fragments: Dict[Tuple[str, str, str], str] = {}
+
+    def render(self, title: str, articles: Iterable[dict]) -> RenderedDigest:
+        """Render one digest"""
+        return self.render_sections(title, [(None, articles)])
+
+    def render_sections(self, title: str,
+                        sections: Iterable[Tuple[Optional[str], Iterable[dict]]]) -> RenderedDigest:
+        """Render one digest made of (heading, articles) sections; a None heading is omitted"""
+        html_parts = [_DOCUMENT_HEAD, f'<h1>{escape(title)}</h1>\n']
+        text_parts = [title, '=' * len(title), '']
+        number = 0
+        for heading, articles in sections:
+            if heading:
+                html_parts.append(f'<h2>{escape(heading)}</h2>\n')
+                text_parts.extend([heading, '-' * len(heading), ''])
+            for article in articles:
+                number += 1
+                key = (
+                    (article.get('title') or '').strip(),
+                    (article.get('link') or '').strip(),
+                    (article.get('snippet') or '').strip(),
+                )
+                html_parts.append(self._article_fragment(key))
+                text_parts.append(_ARTICLE_TEXT.format(
+                    number=number, title=key[0], summary=key[2], url=key[1]
+                ))
+        html_parts.append(_DOCUMENT_TAIL)
+        return RenderedDigest(title=title, html=''.join(html_parts), text='\n'.join(text_parts))
+
+    def _article_fragment(self, key: Tuple[str, str, str]) -> str:
+        fragment = self._fragments.get(key)
+        if fragment is None:
+            if len(self._fragments) >= _MAX_FRAGMENTS:
+                self._fragments.clear()
+            fragment = _ARTICLE_HTML.format(
+                title=escape(key[0]), summary=escape(key[2]), url=escape(key[1], quote=True)
+            )
+            self._fragments[key] = fragment
+        return fragment
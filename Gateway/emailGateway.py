@@ -1,9 +1,8 @@
-import resend
-import os
-from typing import List
-from crewai.tools import BaseTool
+from typing import List, Optional
 from pydantic import Field, BaseModel
-import markdown2
+from Gateway.delivery import EmailMessage, get_delivery_service
+from Gateway.digest_renderer import render_document
+from instrumentation import get_metrics
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,63 +11,80 @@ class EmailSender(BaseModel):
     """Simple email sending class using Resend"""
     api_key: str = Field(description="Resend API key")
     
-    def send_email(self, to: List[str], subject: str, html_content: str) -> bool:
+    def send_email(self, to: List[str], subject: str, html_content: str,
+                   text_content: Optional[str] = None) -> bool:
         try:
-            resend.api_key = self.api_key
-            response = resend.Emails.send({
-                "from": "Rosetta News <onboarding@resend.dev>",
-                "to": to,
-                "subject": subject,
-                "html": html_content
-            })
+            message = EmailMessage(
+                sender="Rosetta News <onboarding@resend.dev>",
+                to=to,
+                subject=subject,
+                html=html_content,
+                text=text_content
+            )
+            report = get_delivery_service(self.api_key).send([message])
+            if not report.ok:
+                logger.error("Email could not be delivered and was spooled for redelivery")
+                return False
             logger.info(f"Email sent successfully to {len(to)} recipients")
             return True
         except Exception as e:
             logger.error(f"Unexpected error sending email: {str(e)}")
             return False
 
-class EmailGateway(BaseTool):
-    """CrewAI tool for sending news digests"""
-    
-    name: str = "Email News Tool"
-    description: str = "Sends formatted news digest as markdown email"
-    recipients: List[str] = Field(description="List of email recipients")
-    sender: EmailSender = Field(description="Email sender instance")
+_email_gateway_class = None
 
-    def __init__(self, api_key: str, recipients: List[str]):
-        sender = EmailSender(api_key=api_key)
-        super().__init__(recipients=recipients, sender=sender)
-        self.recipients = recipients
 
-    def _run(self, markdown_content: str) -> str:
-        """Run the email sending tool with markdown content"""
-        html_content = self._convert_markdown_to_html(markdown_content)
-        success = self.sender.send_email(
-            to=self.recipients,
-            subject="Daily Medical & Surgical News Digest",
-            html_content=html_content
-        )
-        return "Email sent successfully" if success else "Failed to send email"
+def _build_email_gateway_class():
+    # CrewAI is only imported once the tool is used, so importing the gateway stays cheap
+    from crewai.tools import BaseTool
 
-    def send_email(self, markdown_content: str) -> str:
-        return self._run(markdown_content)
+    class EmailGateway(BaseTool):
+        """CrewAI tool for sending news digests"""
 
-    def _convert_markdown_to_html(self, markdown_content: str) -> str:
-        """Convert markdown content to HTML"""
-        try:
-            html_content = markdown2.markdown(markdown_content)
-            return f"""
-                <html>
-                    <head>
-                        <style>
-                            body {{ font-family: Arial, sans-serif; line-height: 1.6; max-width: 800px; margin: 0 auto; padding: 20px; }}
-                            h1 {{ color: #333; }}
-                            a {{ color: #0066cc; }}
-                        </style>
-                    </head>
-                    <body>{html_content}</body>
-                </html>
-            """
-        except Exception as e:
-            logger.error(f"Error converting markdown to HTML: {str(e)}")
-            raise
\ No newline at end of file
+        name: str = "Email News Tool"
+        description: str = "Sends formatted news digest as markdown email"
+        recipients: List[str] = Field(description="List of email recipients")
+        sender: EmailSender = Field(description="Email sender instance")
+
+        def __init__(self, api_key: str, recipients: List[str]):
+            sender = EmailSender(api_key=api_key)
+            super().__init__(recipients=recipients, sender=sender)
+            self.recipients = recipients
+
+        def _run(self, markdown_content: str) -> str:
+            """Run the email sending tool with markdown content"""
+            html_content = self._convert_markdown_to_html(markdown_content)
+            success = self.sender.send_email(
+                to=self.recipients,
+                subject="Daily Medical & Surgical News Digest",
+                html_content=html_content,
+                text_content=markdown_content
+            )
+            return "Email sent successfully" if success else "Failed to send email"
+
+        def send_email(self, markdown_content: str) -> str:
+            return self._run(markdown_content)
+
+        def _convert_markdown_to_html(self, markdown_content: str) -> str:
+            """Convert markdown content to HTML"""
+            import markdown2
+
+            try:
+                with get_metrics().stage('format_email'):
+                    html_content = markdown2.markdown(markdown_content)
+                    return render_document(html_content)
+            except Exception as e:
+                logger.error(f"Error converting markdown to HTML: {str(e)}")
+                raise
+
+    return EmailGateway
+
+
+def __getattr__(name):
+    """Build the EmailGateway tool class on first access"""
+    global _email_gateway_class
+    if name == 'EmailGateway':
+        if _email_gateway_class is None:
+            _email_gateway_class = _build_email_gateway_class()
+        return _email_gateway_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,138 @@
+"""Subscriber category choices and per-combination digest assembly"""
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from Gateway.digest_renderer import DEFAULT_DIGEST_TITLE, DigestRenderer, RenderedDigest, digest_title
+
+logger = logging.getLogger(__name__)
+
+ALL_CATEGORIES = 'all'
+
+
+def load_subscriptions(path: str, valid_categories: Sequence[str]) -> Dict[str, FrozenSet[str]]:
+    """
+    Load subscriptions from a JSON file, either
+    {"email": ["radiology", "surgery"], ...} or
+    [{"email": "...", "categories": [...]}, ...].
+    "all" subscribes a recipient to every category.
+    """
+    with open(path, encoding='utf-8') as subscriptions_file:
+        data = json.load(subscriptions_file)
+    if isinstance(data, dict):
+        entries = data.items()
+    else:
+        entries = ((entry.get('email'), entry.get('categories')) for entry in data)
+
+    valid = set(valid_categories)
+    subscriptions: Dict[str, FrozenSet[str]] = {}
+    for email, categories in entries:
+        email = (email or '').strip().lower()
+        if not email:
+            raise ValueError(f"Subscription without an email address in {path}")
+        if isinstance(categories, str):
+            categories = [categories]
+        chosen = set()
+        for category in categories or []:
+            if category == ALL_CATEGORIES:
+                chosen.update(valid)
+            elif category in valid:
+                chosen.add(category)
+            else:
+                raise ValueError(f"Invalid category for {email}: {category}")
+        # A recipient listed twice gets the union of their choices
+        subscriptions[email] = subscriptions.get(email, frozenset()) | frozenset(chosen)
+    return subscriptions
+
+
+def subscriptions_from_env(valid_categories: Sequence[str]) -> Optional[Dict[str, FrozenSet[str]]]:
+    """Load the subscriptions named by NEWS_SUBSCRIPTIONS_FILE, or None if it is not set"""
+    path = os.getenv('NEWS_SUBSCRIPTIONS_FILE')
+    if not path:
+        return None
+    subscriptions = load_subscriptions(path, valid_categories)
+    logger.info(f"Loaded {len(subscriptions)} subscriptions from {path}")
+    return subscriptions
+
+
+def group_recipients(subscriptions: Dict[str, FrozenSet[str]], category_order: Sequence[str],
+                     only: Optional[Iterable[str]] = None) -> Dict[Tuple[str, ...], List[str]]:
+    """
+    Group recipients by their distinct category combination.
+
+    Combinations are tuples in category_order; `only` restricts every
+    combination to those categories (e.g. a single --category run).
+    """
+    allowed = set(category_order if only is None else only)
+    groups: Dict[Tuple[str, ...], List[str]] = defaultdict(list)
+    for email, categories in subscriptions.items():
+        combination = tuple(category for category in category_order
+                            if category in categories and category in allowed)
+        if combination:
+            groups[combination].append(email)
+    for recipients in groups.values():
+        recipients.sort()
+    return dict(groups)
+
+
+class DigestAssembler:
+    """
+    Render each distinct category combination once from already collected
+    articles, and fan it out to that combination's recipients in chunks.
+
+    Messages are produced one chunk at a time and share their combination's
+    rendered HTML and text, so memory and render time grow with the number of
+    distinct digests rather than the number of recipients.
+    """
+
+    def __init__(self, category_articles: Dict[str, List[dict]], renderer: Optional[DigestRenderer] = None):
+        self.category_articles = category_articles
+        self.renderer = renderer or DigestRenderer()
+        self._digests: Dict[Tuple[str, ...], Optional[RenderedDigest]] = {}
+
+    def render(self, combination: Tuple[str, ...]) -> Optional[RenderedDigest]:
+        """Return the digest for a combination, or None if none of its categories has news"""
+        if combination not in self._digests:
+            sections = [(category, self.category_articles.get(category) or [])
+                        for category in combination]
+            sections = [(category, articles) for category, articles in sections if articles]
+            if not sections:
+                digest = None
+            elif len(sections) == 1:
+                category, articles = sections[0]
+                digest = self.renderer.render(digest_title(category), articles)
+            else:
+                digest = self.renderer.render_sections(
+                    DEFAULT_DIGEST_TITLE,
+                    [(digest_title(category), articles) for category, articles in sections]
+                )
+            self._digests[combination] = digest
+        return self._digests[combination]
+
+    @property
+    def rendered_count(self):
+        """Number of distinct digests rendered so far"""
+        return sum(1 for digest in self._digests.values() if digest is not None)
+
+    def iter_message_chunks(self, groups: Dict[Tuple[str, ...], List[str]],
+                            build_message: Callable[[str, str, List[str]], object],
+                            chunk_size: int = 100) -> Iterator[list]:
+        """
+        Yield lists of at most chunk_size messages, one per recipient.
+        build_message(html, text, recipients) creates a single message.
+        """
+        chunk = []
+        for combination, recipients in groups.items():
+            digest = self.render(combination)
+            if digest is None:
+                logger.info(f"No news for {'+'.join(combination)}, skipping {len(recipients)} recipients")
+                continue
+            for recipient in recipients:
+                chunk.append(build_message(digest.html, digest.text, [recipient]))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,78 @@
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class CrewPool:
+    """
+    Pool of pre-built crews shared for the lifetime of a run (or daemon).
+
+    `factory` builds a crew whose task description is a template; callers
+    parameterize each search through crew.kickoff(inputs=...). A crew is only
+    used by one thread at a time, and a new one is built only when every
+    existing crew is busy, so the pool grows to the search concurrency at most.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.created = 0
+        self.reused = 0
+        self._idle = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self):
+        """Borrow an idle crew, building one if none is available"""
+        with self._lock:
+            crew = self._idle.pop() if self._idle else None
+            if crew is not None:
+                self.reused += 1
+        if crew is None:
+            crew = self.factory()
+            with self._lock:
+                self.created += 1
+            logger.info(f"Built pooled crew #{self.created}")
+        try:
+            yield crew
+        finally:
+            with self._lock:
+                self._idle.append(crew)
+
+    def stats(self):
+        """Return how many crews were built and how many searches reused one"""
+        with self._lock:
+            return {'created': self.created, 'reused': self.reused, 'idle': len(self._idle)}
+
+
+USAGE_FIELDS = ('total_tokens', 'prompt_tokens', 'cached_prompt_tokens', 'completion_tokens',
+                'successful_requests')
+
+
+def _usage_dict(usage):
+    if isinstance(usage, dict):
+        return {field: int(usage.get(field) or 0) for field in USAGE_FIELDS}
+    return {field: int(getattr(usage, field, 0) or 0) for field in USAGE_FIELDS}
+
+
+def crew_usage(crew):
+    """A crew's running token totals, or None if it does not track them across kickoffs"""
+    calculate = getattr(crew, 'calculate_usage_metrics', None)
+    return _usage_dict(calculate()) if calculate is not None else None
+
+
+def kickoff_usage(result, before):
+    """
+    Reduce result.token_usage to what one kickoff spent.
+
+    CrewAI adds every kickoff's usage to its agents' running totals, so a
+    pooled crew reports everything it has spent since it was built; `before`
+    is crew_usage() taken just before the kickoff.
+    """
+    usage = getattr(result, 'token_usage', None)
+    if before is None or usage is None:
+        return result
+    after = _usage_dict(usage)
+    result.token_usage = {field: max(after[field] - before[field], 0) for field in USAGE_FIELDS}
+    return result
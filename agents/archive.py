@@ -0,0 +1,271 @@
+"""
+Append-only archive of every article the pipeline found or sent.
+
+Records are never rewritten: an article is stored once per category when first
+found, and each digest that includes it appends a delivery row. A keyword
+index (term id -> article ids) and date indexes on found and sent times let
+rollup digests and lookups over years of history run locally, without
+repeating any search.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from agents.dedup import canonicalize_url
+from config.storage import data_path
+
+_WORD = re.compile(r'[a-z0-9]+')
+# Words too common in medical AI news to narrow a search
+STOP_WORDS = frozenset('''
+    a about after all also an and are as at be been but by can for from has have how in into is it
+    its new not of on or our than that the their this to was were what which while who will with
+'''.split())
+MIN_TERM_LENGTH = 2
+# Reads go through a memory map of the database file, up to this many bytes
+MMAP_BYTES = 256 * 1024 * 1024
+# Newest articles per category a rollup ranks
+ROLLUP_CANDIDATES = 200
+_ARTICLE_COLUMNS = "found_at, category, query, source, link, title, summary, sent_at"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    found_at REAL NOT NULL,
+    category TEXT NOT NULL,
+    query TEXT NOT NULL,
+    source TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    link TEXT NOT NULL,
+    title TEXT NOT NULL,
+    summary BLOB NOT NULL,
+    UNIQUE (category, canonical_url)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_found_at ON articles (found_at);
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    term TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term_id INTEGER NOT NULL,
+    article_id INTEGER NOT NULL,
+    PRIMARY KEY (term_id, article_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS deliveries (
+    article_id INTEGER NOT NULL,
+    sent_at REAL NOT NULL,
+    PRIMARY KEY (article_id, sent_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_deliveries_sent_at ON deliveries (sent_at, article_id);
+"""
+
+
+def index_terms(text):
+    """Distinct lower-case words of text worth indexing"""
+    return {word for word in _WORD.findall((text or '').lower())
+            if len(word) >= MIN_TERM_LENGTH and word not in STOP_WORDS}
+
+
+def _parse_keywords(keywords):
+    """Split a keyword string into (exact terms, prefixes); 'robot*' matches any word starting with robot"""
+    exact, prefixes = set(), set()
+    for part in (keywords or '').lower().split():
+        if part.endswith('*') and len(part) > 1:
+            prefixes.update(_WORD.findall(part[:-1])[:1])
+        else:
+            exact.update(index_terms(part))
+    return exact, prefixes
+
+
+def _timestamp(value):
+    """Seconds since the epoch for a datetime, date string (YYYY-MM-DD) or number"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+class ArticleArchive:
+    """
+    Keyword- and date-indexed history of found and sent articles.
+
+    Summaries are stored zlib-compressed; titles, links and the indexes are
+    kept plain so lookups never decompress more than the rows they return.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size = {MMAP_BYTES}")
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Build an archive from NEWS_ARCHIVE_PATH"""
+        return cls(path=os.getenv('NEWS_ARCHIVE_PATH') or data_path('archive.sqlite3'))
+
+    def _insert(self, category, articles, now):
+        """Add articles not yet archived for category; returns (ids of all articles, number added)"""
+        ids = []
+        added = 0
+        for article in articles:
+            url = canonicalize_url(article.get('link'))
+            if not url:
+                continue
+            title = (article.get('title') or '').strip()
+            summary = (article.get('snippet') or '').strip()
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO articles "
+                "(found_at, category, query, source, canonical_url, link, title, summary) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (now, category, article.get('query') or '', article.get('source') or '', url,
+                 (article.get('link') or '').strip(), title, zlib.compress(summary.encode('utf-8')))
+            )
+            if cursor.rowcount == 1:
+                added += 1
+                article_id = cursor.lastrowid
+                terms = [(term,) for term in index_terms(f"{title} {summary}")]
+                self._conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", terms)
+                self._conn.executemany(
+                    "INSERT INTO postings (term_id, article_id) "
+                    "SELECT id, ? FROM terms WHERE term = ?",
+                    [(article_id, term) for (term,) in terms]
+                )
+            else:
+                article_id = self._conn.execute(
+                    "SELECT id FROM articles WHERE category = ? AND canonical_url = ?", (category, url)
+                ).fetchone()[0]
+            ids.append(article_id)
+        return ids, added
+
+    def record_found(self, category, articles):
+        """Archive a category's collected articles; ones already archived are left as they are"""
+        with self._lock:
+            _, added = self._insert(category, articles, time.time())
+            self._conn.commit()
+        return added
+
+    def record_sent(self, category, articles):
+        """Archive the articles of a delivered digest and note when they were sent"""
+        now = time.time()
+        with self._lock:
+            ids, _ = self._insert(category, articles, now)
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO deliveries (article_id, sent_at) VALUES (?, ?)",
+                [(article_id, now) for article_id in ids]
+            )
+            self._conn.commit()
+
+    def _select(self, keywords, categories, since, until, sent_only):
+        """SQL and parameters selecting the matching articles, or None if the keywords match nothing"""
+        exact, prefixes = _parse_keywords(keywords)
+        if keywords and not (exact or prefixes):
+            return None
+        time_column = 'd.sent_at' if sent_only else 'a.found_at'
+        conditions, params = [], []
+        if exact or prefixes:
+            # Integer term ids keep the postings small; a prefix covers a range of the vocabulary
+            postings = ["SELECT article_id FROM postings WHERE term_id = "
+                        "(SELECT id FROM terms WHERE term = ?)"] * len(exact)
+            postings += ["SELECT article_id FROM postings WHERE term_id IN "
+                         "(SELECT id FROM terms WHERE term >= ? AND term < ?)"] * len(prefixes)
+            conditions.append(f"a.id IN ({' INTERSECT '.join(postings)})")
+            params.extend(sorted(exact))
+            for prefix in sorted(prefixes):
+                params.extend((prefix, prefix + '\uffff'))
+        if categories:
+            conditions.append(f"a.category IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        if since is not None:
+            conditions.append(f"{time_column} >= ?")
+            params.append(_timestamp(since))
+        if until is not None:
+            conditions.append(f"{time_column} < ?")
+            params.append(_timestamp(until))
+        join = "JOIN" if sent_only else "LEFT JOIN"
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (
+            "SELECT a.id AS id, a.found_at AS found_at, a.category AS category, a.query AS query, "
+            "a.source AS source, a.link AS link, a.title AS title, a.summary AS summary, "
+            "MAX(d.sent_at) AS sent_at, MAX(COALESCE(d.sent_at, a.found_at)) AS latest "
+            f"FROM articles a {join} deliveries d ON d.article_id = a.id {where} GROUP BY a.id"
+        )
+        return sql, params
+
+    def _fetch(self, sql, params):
+        """Run a query returning _ARTICLE_COLUMNS and decompress only the rows it returns"""
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                'title': title,
+                'link': link,
+                'snippet': zlib.decompress(summary).decode('utf-8'),
+                'category': category_name,
+                'query': query,
+                'source': source,
+                'date': datetime.fromtimestamp(sent_at or found_at, timezone.utc).strftime('%Y-%m-%d'),
+                'found_at': found_at,
+                'sent_at': sent_at,
+            }
+            for found_at, category_name, query, source, link, title, summary, sent_at in rows
+        ]
+
+    def search(self, keywords=None, category=None, since=None, until=None, sent_only=False, limit=50):
+        """
+        Return archived articles, newest first, as article dicts.
+
+        Every keyword must appear in the title or summary. since and until
+        (datetimes, YYYY-MM-DD strings or timestamps) bound the time the article
+        was found, or when it was sent if sent_only is set.
+        """
+        selected = self._select(keywords, [category] if category else None, since, until, sent_only)
+        if selected is None:
+            return []
+        sql, params = selected
+        sql = f"SELECT {_ARTICLE_COLUMNS} FROM ({sql}) ORDER BY latest DESC, id DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._fetch(sql, params)
+
+    def rollup(self, since, until=None, categories=None, keywords=None, sent_only=True,
+               per_category=ROLLUP_CANDIDATES):
+        """
+        {category: articles} over a period, for building a rollup digest: the
+        newest per_category articles of each category, so a long period stays
+        cheap to load and rank.
+        """
+        selected = self._select(keywords, categories, since, until, sent_only)
+        if selected is None:
+            return {}
+        sql, params = selected
+        sql = (
+            f"SELECT {_ARTICLE_COLUMNS} FROM (SELECT *, ROW_NUMBER() OVER "
+            f"(PARTITION BY category ORDER BY latest DESC, id DESC) AS position FROM ({sql})) "
+            "WHERE position <= ? ORDER BY category, position"
+        )
+        grouped = {}
+        for article in self._fetch(sql, params + [per_category]):
+            grouped.setdefault(article['category'], []).append(article)
+        return grouped
+
+    def stats(self):
+        """Return the number of archived articles, deliveries and indexed terms"""
+        with self._lock:
+            articles, = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+            deliveries, = self._conn.execute("SELECT COUNT(*) FROM deliveries").fetchone()
+            terms, = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()
+        return {'articles': articles, 'deliveries': deliveries, 'terms': terms}
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
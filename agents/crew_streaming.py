@@ -0,0 +1,103 @@
+"""Route streamed LLM chunks from a crew kickoff to the search that started it"""
+import contextvars
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ('llm', id of an agent's LLM) / ('agent', agent id) / ('thread', thread ident) -> on_chunk
+_listeners = {}
+# Fallback for chunks emitted in a context copied from the kickoff's
+_current_listener = contextvars.ContextVar('news_stream_listener', default=None)
+_lock = threading.Lock()
+_registered = False
+# (LLMStreamChunkEvent, crewai_event_bus) once imported; False if CrewAI lacks them
+_streaming_api = None
+
+
+def _get_streaming_api():
+    """Import CrewAI's streaming hooks on first use; None if this CrewAI version has none"""
+    global _streaming_api
+    if _streaming_api is None:
+        try:
+            from crewai.utilities.events import LLMStreamChunkEvent, crewai_event_bus
+            _streaming_api = (LLMStreamChunkEvent, crewai_event_bus)
+        except ImportError:
+            _streaming_api = False
+    return _streaming_api or None
+
+
+def streaming_enabled():
+    """True if NEWS_STREAMING is set and this CrewAI version emits stream chunks"""
+    if os.getenv('NEWS_STREAMING', '').lower() not in ('1', 'true', 'yes'):
+        return False
+    return _get_streaming_api() is not None
+
+
+def _register_dispatcher():
+    global _registered
+    with _lock:
+        if _registered:
+            return
+        _registered = True
+
+    LLMStreamChunkEvent, crewai_event_bus = _get_streaming_api()
+
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def _dispatch_chunk(source, event):
+        callback = _find_listener(source, event)
+        if callback is not None:
+            callback(event.chunk)
+
+
+def _find_listener(source, event):
+    """
+    The on_chunk of the kickoff that emitted a chunk. The emitting LLM (each
+    pooled crew has its own) or the event's agent id identify it wherever the
+    event is emitted; the emitting thread and context are fallbacks.
+    """
+    keys = [('llm', id(source))]
+    agent_id = getattr(event, 'agent_id', None)
+    if agent_id:
+        keys.append(('agent', str(agent_id)))
+    keys.append(('thread', threading.get_ident()))
+    for key in keys:
+        callback = _listeners.get(key)
+        if callback is not None:
+            return callback
+    return _current_listener.get()
+
+
+def _listener_keys(crew):
+    keys = [('thread', threading.get_ident())]
+    for agent in getattr(crew, 'agents', None) or []:
+        llm = getattr(agent, 'llm', None)
+        if llm is not None:
+            keys.append(('llm', id(llm)))
+        if getattr(agent, 'id', None):
+            keys.append(('agent', str(agent.id)))
+    return keys
+
+
+def kickoff_streaming(crew, inputs, on_chunk):
+    """
+    Kick off a crew, passing each streamed text chunk to on_chunk as it arrives.
+
+    Falls back to a plain kickoff when streaming is unavailable; callers should
+    still treat result.raw as the authoritative output.
+    """
+    if _get_streaming_api() is None:
+        return crew.kickoff(inputs=inputs)
+
+    _register_dispatcher()
+    keys = _listener_keys(crew)
+    for key in keys:
+        _listeners[key] = on_chunk
+    token = _current_listener.set(on_chunk)
+    try:
+        return crew.kickoff(inputs=inputs)
+    finally:
+        _current_listener.reset(token)
+        for key in keys:
+            _listeners.pop(key, None)
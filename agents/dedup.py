@@ -0,0 +1,163 @@
+import logging
+import random
+import re
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that only track the click and never change the page
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', 'igshid',
+    'ref', 'ref_src', 'referrer', 'source', 'spm', '_hsenc', '_hsmi', 'cmpid',
+}
+TRACKING_PREFIXES = ('utm_', 'pk_', 'itm_')
+HOST_PREFIXES = ('www.', 'm.', 'mobile.', 'amp.')
+
+_WORD = re.compile(r'[a-z0-9]+')
+# Buckets larger than this are compared against their first member only
+_MAX_BUCKET_PAIRS = 32
+_HASH_MASK = (1 << 64) - 1
+
+
+def canonicalize_url(url):
+    """Normalize a URL so links to the same article compare equal; malformed URLs are only lower-cased"""
+    url = (url or '').strip()
+    if not url:
+        return ''
+    try:
+        parts = urlsplit(url if '://' in url else f"https://{url}")
+        host = parts.hostname or ''
+    except ValueError:
+        # e.g. an unbalanced IPv6 bracket in LLM output; one bad link must not stop the dedup
+        return url.lower()
+
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+
+    path = re.sub(r'/+', '/', parts.path or '/')
+    if path.endswith('/amp') or path.endswith('/amp/'):
+        path = path[:path.rindex('/amp')]
+    path = path.rstrip('/') or '/'
+
+    params = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    # Scheme and fragment never identify a different article
+    return urlunsplit(('https', host, path, urlencode(params), ''))
+
+
+def shingles(text, size):
+    """Return the set of word n-grams (shingles) in a piece of text"""
+    words = _WORD.findall((text or '').lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a, b):
+    """Jaccard similarity of two sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures with banded LSH, giving candidate pairs in roughly linear time"""
+
+    def __init__(self, num_perm=16, bands=8, seed=42):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = random.Random(seed)
+        self.rows = num_perm // bands
+        self.bands = bands
+        # XOR with a random 64-bit mask acts as a cheap permutation of the shingle hashes
+        self.masks = [rng.getrandbits(64) for _ in range(num_perm)]
+
+    def signature(self, shingle_set):
+        """Return the MinHash signature of a set of shingles"""
+        # Signatures are never persisted, so the per-process string hash is sufficient
+        hashes = [hash(s) & _HASH_MASK for s in shingle_set]
+        return [min(map(mask.__xor__, hashes)) for mask in self.masks]
+
+    def candidate_pairs(self, shingle_sets):
+        """Yield index pairs that share at least one LSH band"""
+        buckets = defaultdict(list)
+        for index, shingle_set in enumerate(shingle_sets):
+            if not shingle_set:
+                continue
+            signature = self.signature(shingle_set)
+            for band in range(self.bands):
+                start = band * self.rows
+                buckets[(band, tuple(signature[start:start + self.rows]))].append(index)
+
+        seen = set()
+        for members in buckets.values():
+            if len(members) > _MAX_BUCKET_PAIRS:
+                pairs = ((members[0], other) for other in members[1:])
+            else:
+                pairs = (
+                    (members[i], members[j])
+                    for i in range(len(members)) for j in range(i + 1, len(members))
+                )
+            for pair in pairs:
+                if pair not in seen:
+                    seen.add(pair)
+                    yield pair
+
+
+def deduplicate_articles(articles, title_threshold=0.5, text_threshold=0.5, hasher=None):
+    """
+    Merge articles that point at the same story.
+
+    Articles are merged when their canonical URLs match, or when their titles
+    or title+summary text are near-duplicates. The first article of each group
+    keeps its position, so the input order (and any ranking) is preserved.
+    Returns (unique_articles, merged_count).
+    """
+    if len(articles) < 2:
+        return list(articles), 0
+
+    hasher = hasher or MinHasher()
+    parent = list(range(len(articles)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # The earlier article always stays the representative
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    first_by_url = {}
+    for index, article in enumerate(articles):
+        url = canonicalize_url(article.get('link'))
+        if not url:
+            continue
+        if url in first_by_url:
+            union(first_by_url[url], index)
+        else:
+            first_by_url[url] = index
+
+    title_sets = [shingles(article.get('title'), 2) for article in articles]
+    text_sets = [
+        shingles(f"{article.get('title', '')} {article.get('snippet', '')}", 3)
+        for article in articles
+    ]
+    for sets, threshold in ((title_sets, title_threshold), (text_sets, text_threshold)):
+        for i, j in hasher.candidate_pairs(sets):
+            if find(i) != find(j) and jaccard(sets[i], sets[j]) >= threshold:
+                union(i, j)
+
+    unique_articles = [article for index, article in enumerate(articles) if find(index) == index]
+    merged_count = len(articles) - len(unique_articles)
+    if merged_count:
+        logger.info(f"Merged {merged_count} duplicate articles, {len(unique_articles)} remain")
+    return unique_articles, merged_count
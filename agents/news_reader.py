@@ -1,9 +1,19 @@
 import os
 import logging
-from crewai import Agent, Task, Crew, Process
-from crewai_tools import SerperDevTool
+from functools import partial
 from dotenv import load_dotenv
-import resend
+from agents.agent_pool import CrewPool, crew_usage, kickoff_usage
+from agents.crew_streaming import kickoff_streaming, streaming_enabled
+from agents.prompts import PromptBuilder, TokenBudget, TokenBudgetExceeded, usage_total_tokens
+from agents.output_parser import (
+    StreamingArticleParser, is_valid_article, parse_articles, validate_articles
+)
+from agents.ranking import RankingContext, RankingEngine
+from agents.search_runner import SearchAbandoned, raise_if_abandoned
+from config.plan import get_plan
+from Gateway.delivery import EmailMessage, get_delivery_service
+from Gateway.digest_renderer import DigestRenderer, digest_title
+from instrumentation import crew_verbose, get_metrics
 
 # Configure logging
 logging.basicConfig(
@@ -12,10 +22,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+EMAIL_SENDER = "Medical AI News <onboarding@resend.dev>"
+EMAIL_SUBJECT = "Latest Medical AI News Update"
+
 class NewsReaderAgent:
-    def __init__(self):
-        """Initialize the NewsReaderAgent"""
+    def __init__(self, cache=None, ranker=None, delivery=None, crew_factory=None,
+                 prompts=None, token_budget=None, archive=None):
+        """
+        Initialize the NewsReaderAgent, optionally with a SearchCache, RankingEngine
+        and DeliveryService. crew_factory replaces the CrewAI search crew (e.g. with
+        an offline stand-in); it must return an object with kickoff(inputs=...).
+        prompts (a PromptBuilder) and token_budget default to NEWS_PROMPT_MODE,
+        NEWS_SUMMARY_WORDS and NEWS_TOKEN_BUDGET. An ArticleArchive, when given,
+        keeps the articles each category found and sent for rollups and lookups.
+        """
         load_dotenv()
+        self.cache = cache
+        self.archive = archive
+        self.delivery = delivery
+        self.ranker = ranker or RankingEngine()
+        self.renderer = DigestRenderer()
+        self.prompts = prompts or PromptBuilder()
+        self.token_budget = token_budget or TokenBudget.from_env()
+
+        # Agents, tools and crews are built once and reused across searches
+        self.search_tool = None
+        self.crew_pool = CrewPool(partial(self._timed_build, crew_factory or self._build_search_crew))
         self.serper_api_key = os.getenv('SERPER_API_KEY')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.resend_api_key = os.getenv('RESEND_API_KEY')
@@ -24,258 +56,239 @@ class NewsReaderAgent:
         env_recipients = os.getenv('EMAIL_RECIPIENTS', '')
         self.email_recipients = [r.strip() for r in env_recipients.split(',') if r.strip()]
 
-    def search_news(self, query, source):
-        """Search for news articles and generate reader-friendly summaries."""
-        try:
-            logging.info(f"Starting news search - Query: '{query}', Source: '{source}'")
-
-            # Create the search agent
-            logging.info("Creating search agent...")
-            search_agent = Agent(
-                role='Medical News Researcher',
-                goal='Find and summarize the latest medical AI news in a way that is easy for doctors to understand',
-                backstory='I am an AI assistant specialized in making complex medical technology news accessible to healthcare professionals. I provide detailed, comprehensive summaries that capture the full context and implications of each article.',
-                tools=[SerperDevTool()]
-            )
-            logging.info("Search agent created successfully")
-
-            # Create the research task with strict formatting requirements
-            logging.info("Creating research task...")
-            search_task = Task(
-                description=f'''Search for "{query}" from {source} and create detailed summaries. Format EXACTLY as follows:
-
-TITLE: [Full Article Title Without Any Truncation]
-URL: [Article URL]
-SUMMARY: [A comprehensive paragraph summary (150-200 words) that covers:
-- Main findings or technological advancement
-- Methodology or approach used
-- Key benefits and potential impact
-- Important results or validation data
-- Practical implications for healthcare professionals]
-
-Important:
-1. Start each article with TITLE: on a new line
-2. Follow with URL: on the next line
-3. End with SUMMARY: on the next line
-4. Add a blank line between articles
-5. Do not use any other formatting (no ##, ###, etc.)
-6. Do not add any other text or sections
-7. Ensure summaries are detailed and comprehensive
-8. Keep the complete article title, do not truncate
-
-Example of exact format:
-
-TITLE: Novel Deep Learning Algorithm Demonstrates 98% Accuracy in Early Detection of Lung Nodules from Standard Chest X-rays
-URL: https://example.com/article1
-SUMMARY: This groundbreaking study introduces a sophisticated deep learning algorithm that has achieved remarkable accuracy in detecting early-stage lung nodules from standard chest X-rays. The research team, led by Dr. Sarah Chen at Stanford Medical Center, developed and validated the algorithm using a diverse dataset of over 100,000 chest X-rays from multiple institutions. The AI system demonstrated a sensitivity of 98% and specificity of 96%, significantly outperforming traditional computer-aided detection systems and matching the accuracy of experienced radiologists. The algorithm's unique architecture incorporates attention mechanisms and multi-scale feature analysis, enabling it to detect nodules as small as 3mm while maintaining a low false-positive rate. Validation studies across different patient populations and imaging equipment showed consistent performance, suggesting robust real-world applicability. This advancement could substantially improve early lung cancer detection, particularly in resource-limited settings where expert radiologists may not be readily available.
-
-TITLE: Integration of Artificial Intelligence with Picture Archiving and Communication Systems (PACS) Streamlines Radiological Workflow
-URL: https://example.com/article2
-SUMMARY: A comprehensive implementation study reveals how the integration of AI tools within existing PACS infrastructure has revolutionized radiological workflows at major medical centers. The research, conducted over 18 months across five teaching hospitals, demonstrates a 40% reduction in report turnaround time and a 35% increase in radiologist productivity. The integrated system uses machine learning algorithms to prioritize urgent cases, automatically detect common abnormalities, and provide structured reporting templates. Notably, the AI system's natural language processing capabilities help standardize reporting while maintaining flexibility for radiologist input. The implementation resulted in improved emergency department response times and better communication between radiologists and referring physicians. Cost-benefit analysis showed a return on investment within 14 months, making this solution particularly attractive for medium to large healthcare facilities.
-''',
-                expected_output="A list of articles with complete titles, URLs, and detailed paragraph summaries in the exact specified format",
-                agent=search_agent
-            )
-            logging.info("Research task created successfully")
-
-            # Create and execute the crew
-            logging.info("Creating crew for task execution...")
-            crew = Crew(
-                agents=[search_agent],
-                tasks=[search_task],
-                process=Process.sequential,
-                verbose=True
-            )
-            logging.info("Crew created successfully")
-
-            logging.info("Starting search task execution...")
-            result = crew.kickoff()
-            logging.info("Search task execution completed")
-
-            if not result or not result.raw:
-                logging.warning("No results returned from the search")
-                return []
-
-            # Process the results
-            logging.info("Processing search results...")
-            articles = []
-            current_article = {}
-
-            for line in result.raw.split('\n'):
-                line = line.strip()
-                if not line:
-                    # blank line -> we finalize the current article (if any)
-                    if current_article:
-                        articles.append(current_article)
-                        current_article = {}
-                    continue
-
-                if line.startswith('TITLE: '):
-                    # If there's an article in progress, push it to the list first
-                    if current_article:
-                        articles.append(current_article)
-                    current_article = {'title': line[7:].strip()}
-
-                elif line.startswith('URL: '):
-                    current_article['link'] = line[5:].strip()
-
-                elif line.startswith('SUMMARY: '):
-                    current_article['snippet'] = line[9:].strip()
-
-            # If there's a leftover article in progress, add it
-            if current_article:
-                articles.append(current_article)
-
-            # Clean and validate articles
-            logging.info("Cleaning and validating articles...")
-            cleaned_articles = []
-            for article in articles:
-                if all(article.get(key) for key in ['title', 'link', 'snippet']):
-                    cleaned_articles.append(article)
-                    logging.info(f"Validated article: {article['title']}")
-                else:
-                    logging.warning(f"Skipped invalid article: {article.get('title', 'Unknown Title')}")
+    def search_news(self, query, source, on_article=None, raise_errors=False):
+        """
+        Search for news articles and generate reader-friendly summaries.
 
-            logging.info(f"Found {len(cleaned_articles)} valid articles")
-            # Limit to 5 right here:
-            return cleaned_articles[:5]
+        on_article, if given, is called with each valid article as soon as it is
+        available: while the LLM is still generating when NEWS_STREAMING is on,
+        otherwise once the crew finishes.
+        Errors are logged and give an empty result, unless raise_errors is set
+        (e.g. so a queued search can be retried).
+        """
+        metrics = get_metrics()
+        metrics.increment('searches')
+        if self.cache is not None:
+            cached = self.cache.get(query, source, self.prompts.fingerprint)
+            if cached is not None:
+                metrics.increment('search_cache_hits')
+                if on_article is not None:
+                    for article in cached:
+                        on_article(article)
+                return cached
 
+        try:
+            with metrics.stage('search'):
+                articles = self._search_uncached(query, source, on_article)
+        except SearchAbandoned as e:
+            logging.info(f"Stopped abandoned search - Query: '{query}', Source: '{source}': {str(e)}")
+            if raise_errors:
+                raise
+            return []
         except Exception as e:
             logging.error(f"Error in search_news: {str(e)}", exc_info=True)
+            if raise_errors:
+                raise
             return []
 
-    def format_email_content(self, news_items, category=None):
-        """Format news items into a simple, clean email."""
-        logging.info("Starting email content formatting...")
-        
-        # Ensure we only take top 5 articles
-        top_articles = news_items[:5]
-        logging.info(f"Processing {len(top_articles)} articles for email")
-        
-        # Set category-specific title
-        if category == 'radiology':
-            email_title = 'Latest AI in Radiology Updates'
-        elif category == 'surgery':
-            email_title = 'Latest AI in Surgery Updates'
-        elif category == 'medicine':
-            email_title = 'Latest AI in Healthcare Updates'
-        else:
-            email_title = 'Latest Medical AI Updates'
-        
-        # Start with basic HTML structure
-        email_content = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    max-width: 800px;
-                    margin: 20px auto;
-                    padding: 20px;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                h1 {{
-                    color: #2C3E50;
-                    border-bottom: 2px solid #2C3E50;
-                    padding-bottom: 10px;
-                    margin-bottom: 30px;
-                }}
-                .article {{
-                    background: #f9f9f9;
-                    border-left: 4px solid #2C3E50;
-                    padding: 20px;
-                    margin-bottom: 25px;
-                }}
-                .article-title {{
-                    font-size: 18px;
-                    font-weight: bold;
-                    color: #2C3E50;
-                    margin-bottom: 15px;
-                    line-height: 1.4;
-                }}
-                .article-summary {{
-                    margin: 15px 0;
-                    text-align: justify;
-                }}
-                .article-link {{
-                    color: #3498DB;
-                    text-decoration: none;
-                    display: inline-block;
-                    margin-top: 10px;
-                }}
-                .article-link:hover {{
-                    text-decoration: underline;
-                }}
-            </style>
-        </head>
-        <body>
-            <h1>{email_title}</h1>
-        """
-
-        # Add each article block
-        for article in top_articles:
-            title = article.get('title', '').strip()
-            url = article.get('link', '').strip()
-            summary = article.get('snippet', '').strip()
-            email_content += f"""
-            <div class="article">
-                <div class="article-title">{title}</div>
-                <div class="article-summary">{summary}</div>
-                <a href="{url}" class="article-link">Read Full Article →</a>
-            </div>
-            """
-
-        email_content += """\
-        </body>
-        </html>
-        """
-
-        # Log a brief preview
-        logging.info(f"Email HTML preview:\n{email_content[:500]}...")
-        return email_content
-
-    def send_email(self, html_content):
-        """Send the email via Resend."""
+        # Only successful, non-empty searches are cached, so failures are retried next run
+        if self.cache is not None and articles:
+            self.cache.put(query, source, articles, self.prompts.fingerprint)
+        return articles
+
+    @staticmethod
+    def _timed_build(factory):
+        with get_metrics().stage('agent_construction'):
+            return factory()
+
+    def _build_search_crew(self):
+        """Build a reusable search crew; {query} and {source} are filled in at kickoff."""
+        # CrewAI is imported on first use, so CLI-only runs never pay for it
+        from crewai import Agent, Task, Crew, Process
+        from agents.search_tools import RateLimitedSerperDevTool, build_llm
+
+        if self.search_tool is None:
+            self.search_tool = RateLimitedSerperDevTool()
+
+        # Create the search agent
+        logging.info("Creating search agent...")
+        search_agent = Agent(
+            role='Medical News Researcher',
+            goal='Find and summarize the latest medical AI news in a way that is easy for doctors to understand',
+            backstory='I am an AI assistant specialized in making complex medical technology news accessible to healthcare professionals. I provide detailed, comprehensive summaries that capture the full context and implications of each article.',
+            tools=[self.search_tool],
+            # Each LLM request waits for the shared OpenAI quota
+            llm=build_llm(stream=streaming_enabled())
+        )
+        logging.info("Search agent created successfully")
+
+        # Create the research task with strict formatting requirements
+        logging.info("Creating research task...")
+        search_task = Task(
+            description=self.prompts.search_task(),
+            expected_output="A list of articles with complete titles, URLs, and detailed paragraph summaries in the exact specified format",
+            agent=search_agent
+        )
+        logging.info("Research task created successfully")
+
+        # Create and execute the crew
+        logging.info("Creating crew for task execution...")
+        crew = Crew(
+            agents=[search_agent],
+            tasks=[search_task],
+            process=Process.sequential,
+            verbose=crew_verbose()
+        )
+        logging.info("Crew created successfully")
+        return crew
+
+    def _search_uncached(self, query, source, on_article=None):
+        """Run the search crew and parse its output; errors propagate to the caller."""
+        logging.info(f"Starting news search - Query: '{query}', Source: '{source}'")
+
+        metrics = get_metrics()
+        estimate = self.prompts.estimate_search_tokens(query, source)
         try:
-            logging.info("Starting email preparation...")
-
-            # Confirm the API key
-            api_key = self.resend_api_key
-            if not api_key:
-                raise ValueError("RESEND_API_KEY environment variable not set")
+            self.token_budget.reserve(estimate)
+        except TokenBudgetExceeded as e:
+            logging.warning(f"Skipping search '{query}' on {source}: {str(e)}")
+            metrics.increment('searches_over_budget')
+            return []
 
-            # Confirm we have recipients
-            if not self.email_recipients:
-                raise ValueError("EMAIL_RECIPIENTS environment variable not set or empty")
+        streamed = []
+        try:
+            with self.crew_pool.acquire() as crew, metrics.stage('crew_kickoff'):
+                raise_if_abandoned()
+                logging.info("Starting search task execution...")
+                inputs = {'query': query, 'source': source}
+                # Pooled crews keep running token totals, so each kickoff counts only its own share
+                before = crew_usage(crew)
+                # The crew's LLM waits for the shared OpenAI quota and retries 429s request by request
+                if on_article is not None and streaming_enabled():
+                    parser = StreamingArticleParser()
+                    delivered = set()
+
+                    def handle_chunk(chunk):
+                        # Hand complete articles downstream while generation continues
+                        for article in parser.feed(chunk):
+                            key = (article.get('title'), article.get('link'))
+                            if is_valid_article(article) and len(streamed) < 5 and key not in delivered:
+                                delivered.add(key)
+                                streamed.append(article)
+                                on_article(article)
+
+                    result = kickoff_streaming(crew, inputs, handle_chunk)
+                else:
+                    result = crew.kickoff(inputs=inputs)
+                result = kickoff_usage(result, before)
+        except Exception:
+            # A failed kickoff reports no usage, so its reservation must not stay counted
+            self.token_budget.release(estimate)
+            raise
+        logging.info("Search task execution completed")
+        # The scheduler already moved on; the reservation stays charged in place of the usage
+        raise_if_abandoned()
+        usage = getattr(result, 'token_usage', None)
+        metrics.record_tokens(usage)
+        self.token_budget.settle(estimate, usage_total_tokens(usage))
+        if self.prompts.tokens_saved_per_search:
+            metrics.increment('prompt_tokens_saved', self.prompts.tokens_saved_per_search)
+
+        if not result or not result.raw:
+            logging.warning("No results returned from the search")
+            return []
 
-            logging.info(f"Recipients: {self.email_recipients}")
+        # Process the results
+        logging.info("Processing search results...")
+        with metrics.stage('parse'):
+            articles = parse_articles(result.raw)
+
+        # Clean and validate articles
+        logging.info("Cleaning and validating articles...")
+        with metrics.stage('validate'):
+            cleaned_articles = validate_articles(articles)
+        metrics.increment('articles_parsed', len(articles))
+        metrics.increment('articles_valid', len(cleaned_articles))
+
+        logging.info(f"Found {len(cleaned_articles)} valid articles")
+        # Limit to 5 right here:
+        cleaned_articles = cleaned_articles[:5]
+
+        # The final output is authoritative; pass on anything the stream did not deliver
+        if on_article is not None:
+            delivered = {(article['title'], article['link']) for article in streamed}
+            for article in cleaned_articles:
+                if (article['title'], article['link']) not in delivered:
+                    on_article(article)
+        return cleaned_articles
+
+    def select_top_articles(self, news_items, category=None, ranking_context=None, limit=5):
+        """Return the best-ranked articles for a category's digest."""
+        if ranking_context is None:
+            category_plan = get_plan().categories.get(category)
+            ranking_context = RankingContext(
+                queries=category_plan.queries if category_plan else None,
+                sources=category_plan.sources if category_plan else None
+            )
+        return self.ranker.top(news_items, ranking_context, limit=limit)
 
-            # Initialize Resend
-            resend.api_key = api_key
+    def render_digest(self, news_items, category=None, ranking_context=None):
+        """Rank news items and render the top 5 as an HTML and plain-text digest."""
+        logging.info("Starting email content formatting...")
+        
+        # Ensure we only take the 5 best-ranked articles
+        with get_metrics().stage('format_email'):
+            top_articles = self.select_top_articles(news_items, category, ranking_context)
+            logging.info(f"Processing {len(top_articles)} articles for email")
 
-            # Build the params
-            params = {
-                "from": "Medical AI News <onboarding@resend.dev>",
-                "to": self.email_recipients,  # Use the list properly
-                "subject": "Latest Medical AI News Update",
-                "html": html_content
-            }
+            digest = self.renderer.render(digest_title(category), top_articles)
 
-            # Debug logging
-            logging.info("Sending email now...")
-            logging.info(f"Email content preview (first 500 chars): {html_content[:500]}...")
+        # Log a brief preview
+        logging.debug(f"Email HTML preview:\n{digest.html[:500]}...")
+        return digest
 
-            # Send the email
-            response = resend.Emails.send(params)
+    def format_email_content(self, news_items, category=None, ranking_context=None):
+        """Format news items into a simple, clean email."""
+        return self.render_digest(news_items, category, ranking_context).html
+
+    def build_message(self, html_content, text_content=None, recipients=None):
+        """Build the digest email for the configured (or given) recipients."""
+        return EmailMessage(
+            sender=EMAIL_SENDER,
+            to=list(recipients or self.email_recipients),
+            subject=EMAIL_SUBJECT,
+            html=html_content,
+            text=text_content
+        )
+
+    def send_messages(self, messages):
+        """Deliver prepared messages in batches; undeliverable ones are spooled to disk."""
+        if self.delivery is None:
+            self.delivery = get_delivery_service(self.resend_api_key)
+        return self.delivery.send(messages)
+
+    def deliver_email(self, html_content, text_content=None):
+        """Send the email to the configured recipients and return the DeliveryReport; errors propagate."""
+        logging.info("Starting email preparation...")
+
+        # Confirm we have recipients
+        if not self.email_recipients:
+            raise ValueError("EMAIL_RECIPIENTS environment variable not set or empty")
+
+        logging.info(f"Recipients: {self.email_recipients}")
+        logging.info("Sending email now...")
+        return self.send_messages([self.build_message(html_content, text_content)])
+
+    def send_email(self, html_content, text_content=None):
+        """Send the email via the delivery service, with an optional text/plain alternative."""
+        try:
+            report = self.deliver_email(html_content, text_content)
 
-            if response:
-                logging.info(f"Email sent successfully. Response: {response}")
+            if report.ok:
+                logging.info(f"Email sent successfully. Ids: {report.sent_ids}")
                 return True
-            else:
-                raise Exception("Failed to send email - no response received")
+            logging.error("Email could not be delivered and was spooled for redelivery")
+            return False
 
         except Exception as e:
             logging.error(f"Error sending email: {str(e)}", exc_info=True)
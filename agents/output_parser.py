@@ -0,0 +1,104 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ('title', 'link', 'snippet')
+# Fields whose text may wrap onto following lines
+_CONTINUED_FIELDS = ('title', 'snippet')
+_FIELD_PREFIXES = (('TITLE: ', 'title'), ('URL: ', 'link'), ('SUMMARY: ', 'snippet'))
+_ANSWER_PREFIX = 'Final Answer:'
+# Lines the agent writes around its answer; they end any article in progress
+_AGENT_MARKERS = ('Thought:', 'Action:', 'Action Input:', 'Observation:', _ANSWER_PREFIX)
+
+
+class StreamingArticleParser:
+    """
+    Incremental parser for TITLE/URL/SUMMARY crew output.
+
+    Feed it text as it arrives; each call returns the articles whose block
+    closed in that chunk (on a blank line, the next TITLE: or an agent marker
+    such as Thought:). Other lines that do not start a new field continue the
+    previous title or summary, so summaries wrapped over several lines are
+    kept whole.
+    """
+
+    def __init__(self):
+        self._partial_line = ''
+        self._current_article = {}
+        self._current_field = None
+
+    def feed(self, chunk):
+        """Consume a chunk of output and return the articles it completed"""
+        if '\n' not in chunk:
+            # Most streamed chunks end mid-line; nothing can complete yet
+            self._partial_line += chunk
+            return []
+        completed = []
+        lines = (self._partial_line + chunk).split('\n')
+        self._partial_line = lines.pop()
+        for line in lines:
+            self._process_line(line, completed)
+        return completed
+
+    def close(self):
+        """Flush the remaining output and return the last articles"""
+        completed = []
+        if self._partial_line:
+            self._process_line(self._partial_line, completed)
+            self._partial_line = ''
+        self._finish_article(completed)
+        return completed
+
+    def _process_line(self, line, completed):
+        line = line.strip()
+        if line.startswith(_AGENT_MARKERS):
+            self._finish_article(completed)
+            if not line.startswith(_ANSWER_PREFIX):
+                return
+            # The answer itself may start on the marker line
+            line = line[len(_ANSWER_PREFIX):].strip()
+        if not line:
+            # blank line -> we finalize the current article (if any)
+            self._finish_article(completed)
+            return
+
+        for prefix, field in _FIELD_PREFIXES:
+            if line.startswith(prefix):
+                if field == 'title':
+                    # If there's an article in progress, push it to the list first
+                    self._finish_article(completed)
+                self._current_article[field] = line[len(prefix):].strip()
+                self._current_field = field
+                return
+
+        if self._current_field in _CONTINUED_FIELDS and self._current_article:
+            self._current_article[self._current_field] += ' ' + line
+
+    def _finish_article(self, completed):
+        if self._current_article:
+            completed.append(self._current_article)
+        self._current_article = {}
+        self._current_field = None
+
+
+def parse_articles(raw):
+    """Parse TITLE/URL/SUMMARY blocks from crew output into article dicts"""
+    parser = StreamingArticleParser()
+    return parser.feed(raw) + parser.close()
+
+
+def is_valid_article(article):
+    """True if an article has a title, link and summary"""
+    return all(article.get(key) for key in REQUIRED_FIELDS)
+
+
+def validate_articles(articles):
+    """Keep only articles that have a title, link and summary"""
+    cleaned_articles = []
+    for article in articles:
+        if is_valid_article(article):
+            cleaned_articles.append(article)
+            logger.info(f"Validated article: {article['title']}")
+        else:
+            logger.warning(f"Skipped invalid article: {article.get('title', 'Unknown Title')}")
+    return cleaned_articles
@@ -0,0 +1,235 @@
+"""
+Prompts for the research and summary tasks, token counting and a per-run token budget.
+
+Prompts put the static instructions and examples first and the per-search
+variables last, so every search shares the same prefix and provider-side
+prompt caching can reuse it.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import threading
+
+# tiktoken is optional, and only imported once the first prompt is counted
+TIKTOKEN_AVAILABLE = importlib.util.find_spec('tiktoken') is not None
+
+logger = logging.getLogger(__name__)
+
+PROMPT_MODES = ('full', 'compact')
+DEFAULT_SUMMARY_WORDS = (150, 200)
+# Rough tokens per English word, used to budget the completion
+TOKENS_PER_WORD = 1.35
+ARTICLES_PER_SEARCH = 5
+
+_FULL_RULES = '''Important:
+1. Start each article with TITLE: on a new line
+2. Follow with URL: on the next line
+3. End with SUMMARY: on the next line
+4. Add a blank line between articles
+5. Do not use any other formatting (no ##, ###, etc.)
+6. Do not add any other text or sections
+7. Ensure summaries are detailed and comprehensive
+8. Keep the complete article title, do not truncate'''
+
+_COMPACT_RULES = '''Rules: TITLE:, URL: and SUMMARY: each start a line; one blank line between articles; \
+no other text or formatting; never truncate titles.'''
+
+_SUMMARY_RULES = '''Important:
+1. Keep the articles in the order given and copy each TITLE and URL unchanged
+2. Start each article with TITLE: on a new line
+3. Follow with URL: on the next line
+4. End with SUMMARY: on the next line, written as a single paragraph
+5. Add a blank line between articles
+6. Do not use any other formatting (no ##, ###, etc.)
+7. Do not add any other text or sections'''
+
+_FULL_EXAMPLES = '''Example of exact format:
+
+TITLE: Novel Deep Learning Algorithm Demonstrates 98% Accuracy in Early Detection of Lung Nodules from Standard Chest X-rays
+URL: https://example.com/article1
+SUMMARY: This groundbreaking study introduces a sophisticated deep learning algorithm that has achieved remarkable accuracy in detecting early-stage lung nodules from standard chest X-rays. The research team, led by Dr. Sarah Chen at Stanford Medical Center, developed and validated the algorithm using a diverse dataset of over 100,000 chest X-rays from multiple institutions. The AI system demonstrated a sensitivity of 98% and specificity of 96%, significantly outperforming traditional computer-aided detection systems and matching the accuracy of experienced radiologists. The algorithm's unique architecture incorporates attention mechanisms and multi-scale feature analysis, enabling it to detect nodules as small as 3mm while maintaining a low false-positive rate. Validation studies across different patient populations and imaging equipment showed consistent performance, suggesting robust real-world applicability. This advancement could substantially improve early lung cancer detection, particularly in resource-limited settings where expert radiologists may not be readily available.
+
+TITLE: Integration of Artificial Intelligence with Picture Archiving and Communication Systems (PACS) Streamlines Radiological Workflow
+URL: https://example.com/article2
+SUMMARY: A comprehensive implementation study reveals how the integration of AI tools within existing PACS infrastructure has revolutionized radiological workflows at major medical centers. The research, conducted over 18 months across five teaching hospitals, demonstrates a 40% reduction in report turnaround time and a 35% increase in radiologist productivity. The integrated system uses machine learning algorithms to prioritize urgent cases, automatically detect common abnormalities, and provide structured reporting templates. Notably, the AI system's natural language processing capabilities help standardize reporting while maintaining flexibility for radiologist input. The implementation resulted in improved emergency department response times and better communication between radiologists and referring physicians. Cost-benefit analysis showed a return on investment within 14 months, making this solution particularly attractive for medium to large healthcare facilities.'''
+
+_COMPACT_EXAMPLE = '''Example:
+
+TITLE: Deep Learning Algorithm Detects Early Lung Nodules on Chest X-rays with 98% Accuracy
+URL: https://example.com/article1
+SUMMARY: A Stanford team validated a deep learning model on 100,000 chest X-rays from several institutions. It reached 98% sensitivity and 96% specificity, matching experienced radiologists and finding nodules as small as 3mm with few false positives. Consistent results across patient groups and equipment suggest it could widen early lung cancer detection where radiologists are scarce.'''
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            import tiktoken
+
+            model = os.getenv('OPENAI_MODEL_NAME', 'gpt-4o-mini')
+            try:
+                _encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoder = tiktoken.get_encoding('cl100k_base')
+        return _encoder
+
+
+def count_tokens(text):
+    """Tokens in text for OPENAI_MODEL_NAME; about four characters per token without tiktoken"""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_get_encoder().encode(text))
+    return len(text) // 4 + 1
+
+
+def parse_summary_words(value):
+    """Parse NEWS_SUMMARY_WORDS ("150-200" or "120") into a (min, max) word range"""
+    if not value:
+        return DEFAULT_SUMMARY_WORDS
+    low, _, high = value.partition('-')
+    try:
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise ValueError(f"Invalid summary length: {value}")
+    if not 0 < low <= high:
+        raise ValueError(f"Invalid summary length: {value}")
+    return low, high
+
+
+def usage_total_tokens(usage):
+    """Total tokens from a crew result's token_usage (an object or a dict), or None if not reported"""
+    if isinstance(usage, dict):
+        return usage.get('total_tokens')
+    return getattr(usage, 'total_tokens', None)
+
+
+class TokenBudgetExceeded(Exception):
+    """An LLM call would take the run over its token budget"""
+
+
+class TokenBudget:
+    """
+    Caps the LLM tokens one run may use. Calls reserve their estimated
+    tokens up front and settle the difference once the actual usage is known,
+    or release the reservation if the call fails. A limit of 0 means unlimited.
+    """
+
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.used = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build a budget from NEWS_TOKEN_BUDGET"""
+        return cls(limit=int(os.getenv('NEWS_TOKEN_BUDGET', '0')))
+
+    def reserve(self, tokens):
+        """Reserve tokens, raising TokenBudgetExceeded if the budget does not allow them"""
+        with self._lock:
+            if self.limit and self.used + tokens > self.limit:
+                self.refused += 1
+                raise TokenBudgetExceeded(
+                    f"Token budget exhausted: {self.used} of {self.limit} used, {tokens} more needed"
+                )
+            self.used += tokens
+
+    def settle(self, reserved, actual):
+        """Replace a reservation with the tokens actually used, when the provider reported them"""
+        if actual is not None:
+            with self._lock:
+                self.used += actual - reserved
+
+    def release(self, reserved):
+        """Give back a reservation whose call failed without reporting usage"""
+        self.settle(reserved, 0)
+
+    def reset(self):
+        with self._lock:
+            self.used = 0
+            self.refused = 0
+
+    def stats(self):
+        with self._lock:
+            return {'limit': self.limit, 'used': self.used, 'refused': self.refused}
+
+
+class PromptBuilder:
+    """
+    Build task descriptions in 'full' mode (the complete spec with two long
+    examples) or 'compact' mode (condensed rules and one short example), with
+    a configurable summary length.
+    """
+
+    def __init__(self, mode=None, summary_words=None):
+        self.mode = (mode or os.getenv('NEWS_PROMPT_MODE', 'full')).lower()
+        if self.mode not in PROMPT_MODES:
+            raise ValueError(f"Unknown prompt mode: {self.mode}")
+        self.summary_words = summary_words or parse_summary_words(os.getenv('NEWS_SUMMARY_WORDS'))
+        self._tokens_saved = None
+
+    def format_spec(self):
+        low, high = self.summary_words
+        if self.mode == 'compact':
+            return f'''Format each article EXACTLY as:
+
+TITLE: [Full Article Title]
+URL: [Article URL]
+SUMMARY: [One paragraph, {low}-{high} words: main finding, method, key results, impact for clinicians]'''
+        return f'''Format EXACTLY as follows:
+
+TITLE: [Full Article Title Without Any Truncation]
+URL: [Article URL]
+SUMMARY: [A comprehensive paragraph summary ({low}-{high} words) that covers:
+- Main findings or technological advancement
+- Methodology or approach used
+- Key benefits and potential impact
+- Important results or validation data
+- Practical implications for healthcare professionals]'''
+
+    def search_task(self):
+        """
+        Research task description; CrewAI fills in {query} and {source} at
+        kickoff, and they come last so the rest is a shared prefix.
+        """
+        if self.mode == 'compact':
+            static = f"{self.format_spec()}\n\n{_COMPACT_RULES}\n\n{_COMPACT_EXAMPLE}"
+        else:
+            static = f"{self.format_spec()}\n\n{_FULL_RULES}\n\n{_FULL_EXAMPLES}"
+        return static + '\n\nSearch for "{query}" from {source} and create detailed summaries in this format.\n'
+
+    @property
+    def fingerprint(self):
+        """Short hash of the search task, so results from a different prompt are never reused"""
+        return hashlib.sha256(self.search_task().encode('utf-8')).hexdigest()[:16]
+
+    def summary_task(self, article_list, count):
+        """Summary task description for the staged pipeline, with the articles last"""
+        rules = _COMPACT_RULES if self.mode == 'compact' else _SUMMARY_RULES
+        return (f"{self.format_spec()}\n\n{rules}\n\n"
+                f"Write a summary for each of the {count} articles below, in the order given.\n\n"
+                f"Articles:\n\n{article_list}\n")
+
+    def completion_tokens(self, articles=ARTICLES_PER_SEARCH):
+        """Expected completion size: each article's summary plus its title and URL"""
+        return int(articles * (self.summary_words[1] + 40) * TOKENS_PER_WORD)
+
+    def estimate_search_tokens(self, query, source):
+        """Prompt plus expected completion tokens for one search"""
+        prompt = self.search_task().replace('{query}', query).replace('{source}', source)
+        return count_tokens(prompt) + self.completion_tokens()
+
+    @property
+    def tokens_saved_per_search(self):
+        """Prompt and expected completion tokens saved per search compared to the full default prompt"""
+        if self._tokens_saved is None:
+            full = PromptBuilder(mode='full', summary_words=DEFAULT_SUMMARY_WORDS)
+            self._tokens_saved = max(0, count_tokens(full.search_task()) - count_tokens(self.search_task())
+                                     + full.completion_tokens() - self.completion_tokens())
+        return self._tokens_saved
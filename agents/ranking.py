@@ -0,0 +1,198 @@
+import logging
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+from agents.dedup import canonicalize_url, jaccard, shingles
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'[a-z0-9]+')
+_RELATIVE_DATE = re.compile(r'(\d+)\s+(minute|hour|day|week|month|year)s?\s+ago', re.IGNORECASE)
+_DATE_FORMATS = ('%b %d, %Y', '%B %d, %Y', '%d %b %Y', '%Y-%m-%d', '%Y-%m-%dT%H:%M:%S')
+_UNIT_DAYS = {'minute': 1 / 1440, 'hour': 1 / 24, 'day': 1, 'week': 7, 'month': 30, 'year': 365}
+# Terms are compared on their first letters so 'surgery' matches 'surgical'
+_STEM_LENGTH = 5
+
+
+class RankingContext:
+    """What the scorers know about a category run"""
+
+    def __init__(self, queries=None, sources=None, now=None, recency_half_life_days=7):
+        self.queries = list(queries or [])
+        self.sources = [source.lower() for source in (sources or [])]
+        self.now = time.time() if now is None else now
+        self.recency_half_life_days = recency_half_life_days
+
+
+def _terms(text):
+    return {word[:_STEM_LENGTH] for word in _WORD.findall((text or '').lower())}
+
+
+def query_match_score(article, context):
+    """Share of the query terms found in the title (weighted higher) and summary"""
+    query = article.get('query') or ' '.join(context.queries)
+    query_terms = _terms(query)
+    if not query_terms:
+        return 0.0
+    title_terms = _terms(article.get('title'))
+    summary_terms = _terms(article.get('snippet'))
+    title_share = len(query_terms & title_terms) / len(query_terms)
+    summary_share = len(query_terms & summary_terms) / len(query_terms)
+    return 0.6 * title_share + 0.4 * summary_share
+
+
+def source_priority_score(article, context):
+    """Earlier sources in the category config rank higher; unknown sources score 0"""
+    if not context.sources:
+        return 0.5
+    source = article.get('source')
+    if not source:
+        try:
+            source = urlsplit(article.get('link') or '').hostname
+        except ValueError:
+            source = None
+    source = (source or '').lower()
+    for index, priority_source in enumerate(context.sources):
+        if source == priority_source or source.endswith('.' + priority_source):
+            return 1.0 - index / len(context.sources)
+    return 0.0
+
+
+def parse_article_age_days(date_text, now):
+    """Return an article's age in days from a Serper date string, or None if unknown"""
+    date_text = (date_text or '').strip()
+    if not date_text:
+        return None
+    match = _RELATIVE_DATE.search(date_text)
+    if match:
+        return int(match.group(1)) * _UNIT_DAYS[match.group(2).lower()]
+    for date_format in _DATE_FORMATS:
+        try:
+            published = datetime.strptime(date_text, date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+        return max(now - published.timestamp(), 0) / 86400
+    return None
+
+
+def recency_score(article, context):
+    """Exponential decay with the article's age; None (no signal) for undated articles"""
+    age_days = parse_article_age_days(article.get('date'), context.now)
+    if age_days is None:
+        return None
+    return math.pow(0.5, age_days / context.recency_half_life_days)
+
+
+DEFAULT_SCORERS = {
+    'query_match': (0.4, query_match_score),
+    'source_priority': (0.15, source_priority_score),
+    'recency': (0.25, recency_score),
+}
+
+
+class RankingEngine:
+    """
+    Weighted, pluggable article scoring.
+
+    Each scorer is a function (article, context) -> float in [0, 1] registered
+    under a name with a weight. A scorer returns None when the article carries
+    no signal for it (recency for an undated article, e.g. every article the
+    agent path parses), and its weight is then left out of that article's
+    average instead of pulling every article to the same middle value. Uniqueness is applied while ranking: each article
+    is penalized by its title similarity to articles already ranked above it.
+    """
+
+    def __init__(self, scorers=None, uniqueness_weight=0.2):
+        self.scorers = dict(DEFAULT_SCORERS if scorers is None else scorers)
+        self.uniqueness_weight = uniqueness_weight
+
+    def register(self, name, scorer, weight):
+        """Add or replace a scorer"""
+        self.scorers[name] = (weight, scorer)
+
+    def base_score(self, article, context):
+        """Weighted average of the scorers that have a signal for the article, in [0, 1]"""
+        total_weight = total = 0.0
+        for weight, scorer in self.scorers.values():
+            score = scorer(article, context)
+            if score is not None:
+                total_weight += weight
+                total += weight * score
+        if not total_weight:
+            return 0.0
+        return total / total_weight
+
+    def rank(self, articles, context, limit=None):
+        """Return copies of the articles, best first, each with a 'score' field; at most limit of them"""
+        # [base score, input index, article, title shingles, highest overlap with a ranked title]
+        remaining = sorted(
+            ([self.base_score(article, context), index, article, shingles(article.get('title'), 1), 0.0]
+             for index, article in enumerate(articles)),
+            key=lambda item: (-item[0], item[1])
+        )
+        count = len(remaining) if limit is None else min(limit, len(remaining))
+        ranked = []
+
+        # Greedy selection: re-score by uniqueness against what is already ranked. Each
+        # candidate keeps its running maximum overlap, so a pick costs one pass over the rest.
+        while len(ranked) < count:
+            best_position, best_score = 0, None
+            for position, (base, _, _, _, overlap) in enumerate(remaining):
+                score = (1 - self.uniqueness_weight) * base + self.uniqueness_weight * (1 - overlap)
+                if best_score is None or score > best_score:
+                    best_position, best_score = position, score
+            _, _, article, title, _ = remaining.pop(best_position)
+            ranked.append(dict(article, score=round(best_score, 4)))
+            for candidate in remaining:
+                candidate[4] = max(candidate[4], jaccard(candidate[3], title))
+        return ranked
+
+    def top(self, articles, context, limit=5):
+        """Return the best `limit` articles"""
+        return self.rank(articles, context, limit=limit)
+
+    def quality_stop(self, context, target, threshold):
+        """
+        Build a stop condition for SearchScheduler: true once the collected
+        articles contain `target` distinct stories scoring at least `threshold`.
+        Pass its add method as the scheduler's on_article to count articles as
+        they stream in, before their search finishes.
+        """
+        return QualityStop(self, context, target, threshold)
+
+
+class QualityStop:
+    """
+    Incremental early-stop check. Each article is scored once, whether it
+    arrives through add() (on_article) or in the articles the scheduler passes.
+    """
+
+    def __init__(self, ranker, context, target, threshold):
+        self.ranker = ranker
+        self.context = context
+        self.target = target
+        self.threshold = threshold
+        self._scored = set()
+        self._good = set()
+        self._lock = threading.Lock()
+
+    def add(self, article):
+        """Score one article; safe to call from the threads running the searches"""
+        url = canonicalize_url(article.get('link'))
+        key = (url, article.get('query'), article.get('source'), article.get('title'), article.get('snippet'))
+        with self._lock:
+            if key in self._scored or url in self._good:
+                return
+            self._scored.add(key)
+        if self.ranker.base_score(article, self.context) >= self.threshold:
+            with self._lock:
+                self._good.add(url)
+
+    def __call__(self, articles):
+        for article in articles:
+            self.add(article)
+        return len(self._good) >= self.target
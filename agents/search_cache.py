@@ -0,0 +1,132 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from config.storage import data_path
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    query TEXT NOT NULL,
+    source TEXT NOT NULL,
+    articles TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_search_cache_last_access ON search_cache (last_access);
+"""
+
+
+class SearchCache:
+    """
+    Disk-backed cache of parsed search_news results.
+
+    Entries are keyed on (query, source, prompt, freshness bucket), so a result
+    is only reused for the same prompt (e.g. PromptBuilder.fingerprint, which
+    changes with NEWS_PROMPT_MODE and NEWS_SUMMARY_WORDS) and within the same
+    freshness window (one UTC day by default). Entries
+    also expire after ttl_hours, and the least recently used entries are evicted
+    once the cache holds more than max_entries.
+    """
+
+    def __init__(self, path, ttl_hours=24, max_entries=1000, freshness_hours=24):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.freshness_seconds = max(freshness_hours, 1) * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from the NEWS_CACHE_* environment variables"""
+        return cls(
+            path=os.getenv('NEWS_CACHE_PATH') or data_path('search_cache.sqlite3'),
+            ttl_hours=float(os.getenv('NEWS_CACHE_TTL_HOURS', '24')),
+            max_entries=int(os.getenv('NEWS_CACHE_MAX_ENTRIES', '1000')),
+            freshness_hours=float(os.getenv('NEWS_CACHE_FRESHNESS_HOURS', '24')),
+        )
+
+    def make_key(self, query, source, now=None, prompt=''):
+        """Return the cache key for a search with a given prompt in the current freshness window"""
+        now = time.time() if now is None else now
+        bucket = int(now // self.freshness_seconds)
+        raw = f"{query.strip().lower()}\x1f{source.strip().lower()}\x1f{bucket}"
+        if prompt:
+            raw += f"\x1f{prompt}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, query, source, prompt=''):
+        """Return the cached articles for a search, or None on a miss"""
+        now = time.time()
+        key = self.make_key(query, source, now, prompt)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT articles, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        logger.info(f"Cache hit - Query: '{query}', Source: '{source}'")
+        return json.loads(row[0])
+
+    def put(self, query, source, articles, prompt=''):
+        """Store the parsed articles for a search and evict stale entries"""
+        now = time.time()
+        key = self.make_key(query, source, now, prompt)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache "
+                "(key, query, source, articles, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, query, source, json.dumps(articles), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then the least recently used beyond max_entries"""
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE key IN ("
+            "SELECT key FROM search_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def purge(self):
+        """Remove every cached entry"""
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM search_cache").rowcount
+            self._conn.commit()
+        logger.info(f"Purged {removed} cached searches")
+        return removed
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
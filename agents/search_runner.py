@@ -0,0 +1,404 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from instrumentation import get_metrics
+from rate_limiter import RateLimitExceeded, is_rate_limit_error, quota_wait_listener
+
+logger = logging.getLogger(__name__)
+
+# Rough token cost of one agent search (prompt, tool results and summaries)
+DEFAULT_TOKENS_PER_SEARCH = 5000
+
+
+def build_work_list(queries, sources):
+    """Expand a category's queries and sources into ordered (query, source) pairs"""
+    return [(query, source) for query in queries for source in sources]
+
+
+class CircuitBreaker:
+    """
+    Skip a source after failure_threshold consecutive failures or timeouts.
+
+    An open source is skipped for cooldown seconds; after that one trial
+    search is let through, and a success closes the breaker again. Keep one
+    breaker per process so a flaky source is remembered across categories
+    (and across runs in daemon mode).
+    """
+
+    def __init__(self, failure_threshold=2, cooldown=1800, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._lock = threading.Lock()
+        # source -> [consecutive failures, opened at or None, trial in progress]
+        self._state = {}
+
+    @classmethod
+    def from_env(cls):
+        """Build a breaker from NEWS_BREAKER_FAILURES and NEWS_BREAKER_COOLDOWN_SECONDS"""
+        return cls(
+            failure_threshold=int(os.getenv('NEWS_BREAKER_FAILURES', '2')),
+            cooldown=float(os.getenv('NEWS_BREAKER_COOLDOWN_SECONDS', '1800')),
+        )
+
+    def allow(self, source):
+        """Whether a search of source may run now"""
+        with self._lock:
+            state = self._state.get(source)
+            if state is None or state[1] is None:
+                return True
+            if self.clock() - state[1] >= self.cooldown and not state[2]:
+                state[2] = True
+                return True
+            return False
+
+    def record_success(self, source):
+        with self._lock:
+            self._state.pop(source, None)
+
+    def record_failure(self, source):
+        with self._lock:
+            state = self._state.setdefault(source, [0, None, False])
+            state[0] += 1
+            state[2] = False
+            if state[0] >= self.failure_threshold:
+                if state[1] is None:
+                    logger.warning(f"Circuit opened for {source} after {state[0]} failures; "
+                                   f"skipping it for {self.cooldown:g}s")
+                state[1] = self.clock()
+
+    def record_inconclusive(self, source):
+        """A search that says nothing about the source (throttled or cut off by the deadline) ended"""
+        with self._lock:
+            state = self._state.get(source)
+            if state is not None:
+                state[2] = False
+
+    def open_sources(self):
+        with self._lock:
+            return sorted(source for source, state in self._state.items() if state[1] is not None)
+
+
+class SearchAbandoned(Exception):
+    """The scheduler gave up on the search running in this thread"""
+
+
+_current_search = threading.local()
+
+
+class SearchClock:
+    """
+    Run time of one search, leaving out the time it spent waiting for
+    rate-limit quota, and whether the scheduler has abandoned it.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.waited = 0.0
+        self._wait_began = None
+        self.abandoned = threading.Event()
+
+    def waiting(self, is_waiting):
+        """quota_wait_listener callback, called from the thread running the search"""
+        now = self.clock()
+        if is_waiting:
+            self._wait_began = now
+        elif self._wait_began is not None:
+            self.waited += now - self._wait_began
+            self._wait_began = None
+
+    def elapsed(self, now=None):
+        now = self.clock() if now is None else now
+        wait_began = self._wait_began
+        waiting = now - wait_began if wait_began is not None else 0.0
+        return now - self.started - self.waited - waiting
+
+    def abandon(self):
+        self.abandoned.set()
+
+
+def search_abandoned():
+    """True inside a search whose scheduler has given up on it, so it can stop before spending more"""
+    clock = getattr(_current_search, 'clock', None)
+    return clock is not None and clock.abandoned.is_set()
+
+
+def raise_if_abandoned():
+    """Raise SearchAbandoned inside a search the scheduler gave up on, before it spends or records anything more"""
+    if search_abandoned():
+        raise SearchAbandoned("the search was abandoned after its timeout or the category deadline")
+
+
+class SearchScheduler:
+    """
+    Run every query × source search for a category and combine the results.
+
+    With max_workers > 1 the searches run concurrently, so the category
+    takes roughly as long as its slowest search. Articles are always returned
+    in query/source order, independent of completion order, and a search that
+    raises simply contributes no articles.
+
+    stop_condition, when given, is called with the articles collected so far
+    after each search completes; once it returns True no further searches are
+    started, and the skipped searches are counted in searches_skipped.
+
+    on_article, when given, receives each article as soon as its search hands it
+    over (possibly mid-generation), from the worker thread running that search.
+
+    search_timeout abandons a search that runs longer than that many seconds,
+    not counting time spent waiting for rate-limit quota, and deadline abandons
+    everything still running that many seconds after run() started; the
+    category then returns whatever finished. Without either, searches run on
+    the calling thread when max_workers is 1. Python cannot cancel a running
+    thread, so an abandoned search is only told to stop (search_abandoned()):
+    it starts no further LLM calls and records no tokens, and its result is
+    ignored. A search abandoned for its timeout keeps its worker slot until its
+    thread finishes, or for another search_timeout at most, so stuck searches
+    cannot pile up. A CircuitBreaker, when given, skips sources that keep
+    failing or timing out; being rate limited does not count as a failure.
+    """
+
+    def __init__(self, news_reader, max_workers=1, stop_condition=None, tokens_per_search=None,
+                 on_article=None, search_timeout=None, deadline=None, breaker=None):
+        self.news_reader = news_reader
+        self.max_workers = max(1, max_workers)
+        self.stop_condition = stop_condition
+        self.on_article = on_article
+        if tokens_per_search is None:
+            tokens_per_search = int(os.getenv('NEWS_TOKENS_PER_SEARCH', DEFAULT_TOKENS_PER_SEARCH))
+        self.tokens_per_search = tokens_per_search
+        self.search_timeout = search_timeout
+        self.deadline = deadline
+        self.breaker = breaker
+        self.searches_run = 0
+        self.searches_skipped = 0
+        self.searches_timed_out = 0
+        self.searches_broken = 0
+        self.deadline_hit = False
+        self._abandoned = set()
+
+    @property
+    def estimated_tokens_saved(self):
+        """Estimated LLM tokens not spent because of early stopping"""
+        return self.searches_skipped * self.tokens_per_search
+
+    def run(self, queries, sources):
+        """Run the searches and return the combined articles"""
+        work = build_work_list(queries, sources)
+        results = [None] * len(work)
+
+        if self.max_workers <= 1 and not (self.search_timeout or self.deadline):
+            for index, (query, source) in enumerate(work):
+                if not self._allowed(source):
+                    continue
+                try:
+                    results[index] = _run_search(self.news_reader, query, source, self._callback(index))
+                except Exception as e:
+                    results[index] = self._search_failed(query, source, e)
+                else:
+                    self._search_succeeded(source)
+                self.searches_run += 1
+                if self._should_stop(results):
+                    break
+        else:
+            self._run_concurrently(work, results)
+
+        self.searches_skipped = len(work) - self.searches_run - self.searches_broken
+        if self.searches_skipped and not self.deadline_hit:
+            logger.info(
+                f"Early stop skipped {self.searches_skipped} of {len(work)} searches "
+                f"(~{self.estimated_tokens_saved} tokens saved)"
+            )
+        return _flatten(results)
+
+    def _run_concurrently(self, work, results):
+        """Keep at most max_workers searches in flight until done, stopped or out of time"""
+        workers = min(self.max_workers, len(work))
+        logger.info(f"Running {len(work)} searches with {workers} workers")
+        pending_work = list(enumerate(work))
+        pending_work.reverse()
+        in_flight = {}
+        # Timed-out searches whose threads still hold a worker slot -> their clock
+        lingering = {}
+        stopped = False
+        deadline_at = time.monotonic() + self.deadline if self.deadline else None
+
+        def fill_slots():
+            while pending_work and len(in_flight) + len(lingering) < workers:
+                index, (query, source) = pending_work.pop()
+                if self._allowed(source):
+                    clock = SearchClock()
+                    future = run_in_thread(_run_search, self.news_reader, query, source,
+                                           self._callback(index), clock=clock)
+                    in_flight[future] = (index, query, source, clock)
+
+        fill_slots()
+        while in_flight or (lingering and pending_work and not stopped):
+            done, _ = wait(list(in_flight) + list(lingering),
+                           timeout=self._wait_timeout(in_flight, lingering, deadline_at),
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                if lingering.pop(future, None) is not None:
+                    continue
+                index, query, source, _ = in_flight.pop(future)
+                self.searches_run += 1
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = self._search_failed(query, source, e)
+                else:
+                    self._search_succeeded(source)
+
+            now = time.monotonic()
+            for future, (index, query, source, clock) in list(in_flight.items()):
+                if self.search_timeout and clock.elapsed(now) >= self.search_timeout:
+                    del in_flight[future]
+                    self._abandon(index, query, source, clock, 'timeout')
+                    lingering[future] = clock
+            for future, clock in list(lingering.items()):
+                if clock.elapsed(now) >= 2 * self.search_timeout:
+                    del lingering[future]
+            if deadline_at is not None and now >= deadline_at and not self.deadline_hit:
+                self.deadline_hit = stopped = True
+                logger.warning(f"Category deadline of {self.deadline:g}s reached, "
+                               f"abandoning {len(in_flight)} running searches")
+                for future, (index, query, source, clock) in list(in_flight.items()):
+                    del in_flight[future]
+                    self._abandon(index, query, source, clock, 'deadline')
+
+            if not stopped and self._should_stop(results):
+                stopped = True
+            if not stopped:
+                fill_slots()
+
+    def _wait_timeout(self, in_flight, lingering, deadline_at):
+        """Seconds until the next search could time out or free its slot, or the deadline; None waits indefinitely"""
+        now = time.monotonic()
+        limits = []
+        if self.search_timeout:
+            # A search waiting for quota is not running, so this may wake early and check again
+            limits.extend(now + self.search_timeout - clock.elapsed(now) for _, _, _, clock in in_flight.values())
+            limits.extend(now + 2 * self.search_timeout - clock.elapsed(now) for clock in lingering.values())
+        if deadline_at is not None:
+            limits.append(deadline_at)
+        return max(0.0, min(limits) - now) if limits else None
+
+    def _allowed(self, source):
+        if self.breaker is None or self.breaker.allow(source):
+            return True
+        self.searches_broken += 1
+        get_metrics().flag_source(source, 'circuit_open')
+        return False
+
+    def _abandon(self, index, query, source, clock, reason):
+        """Give up on a running search; it is told to stop and its result is ignored"""
+        self._abandoned.add(index)
+        clock.abandon()
+        self.searches_run += 1
+        if reason == 'timeout':
+            self.searches_timed_out += 1
+            logger.warning(f"Search timed out after {self.search_timeout:g}s - "
+                           f"Query: '{query}', Source: '{source}'")
+            if self.breaker is not None:
+                self.breaker.record_failure(source)
+        elif self.breaker is not None:
+            self.breaker.record_inconclusive(source)
+        get_metrics().flag_source(source, reason)
+
+    def _search_failed(self, query, source, error):
+        logger.error(f"Search failed - Query: '{query}', Source: '{source}': {str(error)}")
+        # Throttling is the provider's quota, not the source, so it never opens the circuit
+        if isinstance(error, RateLimitExceeded) or is_rate_limit_error(error):
+            if self.breaker is not None:
+                self.breaker.record_inconclusive(source)
+            get_metrics().flag_source(source, 'rate_limited')
+            return []
+        if self.breaker is not None:
+            self.breaker.record_failure(source)
+        get_metrics().flag_source(source, 'error')
+        return []
+
+    def _search_succeeded(self, source):
+        if self.breaker is not None:
+            self.breaker.record_success(source)
+
+    def _callback(self, index):
+        """on_article for one search, silenced once that search is abandoned"""
+        if self.on_article is None:
+            return None
+
+        def forward(article):
+            if index not in self._abandoned:
+                self.on_article(article)
+        return forward
+
+    def _should_stop(self, results):
+        if self.stop_condition is None:
+            return False
+        return bool(self.stop_condition(_flatten(results)))
+
+
+def run_searches(news_reader, queries, sources, max_workers=1, **options):
+    """Run every query × source search for a category and combine the results"""
+    return SearchScheduler(news_reader, max_workers=max_workers, **options).run(queries, sources)
+
+
+def _flatten(results):
+    all_news = []
+    for news_items in results:
+        if news_items:
+            all_news.extend(news_items)
+    return all_news
+
+
+def run_in_thread(func, *args, clock=None):
+    """
+    Run func on a daemon thread and return a Future for its result. Unlike a
+    pool worker, a stuck search does not hold up later searches or process exit.
+    The thread runs in a copy of the caller's context, so its metrics go to the
+    caller's category even if the caller has moved on. With a SearchClock, the
+    clock leaves out the thread's quota waits and search_abandoned() tells the
+    thread when the clock has been abandoned.
+    """
+    future = Future()
+    context = contextvars.copy_context()
+
+    def target():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(context.run(_run_tracked, clock, func, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=target, name='search', daemon=True).start()
+    return future
+
+
+def _run_tracked(clock, func, *args):
+    if clock is None:
+        return func(*args)
+    _current_search.clock = clock
+    try:
+        with quota_wait_listener(clock.waiting):
+            return func(*args)
+    finally:
+        _current_search.clock = None
+
+
+def _run_search(news_reader, query, source, on_article=None):
+    """Run a single search and tag its articles; failures propagate to the scheduler"""
+    if on_article is None:
+        news_items = news_reader.search_news(query, source, raise_errors=True) or []
+    else:
+        def tagged(article):
+            on_article(dict(article, query=article.get('query', query),
+                            source=article.get('source', source)))
+        news_items = news_reader.search_news(query, source, on_article=tagged, raise_errors=True) or []
+    return [dict(article, query=article.get('query', query), source=article.get('source', source))
+            for article in news_items]
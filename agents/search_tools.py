@@ -0,0 +1,55 @@
+"""CrewAI tools and LLMs whose requests go through the shared rate limiters"""
+import os
+
+from crewai import LLM
+from crewai_tools import SerperDevTool
+
+from agents.prompts import count_tokens
+from agents.search_runner import raise_if_abandoned
+from rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL, rate_limited_call
+
+
+class RateLimitedSerperDevTool(SerperDevTool):
+    """SerperDevTool whose requests wait for the shared Serper quota and are retried on 429s"""
+
+    def _run(self, **kwargs):
+        def request():
+            raise_if_abandoned()
+            return super(RateLimitedSerperDevTool, self)._run(**kwargs)
+        return rate_limited_call('serper', request)
+
+
+class RateLimitedLLM(LLM):
+    """
+    LLM whose every request waits for the shared OpenAI quota and is retried
+    on 429s. A crew run makes several requests (tool calls and the answer),
+    so each one is counted, and a 429 repeats that request, not the crew run.
+    """
+
+    priority = PRIORITY_NORMAL
+
+    def call(self, messages, *args, **kwargs):
+        def request():
+            # A search the scheduler gave up on sends no further requests
+            raise_if_abandoned()
+            return super(RateLimitedLLM, self).call(messages, *args, **kwargs)
+        return rate_limited_call('openai', request, tokens=count_tokens(_message_text(messages)),
+                                 priority=self.priority)
+
+
+class SummaryLLM(RateLimitedLLM):
+    """A staged summary finishes a whole category, so it goes ahead of queued searches"""
+
+    priority = PRIORITY_HIGH
+
+
+def _message_text(messages):
+    if isinstance(messages, str):
+        return messages
+    return '\n'.join(str(message.get('content') or '') for message in messages)
+
+
+def build_llm(llm_class=RateLimitedLLM, stream=False):
+    """An OPENAI_MODEL_NAME LLM of llm_class, streaming its output if asked"""
+    options = {'stream': True} if stream else {}
+    return llm_class(model=os.getenv('OPENAI_MODEL_NAME', 'gpt-4o-mini'), **options)
@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from agents.dedup import canonicalize_url
+from config.storage import data_path
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen_articles (
+    canonical_url TEXT PRIMARY KEY,
+    title_hash TEXT NOT NULL,
+    title TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    sent_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_seen_articles_title_hash ON seen_articles (title_hash);
+CREATE INDEX IF NOT EXISTS idx_seen_articles_last_seen ON seen_articles (last_seen);
+"""
+
+
+def title_hash(title):
+    """Hash of a title's words, insensitive to case and punctuation"""
+    normalized = ' '.join(_WORD.findall((title or '').lower()))
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+class SeenLedger:
+    """
+    Persistent record of every article searches returned and digests sent.
+
+    Articles that were already sent (matched by canonical URL or title hash)
+    are filtered out of later runs. Rows not seen for retention_days are
+    removed by compact().
+    """
+
+    def __init__(self, path, retention_days=30):
+        self.path = path
+        self.retention_days = retention_days
+        self.skipped = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Build a ledger from NEWS_LEDGER_PATH and NEWS_LEDGER_RETENTION_DAYS"""
+        return cls(
+            path=os.getenv('NEWS_LEDGER_PATH') or data_path('seen_articles.sqlite3'),
+            retention_days=float(os.getenv('NEWS_LEDGER_RETENTION_DAYS', '30')),
+        )
+
+    def _upsert(self, articles, sent):
+        now = time.time()
+        rows = []
+        for article in articles:
+            url = canonicalize_url(article.get('link'))
+            if url:
+                rows.append((url, title_hash(article.get('title')), article.get('title', ''),
+                             now, now, now if sent else None))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO seen_articles "
+                "(canonical_url, title_hash, title, first_seen, last_seen, sent_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (canonical_url) DO UPDATE SET "
+                "last_seen = excluded.last_seen, "
+                "sent_at = COALESCE(excluded.sent_at, seen_articles.sent_at)",
+                rows
+            )
+            self._conn.commit()
+
+    def record_returned(self, articles):
+        """Record articles a search returned"""
+        self._upsert(articles, sent=False)
+
+    def record_sent(self, articles):
+        """Record articles included in a delivered digest"""
+        self._upsert(articles, sent=True)
+
+    def filter_unseen(self, articles):
+        """Drop articles that were already sent; returns (new_articles, skipped_count)"""
+        if not articles:
+            return [], 0
+        urls = [canonicalize_url(article.get('link')) for article in articles]
+        hashes = [title_hash(article.get('title')) for article in articles]
+        with self._lock:
+            sent_urls = self._lookup('canonical_url', urls)
+            sent_hashes = self._lookup('title_hash', hashes)
+
+        new_articles = [
+            article for article, url, hashed in zip(articles, urls, hashes)
+            if url not in sent_urls and hashed not in sent_hashes
+        ]
+        skipped = len(articles) - len(new_articles)
+        with self._lock:
+            self.skipped += skipped
+        if skipped:
+            logger.info(f"Skipped {skipped} already sent articles")
+        return new_articles, skipped
+
+    def _lookup(self, column, values):
+        found = set()
+        values = list(set(v for v in values if v))
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(values), 500):
+            batch = values[start:start + 500]
+            placeholders = ','.join('?' * len(batch))
+            found.update(row[0] for row in self._conn.execute(
+                f"SELECT {column} FROM seen_articles "
+                f"WHERE sent_at IS NOT NULL AND {column} IN ({placeholders})",
+                batch
+            ))
+        return found
+
+    def compact(self):
+        """Remove rows not seen within the retention window and reclaim space"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self._lock:
+            removed = self._conn.execute(
+                "DELETE FROM seen_articles WHERE last_seen < ?", (cutoff,)
+            ).rowcount
+            self._conn.commit()
+            if removed:
+                self._conn.execute("VACUUM")
+        if removed:
+            logger.info(f"Compacted seen-article ledger, removed {removed} old entries")
+        return removed
+
+    def stats(self):
+        """Return ledger size and how many articles this run skipped"""
+        with self._lock:
+            total, sent = self._conn.execute(
+                "SELECT COUNT(*), COUNT(sent_at) FROM seen_articles"
+            ).fetchone()
+        return {'entries': total, 'sent': sent, 'skipped_this_run': self.skipped}
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
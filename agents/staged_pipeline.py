@@ -0,0 +1,194 @@
+import logging
+import re
+
+from agents.dedup import deduplicate_articles
+from agents.output_parser import parse_articles, validate_articles
+from agents.prompts import PromptBuilder, count_tokens, usage_total_tokens
+from agents.ranking import RankingContext, RankingEngine
+from agents.search_runner import run_searches
+from instrumentation import crew_verbose, get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Matches the "Title: / Link: / Snippet:" text older crewai_tools versions return
+_TEXT_RESULT_FIELD = re.compile(r'^(Title|Link|Snippet|Date):\s*(.*)$')
+
+
+class SerperRetriever:
+    """
+    Stage 1: fetch raw search hits straight from Serper, without an LLM.
+
+    Exposes the same search_news(query, source) signature as NewsReaderAgent,
+    so it can be fanned out with run_searches.
+    """
+
+    def __init__(self, results_per_search=10, tool=None):
+        self.results_per_search = results_per_search
+        if tool is None:
+            from agents.search_tools import RateLimitedSerperDevTool
+            tool = RateLimitedSerperDevTool(n_results=results_per_search)
+        self.tool = tool
+
+    def search_news(self, query, source, raise_errors=True):
+        """Return raw hits for a query restricted to a single source site; Serper errors propagate"""
+        with get_metrics().stage('serper_search'):
+            response = self.tool.run(search_query=f"{query} site:{source}")
+        hits = self._extract_hits(response)
+        for hit in hits:
+            hit['query'] = query
+            hit['source'] = source
+        logger.info(f"Retrieved {len(hits)} raw hits - Query: '{query}', Source: '{source}'")
+        return hits
+
+    def _extract_hits(self, response):
+        """Normalize a SerperDevTool response (dict or formatted text) into hit dicts"""
+        if isinstance(response, dict):
+            organic = response.get('organic') or response.get('news') or []
+            return [
+                {
+                    'title': (item.get('title') or '').strip(),
+                    'link': (item.get('link') or '').strip(),
+                    'snippet': (item.get('snippet') or '').strip(),
+                    'date': item.get('date', ''),
+                }
+                for item in organic
+            ]
+
+        hits = []
+        current_hit = {}
+        for line in str(response or '').split('\n'):
+            line = line.strip()
+            if line.startswith('Search results:'):
+                line = line[len('Search results:'):].strip()
+            match = _TEXT_RESULT_FIELD.match(line)
+            if not match:
+                continue
+            field, value = match.group(1).lower(), match.group(2).strip()
+            if field == 'title' and current_hit:
+                hits.append(current_hit)
+                current_hit = {}
+            current_hit[field] = value
+        if current_hit:
+            hits.append(current_hit)
+        return hits
+
+
+def select_hits(hits, top_n=5, ranker=None, context=None):
+    """Stage 2: drop incomplete hits and duplicate stories, then keep the N best ranked"""
+    complete = [hit for hit in hits if hit.get('title') and hit.get('link')]
+    unique_hits, merged_count = deduplicate_articles(complete)
+    logger.info(f"Stage 2 merged {merged_count} duplicate hits")
+    ranker = ranker or RankingEngine()
+    return ranker.top(unique_hits, context or RankingContext(), limit=top_n)
+
+
+def summarize_hits(hits, crew_factory=None, prompts=None, token_budget=None):
+    """
+    Stage 3: summarize the selected hits with a single batched LLM request.
+    crew_factory(description) can replace the CrewAI summary crew.
+    With a TokenBudget, TokenBudgetExceeded is raised instead of going over it.
+    """
+    if not hits:
+        return []
+
+    article_list = '\n\n'.join(
+        f"TITLE: {hit['title']}\nURL: {hit['link']}\nSEARCH SNIPPET: {hit.get('snippet', '')}"
+        for hit in hits
+    )
+
+    prompts = prompts or PromptBuilder()
+    description = prompts.summary_task(article_list, len(hits))
+    crew = crew_factory(description) if crew_factory else _build_summary_crew(description)
+
+    metrics = get_metrics()
+    estimate = count_tokens(description) + prompts.completion_tokens(len(hits))
+    if token_budget is not None:
+        token_budget.reserve(estimate)
+    logger.info(f"Summarizing {len(hits)} articles in one request...")
+    try:
+        with metrics.stage('crew_kickoff'):
+            result = crew.kickoff()
+    except Exception:
+        if token_budget is not None:
+            token_budget.release(estimate)
+        raise
+    usage = getattr(result, 'token_usage', None)
+    metrics.record_tokens(usage)
+    if token_budget is not None:
+        token_budget.settle(estimate, usage_total_tokens(usage))
+    with metrics.stage('parse'):
+        summaries = validate_articles(parse_articles(result.raw)) if result and result.raw else []
+    summaries_by_link = {article['link']: article for article in summaries}
+
+    # Keep the retrieval order; fall back to the search snippet if a summary is missing
+    articles = []
+    for hit in hits:
+        article = dict(hit)
+        summarized = summaries_by_link.get(hit['link'])
+        if summarized:
+            article['snippet'] = summarized['snippet']
+        else:
+            logger.warning(f"No summary returned for: {hit['title']}")
+        if article.get('snippet'):
+            articles.append(article)
+    return articles
+
+
+def _build_summary_crew(description):
+    from crewai import Agent, Task, Crew, Process
+    from agents.search_tools import SummaryLLM, build_llm
+
+    summary_agent = Agent(
+        role='Medical News Editor',
+        goal='Summarize the latest medical AI news in a way that is easy for doctors to understand',
+        backstory='I am an AI assistant specialized in making complex medical technology news accessible to healthcare professionals. I provide detailed, comprehensive summaries that capture the full context and implications of each article.',
+        tools=[],
+        # Its request waits for the shared OpenAI quota ahead of queued searches
+        llm=build_llm(SummaryLLM)
+    )
+    summary_task = Task(
+        description=description,
+        expected_output="A list of articles with complete titles, URLs, and detailed paragraph summaries in the exact specified format",
+        agent=summary_agent
+    )
+    return Crew(
+        agents=[summary_agent],
+        tasks=[summary_task],
+        process=Process.sequential,
+        verbose=crew_verbose()
+    )
+
+
+def run_staged_pipeline(queries, sources, top_n=5, max_workers=1, results_per_search=10,
+                        ranker=None, ledger=None, search_tool=None, crew_factory=None,
+                        prompts=None, token_budget=None, search_timeout=None, deadline=None,
+                        breaker=None):
+    """
+    Retrieve raw hits for every query × source, select the top N, and
+    summarize only those, so a category costs one LLM call instead of one per search.
+    With a SeenLedger, hits that were already sent are dropped before summarizing.
+    search_tool and crew_factory replace the Serper tool and summary crew.
+    prompts and token_budget shape and cap the summary request; over budget,
+    the digest falls back to the search snippets.
+    search_timeout, deadline and breaker limit stage 1 as in SearchScheduler.
+    """
+    retriever = SerperRetriever(results_per_search=results_per_search, tool=search_tool)
+    hits = run_searches(retriever, queries, sources, max_workers=max_workers,
+                        search_timeout=search_timeout, deadline=deadline, breaker=breaker)
+    logger.info(f"Stage 1 retrieved {len(hits)} raw hits")
+
+    if ledger is not None:
+        ledger.record_returned(hits)
+        hits, _ = ledger.filter_unseen(hits)
+
+    context = RankingContext(queries=queries, sources=sources)
+    selected = select_hits(hits, top_n=top_n, ranker=ranker, context=context)
+    logger.info(f"Stage 2 selected {len(selected)} of {len(hits)} hits")
+
+    try:
+        return summarize_hits(selected, crew_factory=crew_factory, prompts=prompts,
+                              token_budget=token_budget)
+    except Exception as e:
+        logger.error(f"Error summarizing articles: {str(e)}", exc_info=True)
+        # Still deliver the digest using the raw search snippets
+        return [hit for hit in selected if hit.get('snippet')]
@@ -0,0 +1,59 @@
+"""
+Measure the object-construction cost saved per search by the CrewPool.
+
+Compares building a new Agent/SerperDevTool/Task/Crew for every search (the
+old behaviour) with borrowing a pre-built crew from the pool. No search is
+kicked off, so no API credits are used; dummy keys are set if none exist.
+
+    python benchmarks/agent_pool_bench.py --searches 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('OPENAI_API_KEY', 'sk-benchmark')
+os.environ.setdefault('SERPER_API_KEY', 'benchmark')
+
+from agents.news_reader import NewsReaderAgent  # noqa: E402
+
+
+def time_per_search(fn, searches):
+    start = time.perf_counter()
+    for _ in range(searches):
+        fn()
+    return (time.perf_counter() - start) / searches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark pooled vs per-search crew construction')
+    parser.add_argument('--searches', type=int, default=50, help='Number of simulated searches')
+    args = parser.parse_args()
+
+    reader = NewsReaderAgent()
+
+    def rebuild():
+        # Old behaviour: a fresh tool, agent, task and crew for every search
+        reader.search_tool = reader.search_tool.__class__()
+        reader._build_search_crew()
+
+    def pooled():
+        with reader.crew_pool.acquire():
+            pass
+
+    rebuild_seconds = time_per_search(rebuild, args.searches)
+    pooled_seconds = time_per_search(pooled, args.searches)
+
+    print(json.dumps({
+        'searches': args.searches,
+        'rebuild_ms_per_search': round(rebuild_seconds * 1000, 3),
+        'pooled_ms_per_search': round(pooled_seconds * 1000, 3),
+        'saved_ms_per_search': round((rebuild_seconds - pooled_seconds) * 1000, 3),
+        'pool': reader.crew_pool.stats(),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Offline stand-ins for Serper, the LLM crew and the email provider.
+
+They plug into the real pipeline through its injection points
+(NewsReaderAgent(crew_factory=...), run_staged_pipeline(search_tool=...,
+crew_factory=...), DeliveryService(RecordingTransport())) so benchmarks
+exercise the production code paths without spending API credits.
+"""
+import random
+import re
+import time
+import zlib
+
+from Gateway.delivery import RecordingTransport  # noqa: F401  (re-exported for benchmarks)
+
+_STEMS = ("clinical model study patient imaging workflow accuracy validation hospital surgeon "
+          "radiology outcome deployment trial dataset algorithm safety cohort screening triage").split()
+# Enough distinct words that unrelated stories do not look like near-duplicates
+_VOCABULARY = [f'{stem}{suffix}' for stem in _STEMS for suffix in ('', 's', 'ed', 'ing', 'al', 'ly')]
+_ARTICLE_LINE = re.compile(r'^(TITLE|URL): (.*)$')
+
+
+class FakeUsage:
+    """Mimics CrewOutput.token_usage"""
+
+    def __init__(self, prompt_tokens, completion_tokens, successful_requests=1):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        self.total_tokens = prompt_tokens + completion_tokens
+        self.successful_requests = successful_requests
+
+
+class FakeCrewOutput:
+    """Mimics CrewOutput: .raw text plus .token_usage"""
+
+    def __init__(self, raw, prompt_tokens):
+        self.raw = raw
+        # Roughly four characters per token
+        self.token_usage = FakeUsage(prompt_tokens, len(raw) // 4)
+
+
+def _summary(seed, words):
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(_VOCABULARY) for _ in range(words))
+
+
+def _story_id(*parts):
+    return zlib.crc32('|'.join(parts).encode('utf-8'))
+
+
+class FakeSearchCrew:
+    """
+    Stub LLM search crew emitting TITLE/URL/SUMMARY blocks.
+
+    Stories are drawn from a pool of `story_pool` per source, so overlapping
+    queries return some of the same URLs, as the real searches do. Like a
+    CrewAI crew, its token_usage is a running total over every kickoff.
+    """
+
+    def __init__(self, latency=0.0, articles_per_search=5, summary_words=170, story_pool=8):
+        self.latency = latency
+        self.articles_per_search = articles_per_search
+        self.summary_words = summary_words
+        self.story_pool = story_pool
+        self.usage = FakeUsage(0, 0, successful_requests=0)
+
+    def calculate_usage_metrics(self):
+        return self.usage
+
+    def kickoff(self, inputs=None):
+        if self.latency:
+            time.sleep(self.latency)
+        query = (inputs or {}).get('query', 'medical AI')
+        source = (inputs or {}).get('source', 'example.com')
+        blocks = []
+        for i in range(self.articles_per_search):
+            story = (_story_id(query) + i) % self.story_pool
+            seed = _story_id(source, str(story))
+            blocks.append(
+                f"TITLE: {source} story {story}: {_summary(seed, 8)}\n"
+                f"URL: https://{source}/news/story-{story}\n"
+                f"SUMMARY: {_summary(seed, self.summary_words)}"
+            )
+        output = FakeCrewOutput('\n\n'.join(blocks) + '\n', prompt_tokens=1200)
+        spent = output.token_usage
+        self.usage = FakeUsage(self.usage.prompt_tokens + spent.prompt_tokens,
+                               self.usage.completion_tokens + spent.completion_tokens,
+                               self.usage.successful_requests + 1)
+        output.token_usage = self.usage
+        return output
+
+
+class FakeSummaryCrew:
+    """Stub LLM summary crew: summarizes every TITLE/URL pair listed in its task description"""
+
+    def __init__(self, description, latency=0.0, summary_words=170):
+        self.description = description
+        self.latency = latency
+        self.summary_words = summary_words
+
+    def kickoff(self, inputs=None):
+        if self.latency:
+            time.sleep(self.latency)
+        blocks = []
+        title = None
+        for line in self.description.split('\n'):
+            match = _ARTICLE_LINE.match(line.strip())
+            if not match:
+                continue
+            if match.group(1) == 'TITLE':
+                title = match.group(2)
+            elif title is not None:
+                seed = _story_id(match.group(2))
+                blocks.append(f"TITLE: {title}\nURL: {match.group(2)}\n"
+                              f"SUMMARY: {_summary(seed, self.summary_words)}")
+                title = None
+        return FakeCrewOutput('\n\n'.join(blocks) + '\n', prompt_tokens=len(self.description) // 4)
+
+
+class FakeSearchTool:
+    """Stub SerperDevTool returning `results` organic hits per query"""
+
+    def __init__(self, latency=0.0, results=10, story_pool=12):
+        self.latency = latency
+        self.results = results
+        self.story_pool = story_pool
+        self.calls = 0
+
+    def run(self, search_query=''):
+        if self.latency:
+            time.sleep(self.latency)
+        self.calls += 1
+        query, _, source = search_query.partition(' site:')
+        organic = []
+        for i in range(self.results):
+            story = (_story_id(query) + i) % self.story_pool
+            seed = _story_id(source, str(story))
+            organic.append({
+                'title': f"{source} story {story}: {_summary(seed, 8)}",
+                'link': f"https://{source}/news/story-{story}",
+                'snippet': _summary(seed, 30),
+                'date': f"{1 + story % 6} days ago",
+            })
+        return {'organic': organic}
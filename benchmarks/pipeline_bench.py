@@ -0,0 +1,212 @@
+"""
+Offline end-to-end benchmark of the news pipeline.
+
+Runs search -> dedup -> rank -> render/assemble -> deliver against the stand-ins
+in benchmarks/fakes.py, scaling categories, queries, sources and recipients,
+and reports per-stage latency, throughput, peak memory and allocation counts
+as JSON. Compare against a saved baseline to catch regressions:
+
+    python benchmarks/pipeline_bench.py --categories 3,12 --recipients 100,5000 \
+        --output bench.json
+    python benchmarks/pipeline_bench.py --categories 3,12 --recipients 100,5000 \
+        --baseline bench.json --tolerance 0.25
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The stand-ins have no quotas; set NEWS_RATE_* explicitly to simulate provider limits
+for _provider in ('SERPER', 'OPENAI', 'RESEND'):
+    os.environ.setdefault(f'NEWS_RATE_{_provider}_RPM', '0')
+    os.environ.setdefault(f'NEWS_RATE_{_provider}_TPM', '0')
+
+from agents.dedup import deduplicate_articles  # noqa: E402
+from agents.news_reader import NewsReaderAgent  # noqa: E402
+from agents.ranking import RankingContext, RankingEngine  # noqa: E402
+from agents.search_runner import SearchScheduler  # noqa: E402
+from agents.staged_pipeline import run_staged_pipeline  # noqa: E402
+from benchmarks.fakes import (  # noqa: E402
+    FakeSearchCrew, FakeSearchTool, FakeSummaryCrew, RecordingTransport
+)
+from Gateway.delivery import DeliveryService  # noqa: E402
+from Gateway.subscriptions import DigestAssembler, group_recipients  # noqa: E402
+from instrumentation import reset_metrics  # noqa: E402
+
+STAGES = ('search', 'dedup', 'rank', 'render', 'deliver')
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item]
+
+
+def build_scenario(categories, queries, sources, recipients, seed=7):
+    """Synthetic category config and subscriptions for one benchmark scenario"""
+    config = {
+        f'specialty{c}': {
+            'queries': [f'AI topic{q} specialty{c}' for q in range(queries)],
+            'sources': [f'source{s}.specialty{c}.example.com' for s in range(sources)],
+        }
+        for c in range(categories)
+    }
+    names = list(config)
+    rng = random.Random(seed)
+    subscriptions = {
+        f'reader{r}@example.com': frozenset(rng.sample(names, rng.randint(1, min(3, len(names)))))
+        for r in range(recipients)
+    }
+    return config, subscriptions
+
+
+def run_pipeline(config, subscriptions, args, spool_dir):
+    """Run every stage once, returning per-stage seconds and counters"""
+    timings = dict.fromkeys(STAGES, 0.0)
+    counters = {'raw_articles': 0, 'unique_articles': 0, 'emails': 0, 'distinct_digests': 0}
+    metrics = reset_metrics()
+    transport = RecordingTransport()
+    delivery = DeliveryService(transport, spool_dir=spool_dir)
+    reader = NewsReaderAgent(
+        ranker=RankingEngine(),
+        delivery=delivery,
+        crew_factory=lambda: FakeSearchCrew(latency=args.llm_latency, summary_words=args.summary_words)
+    )
+    search_tool = FakeSearchTool(latency=args.search_latency)
+
+    category_articles = {}
+    for category, category_config in config.items():
+        queries, sources = category_config['queries'], category_config['sources']
+        start = time.perf_counter()
+        with metrics.for_category(category):
+            if args.pipeline == 'staged':
+                news = run_staged_pipeline(
+                    queries, sources, max_workers=args.workers, ranker=reader.ranker,
+                    search_tool=search_tool,
+                    crew_factory=lambda description: FakeSummaryCrew(
+                        description, latency=args.llm_latency, summary_words=args.summary_words
+                    )
+                )
+            else:
+                news = SearchScheduler(reader, max_workers=args.workers).run(queries, sources)
+        timings['search'] += time.perf_counter() - start
+        counters['raw_articles'] += len(news)
+
+        start = time.perf_counter()
+        news, _ = deduplicate_articles(news)
+        timings['dedup'] += time.perf_counter() - start
+        counters['unique_articles'] += len(news)
+
+        start = time.perf_counter()
+        context = RankingContext(queries=queries, sources=sources)
+        category_articles[category] = reader.select_top_articles(news, category, context)
+        timings['rank'] += time.perf_counter() - start
+
+    groups = group_recipients(subscriptions, list(config))
+    assembler = DigestAssembler(category_articles, renderer=reader.renderer)
+    chunks = assembler.iter_message_chunks(
+        groups, lambda html, text, recipients: reader.build_message(html, text, recipients)
+    )
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        timings['render'] += time.perf_counter() - start
+        if chunk is None:
+            break
+        start = time.perf_counter()
+        reader.send_messages(chunk)
+        timings['deliver'] += time.perf_counter() - start
+        counters['emails'] += len(chunk)
+    counters['distinct_digests'] = assembler.rendered_count
+    counters['llm_tokens'] = metrics.report()['tokens']['total']
+    return timings, counters
+
+
+def bench_scenario(categories, queries, sources, recipients, args):
+    config, subscriptions = build_scenario(categories, queries, sources, recipients)
+    with tempfile.TemporaryDirectory() as spool_dir:
+        start = time.perf_counter()
+        timings, counters = run_pipeline(config, subscriptions, args, spool_dir)
+        total = time.perf_counter() - start
+
+        # Memory is measured in a separate pass; tracing slows everything down
+        tracemalloc.start()
+        run_pipeline(config, subscriptions, args, spool_dir)
+        _, peak = tracemalloc.get_traced_memory()
+        allocations = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+        tracemalloc.stop()
+
+    return {
+        'scenario': {'categories': categories, 'queries': queries, 'sources': sources,
+                     'recipients': recipients, 'workers': args.workers, 'pipeline': args.pipeline},
+        'e2e_seconds': round(total, 4),
+        'stage_seconds': {stage: round(seconds, 4) for stage, seconds in timings.items()},
+        'articles_per_second': round(counters['raw_articles'] / total, 1) if total else None,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'live_allocations': allocations,
+        **counters,
+    }
+
+
+def scenario_key(result):
+    return json.dumps(result['scenario'], sort_keys=True)
+
+
+def find_regressions(results, baseline_path, tolerance):
+    """Return descriptions of scenarios slower than the baseline by more than tolerance"""
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = {scenario_key(result): result for result in json.load(baseline_file)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if previous and result['e2e_seconds'] > previous['e2e_seconds'] * (1 + tolerance):
+            regressions.append(
+                f"{scenario_key(result)}: {previous['e2e_seconds']}s -> {result['e2e_seconds']}s"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of the news pipeline')
+    parser.add_argument('--categories', type=_int_list, default=[3], help='Comma-separated category counts')
+    parser.add_argument('--queries', type=_int_list, default=[3], help='Comma-separated queries per category')
+    parser.add_argument('--sources', type=_int_list, default=[3], help='Comma-separated sources per category')
+    parser.add_argument('--recipients', type=_int_list, default=[100], help='Comma-separated recipient counts')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent searches')
+    parser.add_argument('--pipeline', choices=('agent', 'staged'), default='agent')
+    parser.add_argument('--llm-latency', type=float, default=0.0, help='Seconds per stub LLM call')
+    parser.add_argument('--search-latency', type=float, default=0.0, help='Seconds per stub Serper call')
+    parser.add_argument('--summary-words', type=int, default=170, help='Words per stub summary')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Earlier --output file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs baseline')
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = [
+        bench_scenario(categories, queries, sources, recipients, args)
+        for categories, queries, sources, recipients in itertools.product(
+            args.categories, args.queries, args.sources, args.recipients
+        )
+    ]
+    report = json.dumps({'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(report)
+    print(report)
+
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Cold-start benchmark of the news_manager CLI.
+
+Each command runs in a fresh interpreter, the way cron or a health check
+starts it, and its wall-clock time is reported as JSON. The benchmark also
+lists the heavy dependencies a plain `import news_manager` loads (there
+should be none) and, with --importtime, the slowest imports. Compare against
+a saved run to catch regressions:
+
+    python benchmarks/startup_bench.py --runs 10 --output startup.json
+    python benchmarks/startup_bench.py --runs 10 --baseline startup.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that should only be imported when a run actually needs them
+HEAVY_MODULES = ('crewai', 'crewai_tools', 'resend', 'markdown2', 'pydantic', 'pydantic_settings',
+                 'requests', 'tiktoken', 'litellm', 'openai')
+
+COMMANDS = {
+    'import': [sys.executable, '-c', 'import news_manager'],
+    'help': [sys.executable, 'news_manager.py', '--help'],
+    # Needs the API keys in the environment or .env to pass, but is timed either way
+    'check': [sys.executable, 'news_manager.py', '--check'],
+}
+
+
+def time_command(command, runs):
+    """Run a command `runs` times in fresh interpreters; returns seconds per run and the last exit code"""
+    timings = []
+    returncode = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        returncode = subprocess.run(command, cwd=ROOT, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.DEVNULL).returncode
+        timings.append(time.perf_counter() - start)
+    return timings, returncode
+
+
+def heavy_modules_loaded():
+    """Heavy dependencies present in sys.modules after importing news_manager"""
+    probe = ('import json, sys, news_manager; '
+             f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))')
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, capture_output=True,
+                            text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit):
+    """Top imports of news_manager by cumulative time, from python -X importtime"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import news_manager'],
+                            cwd=ROOT, capture_output=True, text=True).stderr
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append({'module': name.strip(), 'cumulative_ms': round(int(cumulative) / 1000, 2)})
+    return sorted(imports, key=lambda entry: entry['cumulative_ms'], reverse=True)[:limit]
+
+
+def find_regressions(results, baseline_path, tolerance):
+    """Return descriptions of commands whose median got slower than the baseline by more than tolerance"""
+    with open(baseline_path, encoding='utf-8') as baseline_file:
+        baseline = {result['command']: result for result in json.load(baseline_file)['results']}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result['command'])
+        if previous and result['median_ms'] > previous['median_ms'] * (1 + tolerance):
+            regressions.append(f"{result['command']}: {previous['median_ms']}ms -> {result['median_ms']}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark of the news_manager CLI')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters per command')
+    parser.add_argument('--commands', default=','.join(COMMANDS),
+                        help=f"Comma-separated commands to time ({', '.join(COMMANDS)})")
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='Also report the N slowest imports of news_manager')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Earlier --output file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown vs baseline')
+    args = parser.parse_args()
+
+    results = []
+    for name in args.commands.split(','):
+        timings, returncode = time_command(COMMANDS[name], args.runs)
+        results.append({
+            'command': name,
+            'runs': args.runs,
+            'exit_code': returncode,
+            'min_ms': round(min(timings) * 1000, 1),
+            'median_ms': round(statistics.median(timings) * 1000, 1),
+            'max_ms': round(max(timings) * 1000, 1),
+        })
+    report = {'results': results, 'heavy_modules_on_import': heavy_modules_loaded()}
+    if args.importtime:
+        report['slowest_imports'] = slowest_imports(args.importtime)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write(output)
+    print(output)
+
+    if args.baseline:
+        regressions = find_regressions(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
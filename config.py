@@ -1,4 +1,4 @@
-from pydantic import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import List
 
 class Settings(BaseSettings):
@@ -17,5 +17,5 @@ class Settings(BaseSettings):
     EMAIL_SUBJECT: str = "Daily Medical & Surgical News Digest"
     EMAIL_SENDER: str = "Rosetta Medical News <onboarding@resend.dev>"
     
-    class Config:
-        env_file = ".env"
\ No newline at end of file
+    # .env also holds the API keys, which are not settings fields
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
\ No newline at end of file
@@ -1,5 +1,3 @@
-from pydantic_settings import BaseSettings
-
 NEWS_CATEGORIES = {
     'radiology': {
         'sources': [
@@ -0,0 +1,137 @@
+"""
+NEWS_CATEGORIES and the run settings, validated once and compiled into an
+immutable execution plan: each category's deduplicated query × source work list.
+"""
+import re
+from types import MappingProxyType
+from typing import Mapping, NamedTuple, Optional, Tuple
+
+import config.news_sources
+
+PIPELINES = ('agent', 'staged')
+
+_SPACES = re.compile(r'\s+')
+_SCHEME = re.compile(r'^[a-z]+://')
+
+
+class SearchUnit(NamedTuple):
+    category: str
+    query: str
+    source: str
+
+
+class CategoryPlan(NamedTuple):
+    name: str
+    queries: Tuple[str, ...]
+    sources: Tuple[str, ...]
+    schedule: Optional[str]
+    units: Tuple[SearchUnit, ...]
+
+
+class ExecutionPlan(NamedTuple):
+    categories: Mapping[str, CategoryPlan]
+
+    @property
+    def names(self):
+        return tuple(self.categories)
+
+    @property
+    def units(self):
+        """Every category's search units, in config order"""
+        return tuple(unit for plan in self.categories.values() for unit in plan.units)
+
+    def category(self, name):
+        """Return a category's plan; raises ValueError for unknown categories"""
+        try:
+            return self.categories[name]
+        except KeyError:
+            raise ValueError(f"Invalid category: {name}")
+
+
+class RunSettings(NamedTuple):
+    max_workers: int = 1
+    pipeline: str = 'agent'
+    early_stop: int = 0
+    min_score: float = 0.5
+    search_timeout: Optional[float] = None
+    deadline: Optional[float] = None
+
+
+def _unique(values, normalize, what, category):
+    """Normalized values in first-seen order, without duplicates"""
+    if isinstance(values, str) or not isinstance(values, (list, tuple)):
+        raise ValueError(f"Category {category} needs a list of {what} strings")
+    unique = {}
+    for value in values:
+        if not isinstance(value, str):
+            raise ValueError(f"Category {category} has a {what} that is not a string: {value!r}")
+        value = normalize(value)
+        if value:
+            unique.setdefault(value.lower(), value)
+    if not unique:
+        raise ValueError(f"Category {category} needs at least one {what}")
+    return tuple(unique.values())
+
+
+def _normalize_query(query):
+    return _SPACES.sub(' ', query).strip()
+
+
+def _normalize_source(source):
+    """Sources are site: filters, so 'https://Example.com/' and 'example.com' are the same source"""
+    return _SCHEME.sub('', source.strip().lower()).rstrip('/')
+
+
+def compile_plan(categories):
+    """Validate a NEWS_CATEGORIES-style dict and compile it; raises ValueError if it is invalid"""
+    if not isinstance(categories, Mapping) or not categories:
+        raise ValueError("NEWS_CATEGORIES must be a non-empty dict")
+    compiled = {}
+    for name, category in categories.items():
+        if not isinstance(category, Mapping):
+            raise ValueError(f"Category {name} must be a dict")
+        queries = _unique(category.get('queries'), _normalize_query, 'query', name)
+        sources = _unique(category.get('sources'), _normalize_source, 'source', name)
+        compiled[name] = CategoryPlan(
+            name=name,
+            queries=queries,
+            sources=sources,
+            schedule=category.get('schedule') or None,
+            units=tuple(SearchUnit(name, query, source) for query in queries for source in sources),
+        )
+    return ExecutionPlan(categories=MappingProxyType(compiled))
+
+
+def compile_settings(max_workers=1, pipeline='agent', early_stop=0, min_score=0.5,
+                     search_timeout=None, deadline=None):
+    """Validate the run settings; 0 disables search_timeout and deadline"""
+    if max_workers < 1:
+        raise ValueError(f"Worker count must be at least 1, got {max_workers}")
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Unknown pipeline: {pipeline}")
+    if early_stop < 0:
+        raise ValueError(f"Early stop must not be negative, got {early_stop}")
+    if not 0 <= min_score <= 1:
+        raise ValueError(f"Minimum score must be between 0 and 1, got {min_score}")
+    for name, seconds in (('Search timeout', search_timeout), ('Deadline', deadline)):
+        if seconds is not None and seconds < 0:
+            raise ValueError(f"{name} must not be negative, got {seconds}")
+    return RunSettings(max_workers, pipeline, early_stop, min_score,
+                       search_timeout or None, deadline or None)
+
+
+_plan = None
+
+
+def get_plan():
+    """Return the plan for config.news_sources.NEWS_CATEGORIES, compiled on first use"""
+    global _plan
+    if _plan is None:
+        _plan = compile_plan(config.news_sources.NEWS_CATEGORIES)
+    return _plan
+
+
+def reset_plan():
+    """Drop the compiled plan, e.g. after NEWS_CATEGORIES was reloaded"""
+    global _plan
+    _plan = None
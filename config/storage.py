@@ -0,0 +1,16 @@
+"""Locations of the files the news pipeline keeps between runs"""
+import os
+
+DEFAULT_DATA_DIR = '.news_data'
+
+
+def get_data_dir():
+    """Return the data directory (NEWS_DATA_DIR), creating it if needed"""
+    data_dir = os.getenv('NEWS_DATA_DIR', DEFAULT_DATA_DIR)
+    os.makedirs(data_dir, exist_ok=True)
+    return data_dir
+
+
+def data_path(filename):
+    """Return the path of a file inside the data directory"""
+    return os.path.join(get_data_dir(), filename)
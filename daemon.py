@@ -0,0 +1,230 @@
+"""
+Long-running scheduler: runs each news category on its own cron timetable
+inside one warm process, reloading the category config when it changes.
+"""
+import importlib
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timedelta
+
+import config.news_sources
+from config.plan import compile_plan, reset_plan
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCHEDULE = '0 7 * * *'
+DEFAULT_JITTER_SECONDS = 300
+# How often the config file is checked for changes while idle
+POLL_SECONDS = 30
+
+_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+}
+# minute, hour, day of month, month, day of week (0 or 7 = Sunday)
+_FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+
+def _parse_field(field, low, high):
+    values = set()
+    for part in field.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid step in cron field: {field}")
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field out of range {low}-{high}: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    A five-field cron expression (minute hour day-of-month month day-of-week)
+    supporting *, lists, ranges and steps, plus @hourly, @daily and @weekly.
+    """
+
+    def __init__(self, expression):
+        self.expression = expression
+        fields = _ALIASES.get(expression.strip(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        try:
+            (self.minutes, self.hours, self.days, self.months, weekdays) = (
+                _parse_field(field, low, high) for field, (low, high) in zip(fields, _FIELD_RANGES)
+            )
+        except ValueError as e:
+            raise ValueError(f"Invalid cron expression {expression!r}: {str(e)}")
+        self.weekdays = {day % 7 for day in weekdays}
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, when):
+        day_ok = when.day in self.days
+        weekday_ok = (when.weekday() + 1) % 7 in self.weekdays
+        # As in cron, restricting both fields matches either of them
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, when):
+        """First matching minute strictly after `when` (a naive local datetime)"""
+        candidate = when.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                month = candidate.month % 12 + 1
+                candidate = candidate.replace(year=candidate.year + (month == 1), month=month,
+                                              day=1, hour=0, minute=0)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+def validate_categories(categories):
+    """Raise ValueError unless every category has sources, queries and a valid schedule"""
+    for category in compile_plan(categories).categories.values():
+        if category.schedule:
+            CronSchedule(category.schedule)
+
+
+def reload_news_categories():
+    """
+    Re-import config/news_sources.py and update NEWS_CATEGORIES in place, so
+    every module holding a reference sees the new categories. An invalid file
+    leaves the current categories untouched.
+    """
+    current = config.news_sources.NEWS_CATEGORIES
+    try:
+        module = importlib.reload(config.news_sources)
+        validate_categories(module.NEWS_CATEGORIES)
+    except Exception as e:
+        config.news_sources.NEWS_CATEGORIES = current
+        logger.error(f"Keeping the previous news categories, reload failed: {str(e)}")
+        return False
+    fresh = module.NEWS_CATEGORIES
+    current.clear()
+    current.update(fresh)
+    module.NEWS_CATEGORIES = current
+    reset_plan()
+    logger.info(f"Reloaded news categories: {', '.join(current)}")
+    return True
+
+
+class NewsDaemon:
+    """
+    Run run_category(category) whenever a category's schedule comes due.
+
+    Each category uses its 'schedule' entry in NEWS_CATEGORIES, or
+    default_schedule, delayed by a random 0..jitter seconds so categories
+    (and several deployments) do not hit the providers at the same moment.
+    SIGTERM/SIGINT stop scheduling new runs; a run in progress is finished
+    (drained) before run_forever returns.
+    """
+
+    def __init__(self, run_category, categories=None, default_schedule=None, jitter=None,
+                 config_path=None, poll_seconds=POLL_SECONDS):
+        self.run_category = run_category
+        self.categories = categories if categories is not None else config.news_sources.NEWS_CATEGORIES
+        self.default_schedule = default_schedule or os.getenv('NEWS_DAEMON_SCHEDULE', DEFAULT_SCHEDULE)
+        if jitter is None:
+            jitter = float(os.getenv('NEWS_DAEMON_JITTER_SECONDS', DEFAULT_JITTER_SECONDS))
+        self.jitter = jitter
+        self.config_path = config_path or config.news_sources.__file__
+        self.poll_seconds = poll_seconds
+        self.stop_event = threading.Event()
+        self.next_runs = {}
+        self._expressions = {}
+        self._config_mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.path.getmtime(self.config_path)
+        except OSError:
+            return None
+
+    def _expression_for(self, category):
+        return self.categories[category].get('schedule') or self.default_schedule
+
+    def reschedule(self, category, after=None):
+        """Set a category's next run from its schedule, plus jitter"""
+        after = after or datetime.now()
+        due = CronSchedule(self._expression_for(category)).next_after(after)
+        self.next_runs[category] = due.timestamp() + random.uniform(0, self.jitter)
+        logger.info(f"Next {category} run at {datetime.fromtimestamp(self.next_runs[category]):%Y-%m-%d %H:%M:%S}")
+
+    def schedule_all(self):
+        """Schedule new categories and ones whose schedule changed; drop removed ones"""
+        for category in list(self.next_runs):
+            if category not in self.categories:
+                del self.next_runs[category]
+                del self._expressions[category]
+        for category in self.categories:
+            expression = self._expression_for(category)
+            if self._expressions.get(category) != expression:
+                self._expressions[category] = expression
+                self.reschedule(category)
+
+    def check_config(self):
+        """Reload the categories if the config file changed since the last check"""
+        mtime = self._mtime()
+        if mtime == self._config_mtime:
+            return False
+        self._config_mtime = mtime
+        if reload_news_categories():
+            self.schedule_all()
+            return True
+        return False
+
+    def stop(self, signum=None, frame=None):
+        if not self.stop_event.is_set():
+            logger.info("Stop requested, finishing the current run before exiting")
+        self.stop_event.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def run_pending(self):
+        """Run every category that is due, unless a stop was requested"""
+        now = time.time()
+        for category, due in sorted(self.next_runs.items(), key=lambda item: item[1]):
+            if due > now or self.stop_event.is_set():
+                continue
+            logger.info(f"Scheduled run for {category} starting")
+            try:
+                self.run_category(category)
+            except Exception as e:
+                logger.error(f"Scheduled run for {category} failed: {str(e)}", exc_info=True)
+            if category in self.categories:
+                self.reschedule(category)
+
+    def run_forever(self):
+        self.schedule_all()
+        logger.info(f"News daemon started for {len(self.categories)} categories")
+        while not self.stop_event.is_set():
+            self.check_config()
+            self.run_pending()
+            next_due = min(self.next_runs.values(), default=time.time() + self.poll_seconds)
+            self.stop_event.wait(max(0.0, min(next_due - time.time(), self.poll_seconds)))
+        logger.info("News daemon stopped")
@@ -0,0 +1,267 @@
+"""Run instrumentation: stage timings, token usage and counters, exported as JSON or a Prometheus textfile"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+_TRUE_VALUES = ('1', 'true', 'yes', 'on')
+METRIC_PREFIX = 'news'
+# The category being processed; each thread or context has its own, so concurrent
+# searches and queue units never attribute their work to each other's category
+_current_category = contextvars.ContextVar('news_metrics_category', default=None)
+
+
+def _env_flag(name):
+    return os.getenv(name, '').strip().lower() in _TRUE_VALUES
+
+
+class RunMetrics:
+    """
+    Thread-safe collector for one pipeline run.
+
+    Stages record call counts, failures and durations; counters and token
+    usage are kept per category, taken from the category set with
+    for_category(). The category is context-local: it applies to the thread
+    that set it and to the search threads it starts (see run_in_thread), so
+    concurrent categories and queue units are recorded separately.
+    """
+
+    def __init__(self, prompt_cost_per_1k=None, completion_cost_per_1k=None):
+        self.started_at = time.time()
+        self.prompt_cost_per_1k = float(
+            prompt_cost_per_1k if prompt_cost_per_1k is not None
+            else os.getenv('NEWS_LLM_PROMPT_COST_PER_1K', '0')
+        )
+        self.completion_cost_per_1k = float(
+            completion_cost_per_1k if completion_cost_per_1k is not None
+            else os.getenv('NEWS_LLM_COMPLETION_COST_PER_1K', '0')
+        )
+        self._lock = threading.Lock()
+        # (stage, category) -> [calls, failures, seconds, max_seconds]
+        self._stages = {}
+        # (counter, category) -> value
+        self._counters = {}
+        # category -> token totals
+        self._tokens = {}
+        # (source, reason, category) -> times flagged
+        self._sources = {}
+
+    @property
+    def category(self):
+        """The category recorded work is attributed to in the current context"""
+        return _current_category.get()
+
+    @contextmanager
+    def for_category(self, category):
+        """Attribute everything recorded inside the block, in this context, to a category"""
+        token = _current_category.set(category)
+        try:
+            yield
+        finally:
+            _current_category.reset(token)
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block; an exception counts as a failure and is re-raised"""
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                entry = self._stages.setdefault((name, self.category), [0, 0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += failed
+                entry[2] += elapsed
+                entry[3] = max(entry[3], elapsed)
+
+    def increment(self, name, value=1):
+        """Add value to a counter for the current category"""
+        with self._lock:
+            key = (name, self.category)
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def flag_source(self, source, reason):
+        """Note a source that timed out, failed, was rate limited or was skipped by the circuit breaker"""
+        with self._lock:
+            key = (source, reason, self.category)
+            self._sources[key] = self._sources.get(key, 0) + 1
+
+    def record_tokens(self, usage):
+        """Record token usage from a crew result (CrewOutput.token_usage or a dict)"""
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            get = usage.get
+        else:
+            def get(field, default=0):
+                return getattr(usage, field, default)
+        prompt = int(get('prompt_tokens', 0) or 0)
+        completion = int(get('completion_tokens', 0) or 0)
+        total = int(get('total_tokens', 0) or 0) or prompt + completion
+        requests = int(get('successful_requests', 0) or 0)
+        with self._lock:
+            tokens = self._tokens.setdefault(
+                self.category, {'prompt': 0, 'completion': 0, 'total': 0, 'requests': 0}
+            )
+            tokens['prompt'] += prompt
+            tokens['completion'] += completion
+            tokens['total'] += total
+            tokens['requests'] += requests
+
+    def cost(self, tokens):
+        """Estimated LLM cost in USD for a token totals dict"""
+        return (tokens['prompt'] * self.prompt_cost_per_1k
+                + tokens['completion'] * self.completion_cost_per_1k) / 1000
+
+    def report(self):
+        """Return everything recorded so far as a JSON-serializable dict"""
+        with self._lock:
+            stages = [
+                {'stage': name, 'category': category, 'calls': calls, 'failures': failures,
+                 'seconds': round(seconds, 4), 'max_seconds': round(max_seconds, 4)}
+                for (name, category), (calls, failures, seconds, max_seconds)
+                in sorted(self._stages.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+            ]
+            counters = [
+                {'counter': name, 'category': category, 'value': value}
+                for (name, category), value
+                in sorted(self._counters.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+            ]
+            tokens = {category: dict(totals) for category, totals in self._tokens.items()}
+            sources = [
+                {'source': source, 'reason': reason, 'category': category, 'count': count}
+                for (source, reason, category), count
+                in sorted(self._sources.items(), key=lambda item: (item[0][0], item[0][1], item[0][2] or ''))
+            ]
+
+        total_tokens = {'prompt': 0, 'completion': 0, 'total': 0, 'requests': 0}
+        by_category = {}
+        for category, totals in tokens.items():
+            for field, value in totals.items():
+                total_tokens[field] += value
+            by_category[category or 'uncategorized'] = dict(totals, cost_usd=round(self.cost(totals), 6))
+        return {
+            'started_at': datetime.fromtimestamp(self.started_at, timezone.utc).isoformat(),
+            'duration_seconds': round(time.time() - self.started_at, 3),
+            'stages': stages,
+            'counters': counters,
+            'sources': sources,
+            'tokens': dict(total_tokens, cost_usd=round(self.cost(total_tokens), 6),
+                           by_category=by_category),
+        }
+
+    def write_json(self, path):
+        """Write the run report as JSON"""
+        _write_atomic(path, json.dumps(self.report(), indent=2))
+        logger.info(f"Wrote run report to {path}")
+
+    def write_prometheus(self, path):
+        """Write the run as a Prometheus textfile (for node_exporter's textfile collector)"""
+        _write_atomic(path, self.to_prometheus())
+        logger.info(f"Wrote Prometheus metrics to {path}")
+
+    def to_prometheus(self):
+        report = self.report()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+            for labels, value in samples:
+                lines.append(f'{METRIC_PREFIX}_{name}{_format_labels(labels)} {value}')
+
+        metric('run_start_timestamp_seconds', 'gauge', 'Unix time the run started',
+               [({}, round(self.started_at, 3))])
+        metric('run_duration_seconds', 'gauge', 'Wall-clock duration of the run',
+               [({}, report['duration_seconds'])])
+        for field, help_text in (('calls', 'Times a stage ran'),
+                                 ('failures', 'Times a stage raised an error'),
+                                 ('seconds', 'Total seconds spent in a stage'),
+                                 ('max_seconds', 'Longest single run of a stage')):
+            name = 'stage_seconds_max' if field == 'max_seconds' else f'stage_{field}_total'
+            metric(name, 'gauge' if field == 'max_seconds' else 'counter', help_text, [
+                ({'stage': entry['stage'], 'category': entry['category']}, entry[field])
+                for entry in report['stages']
+            ])
+
+        counters = {}
+        for entry in report['counters']:
+            counters.setdefault(entry['counter'], []).append(
+                ({'category': entry['category']}, entry['value'])
+            )
+        for name, samples in sorted(counters.items()):
+            metric(f'{name}_total', 'counter', f'Number of {name.replace("_", " ")}', samples)
+
+        metric('source_issues_total', 'counter', 'Searches of a source that timed out, failed or were skipped', [
+            ({'source': entry['source'], 'reason': entry['reason'], 'category': entry['category']}, entry['count'])
+            for entry in report['sources']
+        ])
+
+        token_samples = []
+        cost_samples = []
+        for category, totals in sorted(report['tokens']['by_category'].items()):
+            for kind in ('prompt', 'completion'):
+                token_samples.append(({'category': category, 'kind': kind}, totals[kind]))
+            cost_samples.append(({'category': category}, totals['cost_usd']))
+        metric('llm_tokens_total', 'counter', 'LLM tokens used', token_samples)
+        metric('llm_cost_usd_total', 'counter', 'Estimated LLM cost in USD', cost_samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    labels = {key: value for key, value in labels.items() if value is not None}
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape_label(value)}"' for key, value in sorted(labels.items())) + '}'
+
+
+def _write_atomic(path, content):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as output_file:
+        output_file.write(content)
+    os.replace(temp_path, path)
+
+
+_metrics = RunMetrics()
+_quiet = _env_flag('NEWS_QUIET')
+
+
+def get_metrics():
+    """Return the collector for the current run"""
+    return _metrics
+
+
+def reset_metrics():
+    """Start a new run with an empty collector and return it"""
+    global _metrics
+    _metrics = RunMetrics()
+    return _metrics
+
+
+def set_quiet(quiet):
+    """Turn verbose CrewAI output off (quiet) or back on"""
+    global _quiet
+    _quiet = bool(quiet)
+
+
+def crew_verbose():
+    """Whether crews should log their reasoning; False in quiet mode (NEWS_QUIET)"""
+    return not _quiet
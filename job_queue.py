@@ -0,0 +1,396 @@
+"""
+Durable SQLite work queue for query × source search units.
+
+Any number of worker processes, on one machine or several sharing the database
+file, lease units, run them and complete them. Leases expire so a crashed
+worker's units are picked up again, and a running unit's lease is renewed
+while it runs. Failed units, and units whose lease keeps expiring, are retried
+with backoff up to max_attempts, and completion is idempotent. Once every unit
+of a category has finished, exactly one worker claims the category's
+aggregation; a failing aggregation is retried the same way.
+"""
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional
+
+from config.storage import data_path
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    query TEXT NOT NULL,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    UNIQUE (run_id, category, query, source)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_run_category ON jobs (run_id, category);
+CREATE TABLE IF NOT EXISTS aggregations (
+    run_id TEXT NOT NULL,
+    category TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    completed_at REAL,
+    articles TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    PRIMARY KEY (run_id, category)
+);
+"""
+# Columns added since the first release, created on databases that predate them
+_ADDED_COLUMNS = {
+    'aggregations': (('attempts', 'INTEGER NOT NULL DEFAULT 0'), ('error', 'TEXT')),
+}
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+# Aggregation key for the step that runs once every category of a run is aggregated
+ALL_CATEGORIES = '*'
+
+
+class Job(NamedTuple):
+    id: int
+    run_id: str
+    category: str
+    query: str
+    source: str
+    attempts: int
+    # Worker holding the lease this Job was handed out under
+    worker_id: Optional[str] = None
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Work units are (run_id, category, query, source). Enqueueing the same unit
+    twice is a no-op, so a run can be enqueued again safely after a crash.
+    """
+
+    def __init__(self, path, lease_seconds=600, max_attempts=3, retry_delay=30.0):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        for table, columns in _ADDED_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for name, definition in columns:
+                if name not in existing:
+                    self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+    @classmethod
+    def from_env(cls):
+        """Build a queue from NEWS_QUEUE_PATH, NEWS_QUEUE_LEASE_SECONDS and NEWS_QUEUE_MAX_ATTEMPTS"""
+        return cls(
+            path=os.getenv('NEWS_QUEUE_PATH') or data_path('jobs.sqlite3'),
+            lease_seconds=float(os.getenv('NEWS_QUEUE_LEASE_SECONDS', '600')),
+            max_attempts=int(os.getenv('NEWS_QUEUE_MAX_ATTEMPTS', '3')),
+        )
+
+    @contextmanager
+    def _transaction(self):
+        """Serialize writers across processes: BEGIN IMMEDIATE takes the database write lock"""
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def enqueue_run(self, run_id, units):
+        """Enqueue (category, query, source) units, e.g. an ExecutionPlan's; returns units added"""
+        now = time.time()
+        rows = [(run_id, category, query, source, now, now, now) for category, query, source in units]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs "
+                "(run_id, category, query, source, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            added = conn.total_changes - before
+        logger.info(f"Enqueued {added} of {len(rows)} units for run {run_id}")
+        return added
+
+    def lease(self, worker_id, run_id=None) -> Optional[Job]:
+        """
+        Lease the oldest available unit (or one whose lease expired), or return
+        None. A unit whose lease expired on its last attempt is marked failed:
+        it keeps killing or stalling its workers, so it is not run again.
+        """
+        now = time.time()
+        run_filter = "AND run_id = ?" if run_id else ""
+        params = [now, now] + ([run_id] if run_id else [])
+        with self._transaction() as conn:
+            abandoned = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Lease expired on every attempt', "
+                "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            ).rowcount
+            row = conn.execute(
+                "SELECT id, run_id, category, query, source, attempts FROM jobs "
+                "WHERE ((status = 'pending' AND available_at <= ?) "
+                "   OR (status = 'leased' AND lease_expires < ?)) "
+                f"{run_filter} ORDER BY id LIMIT 1",
+                params
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                    (worker_id, now + self.lease_seconds, now, row[0])
+                )
+        if abandoned:
+            logger.error(f"Marked {abandoned} units failed after their lease expired {self.max_attempts} times")
+        if row is None:
+            return None
+        return Job(*row[:5], attempts=row[5] + 1, worker_id=worker_id)
+
+    @contextmanager
+    def keep_leased(self, job, worker_id):
+        """Renew a unit's lease in the background while the block runs"""
+        stop = threading.Event()
+
+        def renew():
+            while not stop.wait(self.lease_seconds / 3):
+                if not self.extend_lease(job, worker_id):
+                    logger.warning(f"Lost the lease on unit {job.id}; another worker may run it too")
+                    return
+
+        thread = threading.Thread(target=renew, name=f'lease-{job.id}', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def extend_lease(self, job, worker_id):
+        """Keep a long-running unit leased; returns False if the lease was lost"""
+        now = time.time()
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (now + self.lease_seconds, now, job.id, worker_id)
+            ).rowcount == 1
+
+    def complete(self, job, articles: List[dict]):
+        """
+        Store a unit's articles. Only the worker still holding the lease may
+        complete it, so a duplicate or stale result is ignored (returns False).
+        """
+        with self._transaction() as conn:
+            completed = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (json.dumps(articles), time.time(), job.id, job.worker_id)
+            ).rowcount == 1
+        if not completed:
+            logger.info(f"Unit {job.id} was completed or re-leased meanwhile, ignoring this result")
+        return completed
+
+    def fail(self, job, error):
+        """
+        Schedule a retry with exponential backoff, or mark the unit failed after
+        max_attempts. Ignored (returns False) if the worker lost the lease, so a
+        stale worker cannot reset a unit another worker is running.
+        """
+        now = time.time()
+        final = job.attempts >= self.max_attempts
+        delay = self.retry_delay * 2 ** (job.attempts - 1)
+        with self._transaction() as conn:
+            failed = conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, error = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                (FAILED if final else PENDING, now + delay, str(error)[:1000], now, job.id, job.worker_id)
+            ).rowcount == 1
+        if not failed:
+            logger.info(f"Unit {job.id} was completed or re-leased meanwhile, ignoring its failure: {error}")
+        elif final:
+            logger.error(f"Unit {job.id} ({job.query} / {job.source}) failed permanently: {error}")
+        else:
+            logger.warning(f"Unit {job.id} failed (attempt {job.attempts}), retrying in {delay:.0f}s: {error}")
+        return failed
+
+    def counts(self, run_id=None):
+        """Return {status: units} for a run, or for every run"""
+        query = "SELECT status, COUNT(*) FROM jobs" + (" WHERE run_id = ?" if run_id else "")
+        with self._lock:
+            rows = self._conn.execute(query + " GROUP BY status", [run_id] if run_id else []).fetchall()
+        return dict(rows)
+
+    def has_unfinished(self, run_id=None):
+        """True while any unit is pending or leased"""
+        counts = self.counts(run_id)
+        return counts.get(PENDING, 0) + counts.get(LEASED, 0) > 0
+
+    def finished_categories(self, run_id=None):
+        """(run_id, category) pairs whose units have all finished but are not yet aggregated"""
+        run_filter = "WHERE j.run_id = ?" if run_id else ""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT j.run_id, j.category FROM jobs j "
+                "LEFT JOIN aggregations a ON a.run_id = j.run_id AND a.category = j.category "
+                f"{run_filter} GROUP BY j.run_id, j.category "
+                "HAVING SUM(j.status IN ('pending', 'leased')) = 0 "
+                "AND MAX(a.completed_at) IS NULL ORDER BY MIN(j.id)",
+                [run_id] if run_id else []
+            ).fetchall()
+
+    def results(self, run_id, category):
+        """Articles from a category's completed units, in enqueue (query/source) order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT result FROM jobs WHERE run_id = ? AND category = ? AND status = 'done' ORDER BY id",
+                (run_id, category)
+            ).fetchall()
+        return [article for (result,) in rows for article in json.loads(result or '[]')]
+
+    def runs_awaiting_final(self, run_id=None):
+        """Runs whose categories are all aggregated but whose final ('*') step has not completed"""
+        run_filter = "WHERE j.run_id = ?" if run_id else ""
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                "SELECT j.run_id FROM jobs j "
+                "LEFT JOIN aggregations a ON a.run_id = j.run_id AND a.category = j.category "
+                f"{run_filter} GROUP BY j.run_id "
+                "HAVING SUM(a.completed_at IS NULL) = 0 AND NOT EXISTS ("
+                "  SELECT 1 FROM aggregations f WHERE f.run_id = j.run_id "
+                "  AND f.category = ? AND f.completed_at IS NOT NULL)",
+                ([run_id] if run_id else []) + [ALL_CATEGORIES]
+            )]
+
+    def claim_aggregation(self, run_id, category, worker_id):
+        """
+        Claim a category's aggregation; False if it is done, another worker holds
+        it, or it is waiting for its retry. After max_attempts claims that never
+        completed, the aggregation is given up and marked finished with an error.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT completed_at, lease_expires, attempts FROM aggregations "
+                "WHERE run_id = ? AND category = ?",
+                (run_id, category)
+            ).fetchone()
+            if row is not None and (row[0] is not None or (row[1] or 0) > now):
+                return False
+            if row is not None and row[2] >= self.max_attempts:
+                conn.execute(
+                    "UPDATE aggregations SET completed_at = ?, owner = NULL, lease_expires = NULL, "
+                    "error = COALESCE(error, 'Aggregation never completed') WHERE run_id = ? AND category = ?",
+                    (now, run_id, category)
+                )
+                given_up = True
+            else:
+                conn.execute(
+                    "INSERT INTO aggregations (run_id, category, owner, lease_expires, attempts) "
+                    "VALUES (?, ?, ?, ?, 1) ON CONFLICT (run_id, category) DO UPDATE SET "
+                    "owner = excluded.owner, lease_expires = excluded.lease_expires, attempts = attempts + 1",
+                    (run_id, category, worker_id, now + self.lease_seconds)
+                )
+                given_up = False
+        if given_up:
+            logger.error(f"Gave up aggregating {category} for run {run_id} after {row[2]} attempts")
+        return not given_up
+
+    def complete_aggregation(self, run_id, category, articles=None):
+        """Mark a claimed aggregation finished, keeping the digest's articles"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE aggregations SET completed_at = ?, articles = ?, lease_expires = NULL, error = NULL "
+                "WHERE run_id = ? AND category = ?",
+                (time.time(), json.dumps(articles or []), run_id, category)
+            )
+
+    def release_aggregation(self, run_id, category, error=None):
+        """
+        Give up a claim after a failure. The aggregation is retried with backoff,
+        or marked finished with the error once it has had max_attempts claims.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM aggregations WHERE run_id = ? AND category = ? AND completed_at IS NULL",
+                (run_id, category)
+            ).fetchone()
+            if row is None:
+                return
+            attempts = row[0]
+            final = attempts >= self.max_attempts
+            delay = self.retry_delay * 2 ** max(attempts - 1, 0)
+            conn.execute(
+                "UPDATE aggregations SET owner = NULL, lease_expires = ?, completed_at = ?, error = ? "
+                "WHERE run_id = ? AND category = ?",
+                (None if final else now + delay, now if final else None, str(error)[:1000] if error else None,
+                 run_id, category)
+            )
+        if final:
+            logger.error(f"Aggregating {category} for run {run_id} failed permanently: {error}")
+        else:
+            logger.warning(f"Aggregating {category} for run {run_id} failed (attempt {attempts}), "
+                           f"retrying in {delay:.0f}s: {error}")
+
+    def aggregated_articles(self, run_id):
+        """{category: articles} for every successfully completed aggregation of a run"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category, articles FROM aggregations "
+                "WHERE run_id = ? AND category != ? AND completed_at IS NOT NULL AND error IS NULL",
+                (run_id, ALL_CATEGORIES)
+            ).fetchall()
+        return {category: json.loads(articles or '[]') for category, articles in rows}
+
+    def purge(self, older_than_days=7):
+        """Delete runs created more than older_than_days ago"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._transaction() as conn:
+            old_runs = [row[0] for row in conn.execute(
+                "SELECT run_id FROM jobs GROUP BY run_id HAVING MAX(created_at) < ?", (cutoff,)
+            )]
+            for run_id in old_runs:
+                conn.execute("DELETE FROM jobs WHERE run_id = ?", (run_id,))
+                conn.execute("DELETE FROM aggregations WHERE run_id = ?", (run_id,))
+        return len(old_runs)
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
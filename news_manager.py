@@ -1,8 +1,26 @@
 import argparse
 import logging
 import os
+import sys
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
 from config.news_sources import NEWS_CATEGORIES
+from config.plan import PIPELINES, compile_settings, get_plan
 from agents.news_reader import NewsReaderAgent
+from agents.search_runner import CircuitBreaker, SearchClock, SearchScheduler, run_in_thread
+from agents.search_cache import SearchCache
+from agents.archive import ArticleArchive
+from agents.dedup import deduplicate_articles
+from agents.ranking import RankingContext, RankingEngine
+from Gateway.delivery import get_delivery_service
+from Gateway.digest_renderer import digest_title
+from Gateway.subscriptions import DigestAssembler, group_recipients, subscriptions_from_env
+from agents.staged_pipeline import run_staged_pipeline
+from agents.seen_ledger import SeenLedger
+from instrumentation import get_metrics, reset_metrics, set_quiet
+from daemon import NewsDaemon
+from job_queue import ALL_CATEGORIES, JobQueue, default_worker_id
 from dotenv import load_dotenv
 
 # Configure logging
@@ -18,59 +36,405 @@ def load_environment():
     required_vars = [
         'SERPER_API_KEY',
         'OPENAI_API_KEY',
-        'RESEND_API_KEY',
-        'EMAIL_RECIPIENTS'
+        'RESEND_API_KEY'
     ]
+    # Recipients come from the subscriptions file when one is configured
+    if not os.getenv('NEWS_SUBSCRIPTIONS_FILE'):
+        required_vars.append('EMAIL_RECIPIENTS')
     for var in required_vars:
         if not os.getenv(var):
             raise EnvironmentError(f"Missing required environment variable: {var}")
 
 def get_category_sources(category):
-    """Get sources for a specific category"""
-    if category not in NEWS_CATEGORIES:
-        raise ValueError(f"Invalid category: {category}")
-    return NEWS_CATEGORIES[category]['sources']
+    """Get the deduplicated sources for a specific category"""
+    return get_plan().category(category).sources
 
 def get_category_queries(category):
-    """Get search queries for a specific category"""
-    if category not in NEWS_CATEGORIES:
-        raise ValueError(f"Invalid category: {category}")
-    return NEWS_CATEGORIES[category]['queries']
+    """Get the deduplicated search queries for a specific category"""
+    return get_plan().category(category).queries
 
-def process_medical_news(category):
+def get_max_workers(value=None):
+    """Resolve the search concurrency limit from the CLI or NEWS_MAX_WORKERS"""
+    if value is None:
+        value = os.getenv('NEWS_MAX_WORKERS', '1')
+    try:
+        workers = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid worker count: {value}")
+    return workers
+
+def check_configuration(settings):
+    """Print the compiled execution plan and settings (--check)"""
+    plan = get_plan()
+    for category in plan.categories.values():
+        print(f"{category.name}: {len(category.queries)} queries × {len(category.sources)} sources "
+              f"= {len(category.units)} searches"
+              + (f", schedule '{category.schedule}'" if category.schedule else ""))
+    print(f"{len(plan.units)} searches in total; settings: {settings._asdict()}")
+
+def collect_category_news(category, news_reader, max_workers=1, pipeline='agent',
+                          early_stop=0, min_score=0.5, ledger=None, search_timeout=None,
+                          deadline=None, breaker=None):
+    """
+    Search, deduplicate and rank the news for a category.
+    Returns the top 5 articles, taken from all queries and sources.
+    With max_workers > 1 the query × source searches run concurrently.
+    The 'staged' pipeline fetches raw Serper hits first and only summarizes the
+    articles that make it into the digest.
+    With early_stop > 0 the agent pipeline stops issuing searches once it holds
+    that many distinct articles scoring at least min_score.
+    A SeenLedger, when given, records what the searches returned and drops
+    articles that earlier digests already sent.
+    search_timeout abandons a single search after that many seconds and
+    deadline stops searching the category after that many seconds, keeping
+    the articles that arrived in time. A CircuitBreaker skips sources that
+    keep failing or timing out.
+    """
+    with get_metrics().for_category(category):
+        return _collect_category_news(category, news_reader, max_workers, pipeline,
+                                      early_stop, min_score, ledger,
+                                      dict(search_timeout=search_timeout, deadline=deadline, breaker=breaker))
+
+def _collect_category_news(category, news_reader, max_workers, pipeline, early_stop, min_score, ledger,
+                           limits):
+    sources = get_category_sources(category)
+    queries = get_category_queries(category)
+    ranker = news_reader.ranker
+    ranking_context = RankingContext(queries=queries, sources=sources)
+
+    if pipeline == 'staged':
+        all_news = run_staged_pipeline(queries, sources, max_workers=max_workers, ranker=ranker,
+                                       ledger=ledger, prompts=news_reader.prompts,
+                                       token_budget=news_reader.token_budget, **limits)
+    else:
+        stop_condition = None
+        if early_stop > 0:
+            stop_condition = ranker.quality_stop(ranking_context, early_stop, min_score)
+        # Each search returns up to 5 articles, combined in query/source order. Streamed
+        # articles (NEWS_STREAMING) count towards the early stop as soon as they are parsed.
+        scheduler = SearchScheduler(news_reader, max_workers=max_workers,
+                                    stop_condition=stop_condition,
+                                    on_article=stop_condition.add if stop_condition else None, **limits)
+        all_news = scheduler.run(queries, sources)
+        logger.info(
+            f"{category}: ran {scheduler.searches_run} searches, skipped "
+            f"{scheduler.searches_skipped} (~{scheduler.estimated_tokens_saved} tokens saved), "
+            f"{scheduler.searches_timed_out} timed out, {scheduler.searches_broken} skipped by the circuit breaker"
+            + (", deadline reached" if scheduler.deadline_hit else "")
+        )
+        if ledger is not None:
+            ledger.record_returned(all_news)
+            all_news, _ = ledger.filter_unseen(all_news)
+
+    return rank_category_news(category, all_news, news_reader, ranking_context)
+
+def rank_category_news(category, all_news, news_reader, ranking_context=None):
+    """Deduplicate a category's collected articles and return the top 5"""
+    metrics = get_metrics()
+    # Overlapping queries often return the same story from several sources
+    with metrics.stage('dedup'):
+        all_news, merged_count = deduplicate_articles(all_news)
+    logger.info(f"Merged {merged_count} duplicate {category} articles, {len(all_news)} unique")
+    metrics.increment('articles_unique', len(all_news))
+    if news_reader.archive is not None:
+        news_reader.archive.record_found(category, all_news)
+
+    with metrics.stage('rank'):
+        top_articles = news_reader.select_top_articles(all_news, category, ranking_context)
+    metrics.increment('articles_selected', len(top_articles))
+    return top_articles
+
+def process_medical_news(category, max_workers=1, cache=None, pipeline='agent',
+                         early_stop=0, min_score=0.5, news_reader=None, outbox=None, ledger=None,
+                         search_timeout=None, deadline=None, breaker=None):
     """
     Process medical news for a specific category.
     NOTE: This will send one email per category, containing up to 5 articles total 
     for that category (taken from all queries and sources).
+    A SearchCache, when given, answers repeated searches without calling the crew.
+    Pass a shared news_reader so its pooled agents and crews are reused across categories.
+    If an outbox list is given the digest email is appended to it for batched
+    delivery instead of being sent immediately.
+    See collect_category_news for the remaining options.
     """
     try:
-        sources = get_category_sources(category)
-        queries = get_category_queries(category)
-
-        # Initialize the news reader agent
-        news_reader = NewsReaderAgent()
-
-        all_news = []
-        for query in queries:
-            for source in sources:
-                # Each call returns up to 5 articles
-                news_items = news_reader.search_news(query, source)
-                all_news.extend(news_items)
-
-        # Now we have a combined list (could be more than 5 total).
-        # But the final formatting also slices to 5 articles.
-        if all_news:
-            email_content = news_reader.format_email_content(all_news, category=category)
-            if news_reader.send_email(email_content):
-                print(f"\nSuccessfully processed and sent {category} news")
-            else:
-                print(f"\nFailed to send {category} news email")
-        else:
-            print(f"\nNo news found for {category}")
+        # Initialize the news reader agent unless one is shared across categories
+        if news_reader is None:
+            news_reader = NewsReaderAgent(cache=cache, ranker=RankingEngine())
+
+        top_articles = collect_category_news(
+            category, news_reader, max_workers=max_workers, pipeline=pipeline,
+            early_stop=early_stop, min_score=min_score, ledger=ledger,
+            search_timeout=search_timeout, deadline=deadline, breaker=breaker
+        )
+        deliver_category_digest(category, top_articles, news_reader, outbox=outbox, ledger=ledger)
 
     except Exception as e:
         logger.error(f"Error processing {category} news: {str(e)}", exc_info=True)
 
+def deliver_category_digest(category, top_articles, news_reader, outbox=None, ledger=None):
+    """
+    Render a category's digest and send it (or queue it on outbox) to the
+    configured recipients. Returns False only if sending failed; a digest the
+    delivery service spooled goes out with --redeliver-spool.
+    """
+    if not top_articles:
+        print(f"\nNo news found for {category}")
+        return True
+    digest = news_reader.render_digest(top_articles, category=category)
+    if outbox is not None:
+        outbox.append(news_reader.build_message(digest.html, text_content=digest.text))
+        print(f"\nSuccessfully processed {category} news, queued for delivery")
+    else:
+        try:
+            report = news_reader.deliver_email(digest.html, text_content=digest.text)
+        except Exception as e:
+            logger.error(f"Error sending {category} news email: {str(e)}", exc_info=True)
+            print(f"\nFailed to send {category} news email")
+            return False
+        if report.ok:
+            print(f"\nSuccessfully processed and sent {category} news")
+        else:
+            print(f"\n{category} news email was spooled; resend it with --redeliver-spool")
+    # Queued or spooled digests are delivered later, so they count as sent
+    if ledger is not None:
+        ledger.record_sent(top_articles)
+    if news_reader.archive is not None:
+        news_reader.archive.record_sent(category, top_articles)
+    return True
+
+def process_subscriptions(subscriptions, news_reader, only_category=None, ledger=None, **options):
+    """
+    Collect each subscribed category once, render one digest per distinct
+    category combination and send it to that combination's subscribers in chunks.
+    """
+    categories = get_plan().names
+    groups = group_recipients(subscriptions, list(categories),
+                              only=[only_category] if only_category else None)
+    needed = [cat for cat in categories
+              if any(cat in combination for combination in groups)]
+    logger.info(f"{len(subscriptions)} subscribers share {len(groups)} distinct digests "
+                f"over {len(needed)} categories")
+
+    category_articles = {}
+    for cat in needed:
+        try:
+            category_articles[cat] = collect_category_news(cat, news_reader, ledger=ledger,
+                                                           **options)
+        except Exception as e:
+            logger.error(f"Error processing {cat} news: {str(e)}", exc_info=True)
+            category_articles[cat] = []
+    return deliver_subscription_digests(groups, category_articles, news_reader, ledger=ledger)
+
+def deliver_subscription_digests(groups, category_articles, news_reader, ledger=None):
+    """Render one digest per category combination and send it to that combination's subscribers"""
+    assembler = DigestAssembler(category_articles, renderer=news_reader.renderer)
+    sent = spooled = 0
+    for chunk in assembler.iter_message_chunks(
+        groups,
+        lambda html, text, recipients: news_reader.build_message(html, text, recipients)
+    ):
+        report = news_reader.send_messages(chunk)
+        sent += len(report.sent_ids)
+        spooled += report.spooled
+    if ledger is not None:
+        for articles in category_articles.values():
+            ledger.record_sent(articles)
+    if news_reader.archive is not None:
+        for category, articles in category_articles.items():
+            news_reader.archive.record_sent(category, articles)
+    print(f"\nRendered {assembler.rendered_count} distinct digests, sent {sent} emails"
+          + (f", {spooled} spooled; resend them with --redeliver-spool" if spooled else ""))
+    return spooled == 0
+
+def run_digests(news_reader, category=None, ledger=None, **options):
+    """
+    Collect, render and deliver the digests for one category, or all of them.
+    Subscriptions are re-read on every call. Returns True unless emails were spooled.
+    """
+    subscriptions = subscriptions_from_env(list(get_plan().names))
+    if subscriptions is not None:
+        return process_subscriptions(subscriptions, news_reader, only_category=category,
+                                     ledger=ledger, **options)
+
+    # Digests are collected and delivered together in as few batch requests as possible
+    outbox = []
+    for cat in [category] if category else get_plan().names:
+        process_medical_news(cat, news_reader=news_reader, outbox=outbox, ledger=ledger, **options)
+    logger.info(f"Crew pool stats: {news_reader.crew_pool.stats()}")
+
+    if not outbox:
+        return True
+    report = news_reader.send_messages(outbox)
+    if report.ok:
+        print(f"\nSent {len(outbox)} digest emails")
+    else:
+        print(f"\n{report.spooled} of {len(outbox)} digest emails were spooled; "
+              f"resend them with --redeliver-spool")
+    return report.ok
+
+def build_rollup_digest(news_reader, days, category=None, keywords=None, per_category=5):
+    """
+    Render a "best of" digest from the articles sent in the last `days` days,
+    ranked per category, without running any searches. Returns None if the
+    archive holds nothing for the period.
+    """
+    grouped = news_reader.archive.rollup(time.time() - days * 86400,
+                                         categories=[category] if category else None,
+                                         keywords=keywords)
+    # Configured categories first, in config order, then any no longer configured
+    categories = get_plan().names
+    ordered = [cat for cat in categories if cat in grouped]
+    ordered += sorted(cat for cat in grouped if cat not in categories)
+    sections = [(digest_title(cat), news_reader.select_top_articles(grouped[cat], cat, limit=per_category))
+                for cat in ordered]
+    if not sections:
+        return None
+    period = 'week' if days == 7 else f'{days:g} days'
+    return news_reader.renderer.render_sections(f"Best of the past {period} in medical AI", sections)
+
+def send_rollup(news_reader, days, category=None, keywords=None):
+    """Send the rollup digest to EMAIL_RECIPIENTS; rollups are not recorded as new deliveries"""
+    digest = build_rollup_digest(news_reader, days, category=category, keywords=keywords)
+    if digest is None:
+        print(f"\nNo archived articles were sent in the last {days:g} days")
+        return True
+    return news_reader.send_email(digest.html, text_content=digest.text)
+
+def print_archive_search(archive, keywords, category=None, since=None, limit=50):
+    """Print archived articles matching keywords, newest first"""
+    articles = archive.search(keywords=keywords, category=category, since=since, limit=limit)
+    for article in articles:
+        sent = 'sent' if article['sent_at'] else 'found'
+        print(f"{article['date']}  {article['category']}  {sent}  {article['title']}\n    {article['link']}")
+    print(f"\n{len(articles)} archived articles match '{keywords}'")
+
+def enqueue_categories(queue, run_id, category=None):
+    """Put every query × source unit of one category, or all of them, on the job queue"""
+    plan = get_plan()
+    units = plan.category(category).units if category else plan.units
+    purged = queue.purge(float(os.getenv('NEWS_QUEUE_RETENTION_DAYS', '7')))
+    if purged:
+        logger.info(f"Purged {purged} old runs from the job queue")
+    added = queue.enqueue_run(run_id, units)
+    print(f"\nEnqueued {added} search units for run {run_id}; start workers with --worker")
+
+def aggregate_finished_categories(queue, news_reader, worker_id, run_id=None, ledger=None,
+                                  subscriptions=None):
+    """
+    Assemble the digest of every category whose units have all finished.
+    Each category is claimed by exactly one worker. With subscriptions, the
+    per-combination digests go out once every category of the run is aggregated.
+    """
+    for finished_run, category in queue.finished_categories(run_id):
+        if not queue.claim_aggregation(finished_run, category, worker_id):
+            continue
+        try:
+            with get_metrics().for_category(category):
+                all_news = queue.results(finished_run, category)
+                if ledger is not None:
+                    ledger.record_returned(all_news)
+                    all_news, _ = ledger.filter_unseen(all_news)
+                top_articles = rank_category_news(category, all_news, news_reader)
+                if subscriptions is None and not deliver_category_digest(
+                        category, top_articles, news_reader, ledger=ledger):
+                    raise RuntimeError(f"Sending the {category} digest failed")
+        except Exception as e:
+            logger.error(f"Aggregating {category} for run {finished_run} failed: {str(e)}", exc_info=True)
+            queue.release_aggregation(finished_run, category, error=e)
+            continue
+        queue.complete_aggregation(finished_run, category, top_articles)
+
+    if subscriptions is None:
+        return
+    for finished_run in queue.runs_awaiting_final(run_id):
+        if not queue.claim_aggregation(finished_run, ALL_CATEGORIES, worker_id):
+            continue
+        category_articles = queue.aggregated_articles(finished_run)
+        groups = group_recipients(subscriptions, list(get_plan().names), only=list(category_articles))
+        try:
+            deliver_subscription_digests(groups, category_articles, news_reader, ledger=ledger)
+        except Exception as e:
+            logger.error(f"Sending digests for run {finished_run} failed: {str(e)}", exc_info=True)
+            queue.release_aggregation(finished_run, ALL_CATEGORIES, error=e)
+            continue
+        queue.complete_aggregation(finished_run, ALL_CATEGORIES)
+
+def run_queue_worker(queue, news_reader, run_id=None, ledger=None, idle_seconds=5.0,
+                     search_timeout=None):
+    """
+    Lease and run search units until the queue (or one run) is drained and
+    every finished category has been aggregated. Start as many workers, on
+    as many machines sharing NEWS_QUEUE_PATH, as the providers' quotas allow.
+    A unit's lease is renewed while its search runs; a search running longer
+    than search_timeout is abandoned and the unit retried like a failed one.
+    """
+    worker_id = default_worker_id()
+    subscriptions = subscriptions_from_env(list(get_plan().names))
+    processed = 0
+    while True:
+        job = queue.lease(worker_id, run_id)
+        if job is not None:
+            with get_metrics().for_category(job.category):
+                clock = SearchClock()
+                future = run_in_thread(news_reader.search_news, job.query, job.source, None, True, clock=clock)
+                try:
+                    with queue.keep_leased(job, worker_id):
+                        articles = future.result(timeout=search_timeout)
+                except FutureTimeoutError:
+                    clock.abandon()
+                    queue.fail(job, f"Search timed out after {search_timeout:g}s")
+                    continue
+                except Exception as e:
+                    queue.fail(job, e)
+                    continue
+            queue.complete(job, articles)
+            processed += 1
+            continue
+
+        aggregate_finished_categories(queue, news_reader, worker_id, run_id=run_id, ledger=ledger,
+                                      subscriptions=subscriptions)
+        if not (queue.has_unfinished(run_id) or queue.finished_categories(run_id)
+                or (subscriptions is not None and queue.runs_awaiting_final(run_id))):
+            break
+        # Other workers still hold leases, or failed units are waiting for their retry
+        time.sleep(idle_seconds)
+    print(f"\nWorker {worker_id} ran {processed} search units; queue status: {queue.counts(run_id)}")
+
+def run_daemon(news_reader, args, ledger=None, **options):
+    """
+    Keep one warm process running each category on its schedule. The reader's
+    crew pool, the search cache, the ledger and the delivery HTTP session are
+    reused between runs; every run writes its own metrics.
+    """
+    def run_category(category):
+        reset_metrics()
+        news_reader.token_budget.reset()
+        try:
+            if ledger is not None:
+                ledger.compact()
+            run_digests(news_reader, category=category, ledger=ledger, **options)
+        finally:
+            write_metrics(args.metrics_json, args.metrics_textfile)
+
+    daemon = NewsDaemon(run_category)
+    daemon.install_signal_handlers()
+    daemon.run_forever()
+
+def write_metrics(json_path=None, textfile_path=None):
+    """Log the run's token usage and export its metrics to the requested files"""
+    metrics = get_metrics()
+    tokens = metrics.report()['tokens']
+    logger.info(f"LLM usage: {tokens['total']} tokens in {tokens['requests']} requests "
+                f"(~${tokens['cost_usd']:.4f})")
+    try:
+        if json_path:
+            metrics.write_json(json_path)
+        if textfile_path:
+            metrics.write_prometheus(textfile_path)
+    except OSError as e:
+        logger.error(f"Could not write run metrics: {str(e)}")
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description='Process medical AI news')
@@ -80,25 +444,219 @@ def main():
         choices=NEWS_CATEGORIES.keys(),
         help='Category of medical news to process'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of searches to run concurrently (default: NEWS_MAX_WORKERS or 1)'
+    )
+    parser.add_argument(
+        '--pipeline',
+        choices=PIPELINES,
+        default=os.getenv('NEWS_PIPELINE', 'agent'),
+        help="'agent' searches and summarizes per query/source; "
+             "'staged' retrieves from Serper first and summarizes only the top articles"
+    )
+    parser.add_argument(
+        '--early-stop',
+        type=int,
+        default=int(os.getenv('NEWS_EARLY_STOP', '0')),
+        help='Stop searching a category once this many articles pass --min-score (0 disables)'
+    )
+    parser.add_argument(
+        '--min-score',
+        type=float,
+        default=float(os.getenv('NEWS_MIN_SCORE', '0.5')),
+        help='Quality score (0-1) an article needs to count towards --early-stop'
+    )
+    parser.add_argument(
+        '--search-timeout',
+        type=float,
+        default=float(os.getenv('NEWS_SEARCH_TIMEOUT_SECONDS', '0')),
+        help='Abandon a single search after this many seconds (0 disables)'
+    )
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        default=float(os.getenv('NEWS_CATEGORY_DEADLINE_SECONDS', '0')),
+        help='Stop searching a category after this many seconds and send what arrived (0 disables)'
+    )
+    parser.add_argument(
+        '--redeliver-spool',
+        action='store_true',
+        help='Only resend emails spooled by earlier failed deliveries, then exit'
+    )
+    parser.add_argument(
+        '--no-ledger',
+        action='store_true',
+        help='Include articles that earlier digests already sent'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='Stay running and process each category on its schedule '
+             '(NEWS_DAEMON_SCHEDULE, or a category\'s "schedule" entry)'
+    )
+    parser.add_argument(
+        '--enqueue',
+        action='store_true',
+        help='Put this run\'s query × source searches on the job queue (NEWS_QUEUE_PATH) and exit'
+    )
+    parser.add_argument(
+        '--worker',
+        action='store_true',
+        help='Drain the job queue, then aggregate and send the digests of finished categories'
+    )
+    parser.add_argument(
+        '--run-id',
+        help='Run to enqueue or work on (default: a new timestamped run for --enqueue, any run for --worker)'
+    )
+    parser.add_argument(
+        '--no-archive',
+        action='store_true',
+        help='Do not add this run\'s articles to the archive (NEWS_ARCHIVE_PATH)'
+    )
+    parser.add_argument(
+        '--rollup',
+        type=float,
+        metavar='DAYS',
+        help='Send a "best of" digest of the articles sent in the last DAYS days from the archive, then exit'
+    )
+    parser.add_argument(
+        '--archive-search',
+        metavar='KEYWORDS',
+        help='List archived articles containing every keyword (robot* matches a prefix), then exit'
+    )
+    parser.add_argument(
+        '--since',
+        help='Only list archived articles found or sent since this date (YYYY-MM-DD)'
+    )
+    parser.add_argument(
+        '--quiet',
+        action='store_true',
+        default=os.getenv('NEWS_QUIET', '').lower() in ('1', 'true', 'yes', 'on'),
+        help='Turn off verbose CrewAI output (also NEWS_QUIET=1)'
+    )
+    parser.add_argument(
+        '--metrics-json',
+        default=os.getenv('NEWS_METRICS_JSON'),
+        help='Write a JSON run report with stage timings, token usage and counts to this file'
+    )
+    parser.add_argument(
+        '--metrics-textfile',
+        default=os.getenv('NEWS_METRICS_TEXTFILE'),
+        help='Write run metrics in Prometheus textfile format to this file'
+    )
+    parser.add_argument(
+        '--check',
+        action='store_true',
+        help='Validate the categories, settings and environment, print the search plan and exit'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the search result cache for this run'
+    )
+    parser.add_argument(
+        '--purge-cache',
+        action='store_true',
+        help='Remove all cached search results before running'
+    )
     args = parser.parse_args()
+    set_quiet(args.quiet)
 
+    cache = None
+    ledger = None
+    archive = None
+    news_reader = None
     try:
+        if args.archive_search:
+            # A local lookup needs no API keys
+            load_dotenv()
+            archive = ArticleArchive.from_env()
+            print_archive_search(archive, args.archive_search, category=args.category, since=args.since)
+            return 0
+
+        # NEWS_CATEGORIES and the settings are validated once, before anything heavy is loaded
+        settings = compile_settings(
+            max_workers=get_max_workers(args.workers), pipeline=args.pipeline,
+            early_stop=args.early_stop, min_score=args.min_score,
+            search_timeout=args.search_timeout, deadline=args.deadline
+        )
+        get_plan()
+
         # Load environment variables
         load_environment()
+        if args.check:
+            check_configuration(settings)
+            return 0
 
-        if args.category:
-            # Process news for the specified category only
-            process_medical_news(args.category)
-        else:
-            # Process all categories if none specified
-            for cat in NEWS_CATEGORIES.keys():
-                process_medical_news(cat)
+        if args.redeliver_spool:
+            report = get_delivery_service(os.getenv('RESEND_API_KEY')).redeliver_spool()
+            print(f"\nRedelivered {len(report.sent_ids)} spooled emails, {report.spooled} still spooled")
+            return 0 if report.ok else 1
+
+        if args.purge_cache or not args.no_cache:
+            cache = SearchCache.from_env()
+            if args.purge_cache:
+                cache.purge()
+            if args.no_cache:
+                cache.close()
+                cache = None
+
+        if not args.no_ledger:
+            ledger = SeenLedger.from_env()
+            ledger.compact()
+
+        if not args.no_archive or args.rollup:
+            archive = ArticleArchive.from_env()
+
+        # One reader (and its pool of agents and crews) serves every category
+        news_reader = NewsReaderAgent(cache=cache, ranker=RankingEngine(), archive=archive)
+
+        if args.rollup:
+            return 0 if send_rollup(news_reader, args.rollup, category=args.category) else 1
+
+        # One breaker per process, so the daemon remembers flaky sources between runs
+        options = dict(settings._asdict(), ledger=ledger, breaker=CircuitBreaker.from_env())
+
+        if args.daemon:
+            run_daemon(news_reader, args, **options)
+            return 0
+
+        if args.enqueue or args.worker:
+            queue = JobQueue.from_env()
+            try:
+                if args.enqueue:
+                    enqueue_categories(queue, args.run_id or datetime.now().strftime('%Y%m%d-%H%M%S'),
+                                       category=args.category)
+                else:
+                    run_queue_worker(queue, news_reader, run_id=args.run_id, ledger=ledger,
+                                     search_timeout=settings.search_timeout)
+            finally:
+                queue.close()
+            return 0
+
+        delivered = run_digests(news_reader, category=args.category, **options)
+        return 0 if delivered else 1
 
     except Exception as e:
         logger.error(f"Error in main: {str(e)}", exc_info=True)
         return 1
 
-    return 0
+    finally:
+        if cache is not None:
+            logger.info(f"Search cache stats: {cache.stats()}")
+            cache.close()
+        if ledger is not None:
+            logger.info(f"Seen-article ledger stats: {ledger.stats()}")
+            ledger.close()
+        if archive is not None:
+            logger.info(f"Article archive stats: {archive.stats()}")
+            archive.close()
+        if news_reader is not None:
+            logger.info(f"Prompt mode {news_reader.prompts.mode}, token budget: {news_reader.token_budget.stats()}")
+        write_metrics(args.metrics_json, args.metrics_textfile)
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
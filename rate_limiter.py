@@ -0,0 +1,240 @@
+"""
+Shared per-provider rate limiting for Serper, the LLM and Resend.
+
+Each provider gets a limiter with a requests-per-minute and an optional
+tokens-per-minute token bucket. Callers wait in priority order (FIFO within a
+priority), and a 429 pauses the whole provider for its Retry-After instead of
+failing the work.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from instrumentation import get_metrics
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# provider -> (requests per minute, tokens per minute); 0 means unlimited
+PROVIDER_DEFAULTS = {
+    'serper': (300, 0),
+    'openai': (500, 200000),
+    'resend': (120, 0),
+}
+# Buckets hold this many seconds of quota, so bursts stay short
+BURST_SECONDS = 10
+DEFAULT_RETRY_AFTER = 5.0
+
+
+class RateLimitExceeded(Exception):
+    """A call was still rate limited after every retry"""
+
+
+_wait_listeners = threading.local()
+
+
+@contextmanager
+def quota_wait_listener(listener):
+    """
+    Call listener(True) whenever this thread starts waiting for quota and
+    listener(False) once it has it, e.g. so a timeout can leave waits out.
+    """
+    previous = getattr(_wait_listeners, 'listener', None)
+    _wait_listeners.listener = listener
+    try:
+        yield
+    finally:
+        _wait_listeners.listener = previous
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 units per second, up to capacity"""
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount can be taken (amounts above capacity count as capacity)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount):
+        """Take (or with a negative amount, return) units after the fact; the level may go negative"""
+        self.level = min(self.capacity, self.level - amount)
+
+    def drain(self):
+        self.level = min(self.level, 0.0)
+
+
+class ProviderLimiter:
+    """Blocks callers until a provider's request and token quotas allow another call"""
+
+    def __init__(self, name, requests_per_minute=0, tokens_per_minute=0, clock=time.monotonic):
+        self.name = name
+        self.clock = clock
+        self._requests = TokenBucket(requests_per_minute, clock=clock) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, clock=clock) if tokens_per_minute else None
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+
+    def _reserve(self, tokens):
+        """Take quota for one call and return 0, or return the seconds to wait"""
+        now = self.clock()
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        wait = 0.0
+        if self._requests is not None:
+            wait = max(wait, self._requests.wait_time(1, now))
+        if self._tokens is not None and tokens:
+            wait = max(wait, self._tokens.wait_time(tokens, now))
+        if wait > 0:
+            return wait
+        if self._requests is not None:
+            self._requests.take(1)
+        if self._tokens is not None and tokens:
+            self._tokens.take(tokens)
+        return 0.0
+
+    def acquire(self, tokens=0, priority=PRIORITY_NORMAL):
+        """Wait for quota for one call using about `tokens` tokens; returns the seconds waited"""
+        ticket = (priority, next(self._sequence))
+        start = self.clock()
+        listener = getattr(_wait_listeners, 'listener', None)
+        if listener is not None:
+            listener(True)
+        with self._cond:
+            heapq.heappush(self._waiters, ticket)
+            try:
+                while True:
+                    # Only the highest-priority, longest-waiting caller may take quota
+                    wait = self._reserve(tokens) if self._waiters[0] == ticket else None
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+            finally:
+                self._waiters.remove(ticket)
+                heapq.heapify(self._waiters)
+                self._cond.notify_all()
+                if listener is not None:
+                    listener(False)
+        waited = self.clock() - start
+        if waited > 0.01:
+            get_metrics().increment(f'{self.name}_throttle_seconds', round(waited, 3))
+        return waited
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """Correct the token bucket once a call reports what it really used"""
+        if self._tokens is not None and actual_tokens is not None:
+            with self._cond:
+                self._tokens.adjust(actual_tokens - estimated_tokens)
+
+    def penalize(self, retry_after=None):
+        """Pause the provider after a 429, for Retry-After seconds when the provider gave one"""
+        delay = DEFAULT_RETRY_AFTER if retry_after is None else retry_after
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, self.clock() + delay)
+            if self._requests is not None:
+                self._requests.drain()
+            self._cond.notify_all()
+        get_metrics().increment(f'{self.name}_rate_limited')
+        logger.warning(f"{self.name} rate limit hit, pausing requests for {delay:.1f}s")
+
+
+def _env_number(name, default):
+    value = os.getenv(name)
+    return float(value) if value not in (None, '') else default
+
+
+def limiter_from_env(provider):
+    """Build a limiter from NEWS_RATE_<PROVIDER>_RPM / _TPM, falling back to PROVIDER_DEFAULTS"""
+    rpm, tpm = PROVIDER_DEFAULTS.get(provider, (0, 0))
+    prefix = f'NEWS_RATE_{provider.upper()}'
+    return ProviderLimiter(provider, requests_per_minute=_env_number(f'{prefix}_RPM', rpm),
+                           tokens_per_minute=_env_number(f'{prefix}_TPM', tpm))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider):
+    """Return the limiter every call site shares for a provider"""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = limiter_from_env(provider)
+            _limiters[provider] = limiter
+        return limiter
+
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 errors from requests, openai/litellm or similar clients"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429 or type(error).__name__ == 'RateLimitError'
+
+
+def retry_after_from(error):
+    """Retry-After in seconds from an error's HTTP response, or None"""
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after is not None:
+        return retry_after
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return max(float(headers.get('Retry-After') or headers.get('retry-after')), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def _token_usage(result):
+    usage = getattr(result, 'token_usage', None)
+    if isinstance(usage, dict):
+        return usage.get('total_tokens')
+    return getattr(usage, 'total_tokens', None)
+
+
+def rate_limited_call(provider, func, tokens=0, priority=PRIORITY_NORMAL, max_attempts=None):
+    """
+    Call func() under a provider's limiter, retrying on 429s after the
+    provider's Retry-After. If the result reports token_usage (crew results
+    do), the token bucket is corrected to the actual usage.
+    """
+    limiter = get_limiter(provider)
+    if max_attempts is None:
+        max_attempts = int(os.getenv('NEWS_RATE_MAX_ATTEMPTS', '5'))
+    for attempt in range(1, max_attempts + 1):
+        limiter.acquire(tokens, priority)
+        try:
+            result = func()
+        except Exception as e:
+            if not is_rate_limit_error(e):
+                raise
+            limiter.penalize(retry_after_from(e))
+            if attempt == max_attempts:
+                raise RateLimitExceeded(f"{provider} still rate limited after {attempt} attempts") from e
+            continue
+        if tokens:
+            limiter.record_usage(tokens, _token_usage(result))
+        return result
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the project modules the same way news_manager.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,114 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from agents import archive
+from agents.archive import ArticleArchive, index_terms
+
+DAY = 86400
+START = datetime(2026, 9, 1, tzinfo=timezone.utc).timestamp()
+
+
+class FakeClock:
+    def __init__(self, now=START):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(archive, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArticleArchive(str(tmp_path / 'archive' / 'archive.sqlite3'))
+
+
+def article(title, link, snippet='', query='AI radiology', source='example.com'):
+    return {'title': title, 'link': link, 'snippet': snippet, 'query': query, 'source': source}
+
+
+def test_index_terms_skip_stop_words_and_single_letters():
+    assert index_terms('The AI model detects a nodule in X-rays') == {'ai', 'model', 'detects', 'nodule', 'rays'}
+
+
+def test_articles_are_archived_once_per_category(store, clock):
+    nodules = article('AI detects nodules', 'https://example.com/nodules', 'Chest X-ray study')
+    assert store.record_found('radiology', [nodules]) == 1
+    assert store.record_found('radiology', [dict(nodules, link='https://www.example.com/nodules/')]) == 0
+    assert store.record_found('medicine', [nodules]) == 1
+    store.record_sent('radiology', [nodules])
+    assert store.stats()['articles'] == 2
+    assert store.stats()['deliveries'] == 1
+
+
+def test_search_requires_every_keyword_and_supports_prefixes(store, clock):
+    store.record_found('surgery', [
+        article('Robotic surgery assistant', 'https://example.com/robot', 'A robot for suturing'),
+        article('Robots in the operating room', 'https://example.com/robots', 'Theatre scheduling'),
+        article('AI radiology triage', 'https://example.com/triage', 'Emergency scans'),
+    ])
+    assert [item['link'] for item in store.search('robotic suturing')] == ['https://example.com/robot']
+    assert {item['link'] for item in store.search('robot*')} == {
+        'https://example.com/robot', 'https://example.com/robots',
+    }
+    assert store.search('oncology') == []
+    # Keywords made only of stop words match nothing rather than everything
+    assert store.search('the and') == []
+    found = store.search('triage')[0]
+    assert found['snippet'] == 'Emergency scans'
+    assert found['category'] == 'surgery' and found['date'] == '2026-09-01'
+
+
+def test_search_filters_by_category_dates_and_delivery(store, clock):
+    old = article('AI radiology old', 'https://example.com/old')
+    store.record_found('radiology', [old])
+    clock.now += 10 * DAY
+    new = article('AI radiology new', 'https://example.com/new')
+    store.record_found('radiology', [new])
+    store.record_found('surgery', [article('AI surgery', 'https://example.com/surgery')])
+    clock.now += DAY
+    store.record_sent('radiology', [old])
+
+    # Newest first, by when the article was last sent or found
+    assert [item['link'] for item in store.search(category='radiology')] == [
+        'https://example.com/old', 'https://example.com/new',
+    ]
+    assert [item['link'] for item in store.search(category='radiology', since='2026-09-05')] == [
+        'https://example.com/new',
+    ]
+    sent = store.search(sent_only=True, since='2026-09-05')
+    assert [item['link'] for item in sent] == ['https://example.com/old']
+    assert sent[0]['date'] == '2026-09-12'
+    assert len(store.search(limit=2)) == 2
+
+
+def test_rollup_keeps_the_newest_articles_of_each_category(store, clock):
+    for index in range(5):
+        clock.now += 60
+        store.record_sent('radiology', [article(f'Radiology {index}', f'https://example.com/r{index}')])
+        store.record_sent('surgery', [article(f'Surgery {index}', f'https://example.com/s{index}')])
+    store.record_found('medicine', [article('Unsent', 'https://example.com/unsent')])
+
+    rollup = store.rollup(since=START, per_category=2)
+    assert set(rollup) == {'radiology', 'surgery'}
+    assert [item['link'] for item in rollup['radiology']] == ['https://example.com/r4', 'https://example.com/r3']
+    assert [item['link'] for item in rollup['surgery']] == ['https://example.com/s4', 'https://example.com/s3']
+
+    assert store.rollup(since=START, categories=['surgery'], keywords='surgery', per_category=1) == {
+        'surgery': store.search('surgery', category='surgery', sent_only=True, limit=1),
+    }
+    assert store.rollup(since=START + DAY) == {}
+
+
+def test_archive_survives_a_restart(tmp_path, clock):
+    path = str(tmp_path / 'archive.sqlite3')
+    first = ArticleArchive(path)
+    first.record_found('radiology', [article('AI detects nodules', 'https://example.com/nodules')])
+    first.close()
+    assert [item['title'] for item in ArticleArchive(path).search('nodules')] == ['AI detects nodules']
@@ -0,0 +1,124 @@
+import copy
+import os
+import types
+from datetime import datetime
+
+import pytest
+
+import config.news_sources
+import daemon
+from config.plan import reset_plan
+from daemon import CronSchedule, NewsDaemon, reload_news_categories
+
+CATEGORY = {'sources': ['example.com'], 'queries': ['AI radiology']}
+
+
+@pytest.fixture
+def categories():
+    """The live NEWS_CATEGORIES, restored after the test"""
+    current = config.news_sources.NEWS_CATEGORIES
+    saved = copy.deepcopy(current)
+    yield current
+    current.clear()
+    current.update(saved)
+    config.news_sources.NEWS_CATEGORIES = current
+    reset_plan()
+
+
+def fake_reload(monkeypatch, new_categories=None, error=None):
+    def reload(module):
+        if error is not None:
+            raise error
+        return types.SimpleNamespace(NEWS_CATEGORIES=new_categories)
+    monkeypatch.setattr(daemon.importlib, 'reload', reload)
+
+
+@pytest.mark.parametrize('expression, after, expected', [
+    ('0 7 * * *', datetime(2026, 10, 17, 6, 59), datetime(2026, 10, 17, 7, 0)),
+    ('0 7 * * *', datetime(2026, 10, 17, 7, 0), datetime(2026, 10, 18, 7, 0)),
+    ('*/15 9-10 * * *', datetime(2026, 10, 17, 9, 16), datetime(2026, 10, 17, 9, 30)),
+    ('30 8 * * 1-5', datetime(2026, 10, 17, 12, 0), datetime(2026, 10, 19, 8, 30)),
+    ('0 0 * * 7', datetime(2026, 10, 17, 12, 0), datetime(2026, 10, 18, 0, 0)),
+    ('0 6 1 1,7 *', datetime(2026, 10, 17, 12, 0), datetime(2027, 1, 1, 6, 0)),
+    # Restricting both day fields matches either: the 20th, or any Monday
+    ('0 6 20 * 1', datetime(2026, 10, 17, 12, 0), datetime(2026, 10, 19, 6, 0)),
+    ('@hourly', datetime(2026, 10, 17, 12, 5), datetime(2026, 10, 17, 13, 0)),
+    ('@weekly', datetime(2026, 10, 17, 12, 0), datetime(2026, 10, 18, 0, 0)),
+])
+def test_next_after(expression, after, expected):
+    assert CronSchedule(expression).next_after(after) == expected
+
+
+@pytest.mark.parametrize('expression', [
+    '0 7 * *', '60 * * * *', '0 24 * * *', '*/0 * * * *', '0 7 32 * *', '0 7 * * mon', '5-1 * * * *',
+])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_expression_that_never_matches_raises():
+    with pytest.raises(ValueError):
+        CronSchedule('0 0 31 2 *').next_after(datetime(2026, 10, 17))
+
+
+def test_reload_updates_categories_in_place(categories, monkeypatch):
+    fake_reload(monkeypatch, {'oncology': dict(CATEGORY, schedule='@daily')})
+    assert reload_news_categories()
+    assert config.news_sources.NEWS_CATEGORIES is categories
+    assert list(categories) == ['oncology']
+
+
+@pytest.mark.parametrize('new_categories, error', [
+    (None, SyntaxError('invalid syntax')),
+    ({'oncology': dict(CATEGORY, schedule='every morning')}, None),
+    ({'oncology': {'sources': [], 'queries': ['AI']}}, None),
+])
+def test_invalid_reload_keeps_the_current_categories(categories, monkeypatch, new_categories, error):
+    before = copy.deepcopy(categories)
+    fake_reload(monkeypatch, new_categories, error)
+    assert not reload_news_categories()
+    assert config.news_sources.NEWS_CATEGORIES is categories
+    assert categories == before
+
+
+def test_daemon_reschedules_when_the_config_changes(categories, monkeypatch, tmp_path):
+    config_path = tmp_path / 'news_sources.py'
+    config_path.write_text('', encoding='utf-8')
+    news_daemon = NewsDaemon(lambda category: None, categories=categories, jitter=0,
+                             config_path=str(config_path))
+    news_daemon.schedule_all()
+    assert set(news_daemon.next_runs) == set(categories)
+    assert not news_daemon.check_config()
+
+    fake_reload(monkeypatch, {'radiology': dict(categories['radiology'], schedule='@hourly'),
+                              'oncology': CATEGORY})
+    mtime = os.path.getmtime(config_path) + 10
+    os.utime(config_path, (mtime, mtime))
+    assert news_daemon.check_config()
+    assert set(news_daemon.next_runs) == {'radiology', 'oncology'}
+    assert news_daemon._expressions['radiology'] == '@hourly'
+
+
+def test_run_pending_runs_due_categories_and_survives_failures(categories):
+    ran = []
+
+    def run_category(category):
+        ran.append(category)
+        if category == 'radiology':
+            raise RuntimeError('provider down')
+
+    news_daemon = NewsDaemon(run_category, categories=categories, jitter=0, config_path='missing.py')
+    news_daemon.schedule_all()
+    due = {'radiology': 1.0, 'surgery': 2.0}
+    news_daemon.next_runs.update(due)
+    news_daemon.run_pending()
+
+    assert ran == ['radiology', 'surgery']
+    # Both ran, failure or not, and were moved to their next scheduled time
+    assert all(news_daemon.next_runs[category] > due[category] for category in due)
+
+    news_daemon.stop()
+    news_daemon.next_runs['medicine'] = 1.0
+    news_daemon.run_pending()
+    assert ran == ['radiology', 'surgery']
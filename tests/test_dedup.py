@@ -0,0 +1,50 @@
+import pytest
+
+from agents.dedup import MinHasher, canonicalize_url, deduplicate_articles, jaccard, shingles
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://www.example.com/news/story/', 'https://example.com/news/story'),
+    ('http://m.example.com//news//story?utm_source=x&id=2&fbclid=y#top', 'https://example.com/news/story?id=2'),
+    ('example.com/news/story/amp', 'https://example.com/news/story'),
+    ('https://example.com/?b=2&a=1', 'https://example.com/?a=1&b=2'),
+    ('', ''),
+    (None, ''),
+    # Malformed LLM output falls back to the lower-cased link instead of raising
+    ('  https://[Foo/bar ', 'https://[foo/bar'),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+def test_shingles_and_jaccard():
+    assert shingles('AI finds lung nodules', 2) == {'ai finds', 'finds lung', 'lung nodules'}
+    assert shingles('Short', 3) == {'short'}
+    assert jaccard({'a', 'b'}, {'b', 'c'}) == pytest.approx(1 / 3)
+    assert jaccard(set(), {'a'}) == 0.0
+
+
+def test_minhash_pairs_near_duplicates_only():
+    sets = [shingles(text, 2) for text in (
+        'deep learning model detects early lung nodules on chest x rays',
+        'deep learning model detects early lung nodules on chest x rays study',
+        'robotic surgery platform cuts operating time in hospital trial',
+    )]
+    assert set(MinHasher(num_perm=64, bands=32).candidate_pairs(sets)) == {(0, 1)}
+    with pytest.raises(ValueError):
+        MinHasher(num_perm=10, bands=4)
+
+
+def test_deduplicate_merges_same_url_and_near_duplicate_titles():
+    articles = [
+        {'title': 'AI model reads chest X-rays as well as radiologists', 'link': 'https://www.example.com/a?utm_source=x'},
+        {'title': 'Hospital adopts robotic surgery platform', 'link': 'https://news.example.org/robot'},
+        {'title': 'Completely different headline', 'link': 'https://example.com/a/'},
+        {'title': 'AI model reads chest X-rays as well as radiologists, study finds', 'link': 'https://other.org/b'},
+        {'title': 'Broken link', 'link': 'https://[oops'},
+    ]
+    unique, merged = deduplicate_articles(articles)
+    assert merged == 2
+    assert [article['link'] for article in unique] == [
+        'https://www.example.com/a?utm_source=x', 'https://news.example.org/robot', 'https://[oops'
+    ]
@@ -0,0 +1,125 @@
+import json
+import os
+
+import pytest
+
+from Gateway.delivery import (
+    DeliveryError, DeliveryService, EmailMessage, RecordingTransport, ResendTransport, TransientDeliveryError
+)
+
+
+def make_messages(count):
+    return [EmailMessage(sender='news@example.com', to=[f'reader{i}@example.com'], subject='News',
+                         html=f'<p>{i}</p>') for i in range(count)]
+
+
+class FlakyTransport(RecordingTransport):
+    """Records messages, but raises errors[i] for the i-th call while there are any left"""
+
+    max_batch_size = 2
+
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+        self.calls = 0
+
+    def send_batch(self, messages):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return super().send_batch(messages)
+
+
+@pytest.fixture
+def spool_dir(tmp_path):
+    return str(tmp_path / 'outbox')
+
+
+def make_service(transport, spool_dir, delays=None):
+    return DeliveryService(transport, spool_dir=spool_dir, max_attempts=3,
+                           sleep=(delays.append if delays is not None else lambda seconds: None))
+
+
+def test_transient_failures_are_retried_with_backoff(spool_dir):
+    delays = []
+    transport = FlakyTransport([TransientDeliveryError('timeout'), TransientDeliveryError('429', retry_after=7)])
+    report = make_service(transport, spool_dir, delays).send(make_messages(1))
+    assert report.ok and len(report.sent_ids) == 1
+    assert transport.calls == 3
+    assert delays[0] <= 1.0 and delays[1] >= 7
+    assert os.listdir(spool_dir) == []
+
+
+def test_permanent_failure_is_spooled_without_retrying(spool_dir):
+    transport = FlakyTransport([DeliveryError('invalid recipient')])
+    report = make_service(transport, spool_dir).send(make_messages(1))
+    assert report.spooled == 1 and transport.calls == 1
+    assert len(os.listdir(spool_dir)) == 1
+
+
+def test_unexpected_error_spools_the_batch_and_later_batches_are_still_sent(spool_dir):
+    transport = FlakyTransport([ValueError('broken transport')])
+    report = make_service(transport, spool_dir).send(make_messages(4))
+    assert report.spooled == 2
+    assert [message.html for message in transport.messages] == ['<p>2</p>', '<p>3</p>']
+
+
+def test_spooled_messages_are_redelivered(spool_dir):
+    transport = FlakyTransport([TransientDeliveryError('down')] * 3)
+    service = make_service(transport, spool_dir)
+    assert service.send(make_messages(1)).spooled == 1
+
+    report = service.redeliver_spool()
+    assert report.ok and len(report.sent_ids) == 1
+    assert service.spooled_files() == []
+
+
+class FakeResponse:
+    def __init__(self, status_code, body, headers=None):
+        self.status_code = status_code
+        self.content = body.encode('utf-8')
+        self.text = body
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class FakeSession:
+    def __init__(self, outcome):
+        self.headers = {}
+        self.outcome = outcome
+
+    def post(self, url, data=None, headers=None, timeout=None):
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+    def close(self):
+        pass
+
+
+def test_resend_request_errors_are_transient():
+    requests = pytest.importorskip('requests')
+    for error in (requests.exceptions.SSLError('bad handshake'),
+                  requests.exceptions.ChunkedEncodingError('truncated'),
+                  requests.exceptions.TooManyRedirects('loop')):
+        transport = ResendTransport('key', session=FakeSession(error))
+        with pytest.raises(TransientDeliveryError):
+            transport.send_batch(make_messages(1))
+
+
+def test_resend_body_that_is_not_json_is_a_delivery_error(spool_dir):
+    pytest.importorskip('requests')
+    transport = ResendTransport('key', session=FakeSession(FakeResponse(200, '<html>OK</html>')))
+    with pytest.raises(DeliveryError):
+        transport.send_batch(make_messages(1))
+
+    report = make_service(transport, spool_dir).send(make_messages(1))
+    assert report.spooled == 1
+
+
+def test_resend_ids_are_returned():
+    pytest.importorskip('requests')
+    transport = ResendTransport('key', session=FakeSession(FakeResponse(200, '{"data": [{"id": "a"}, {"id": "b"}]}')))
+    assert transport.send_batch(make_messages(2)) == ['a', 'b']
@@ -0,0 +1,55 @@
+from Gateway import digest_renderer
+from Gateway.digest_renderer import (DEFAULT_DIGEST_TITLE, DigestRenderer, digest_title,
+                                     render_document)
+
+ARTICLES = [
+    {'title': 'AI detects nodules', 'link': 'https://example.com/nodules', 'snippet': 'A study.'},
+    {'title': 'Triage <beta>', 'link': 'https://example.com/triage?a=1&b="2"', 'snippet': 'Fast & safe.'},
+]
+
+
+def test_render_includes_every_article_in_html_and_text():
+    digest = DigestRenderer().render('Latest AI in Radiology Updates', ARTICLES)
+    assert digest.title == 'Latest AI in Radiology Updates'
+    assert digest.html.startswith('<!DOCTYPE html>')
+    assert '<h1>Latest AI in Radiology Updates</h1>' in digest.html
+    assert digest.html.index('AI detects nodules') < digest.html.index('Triage')
+    assert '1. AI detects nodules\nA study.\nRead the full article: https://example.com/nodules' in digest.text
+    assert digest.text.count('Read the full article:') == 2
+
+
+def test_article_fields_are_escaped():
+    html = DigestRenderer().render('Digest', ARTICLES).html
+    assert 'Triage &lt;beta&gt;' in html
+    assert 'Fast &amp; safe.' in html
+    assert 'href="https://example.com/triage?a=1&amp;b=&quot;2&quot;"' in html
+
+
+def test_sections_number_articles_across_headings():
+    digest = DigestRenderer().render_sections(DEFAULT_DIGEST_TITLE, [
+        ('Radiology', ARTICLES[:1]), ('Surgery', ARTICLES[1:]),
+    ])
+    assert '<h2>Radiology</h2>' in digest.html and '<h2>Surgery</h2>' in digest.html
+    assert '1. AI detects nodules' in digest.text
+    assert '2. Triage <beta>' in digest.text
+
+
+def test_article_fragments_are_rendered_once_and_bounded(monkeypatch):
+    renderer = DigestRenderer()
+    first = renderer.render('Radiology', ARTICLES)
+    second = renderer.render('Weekly', list(reversed(ARTICLES)))
+    assert len(renderer._fragments) == 2
+    assert first.html.count('class="article"') == 2
+    assert second.html.index('Triage') < second.html.index('AI detects nodules')
+
+    monkeypatch.setattr(digest_renderer, '_MAX_FRAGMENTS', 2)
+    renderer.render('More', [dict(ARTICLES[0], link='https://example.com/other')])
+    assert len(renderer._fragments) == 1
+
+
+def test_digest_title_and_document_wrapper():
+    assert digest_title('radiology') == 'Latest AI in Radiology Updates'
+    assert digest_title(None) == DEFAULT_DIGEST_TITLE
+    document = render_document('<p>Body</p>', title='Title & more')
+    assert '<h1>Title &amp; more</h1>\n<p>Body</p>' in document
+    assert document.endswith('</html>\n')
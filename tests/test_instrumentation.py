@@ -0,0 +1,39 @@
+import threading
+
+from agents.search_runner import run_in_thread
+from instrumentation import RunMetrics
+
+
+def test_categories_are_recorded_per_thread():
+    metrics = RunMetrics()
+    inside = threading.Barrier(2)
+
+    def search(category):
+        with metrics.for_category(category):
+            inside.wait(timeout=5)
+            metrics.increment('searches')
+
+    threads = [threading.Thread(target=search, args=(category,)) for category in ('radiology', 'surgery')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters = {entry['category']: entry['value'] for entry in metrics.report()['counters']}
+    assert counters == {'radiology': 1, 'surgery': 1}
+    assert metrics.category is None
+
+
+def test_search_threads_keep_the_category_they_were_started_in():
+    metrics = RunMetrics()
+    release = threading.Event()
+
+    def search():
+        release.wait(timeout=5)
+        metrics.record_tokens({'prompt_tokens': 10, 'completion_tokens': 5})
+
+    with metrics.for_category('radiology'):
+        future = run_in_thread(search)
+    with metrics.for_category('surgery'):
+        release.set()
+        future.result(timeout=5)
+    assert list(metrics.report()['tokens']['by_category']) == ['radiology']
@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from job_queue import ALL_CATEGORIES, DONE, FAILED, JobQueue
+
+UNITS = [('radiology', 'AI radiology', 'example.com'), ('radiology', 'AI imaging', 'example.com')]
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite3')
+
+
+def make_queue(path, **options):
+    options.setdefault('retry_delay', 0)
+    return JobQueue(path, **options)
+
+
+def test_enqueue_is_idempotent(queue_path):
+    queue = make_queue(queue_path)
+    assert queue.enqueue_run('run', UNITS) == 2
+    assert queue.enqueue_run('run', UNITS) == 0
+    assert queue.counts('run') == {'pending': 2}
+
+
+def test_expired_lease_is_picked_up_by_another_worker(queue_path):
+    queue = make_queue(queue_path, lease_seconds=0.05)
+    queue.enqueue_run('run', UNITS[:1])
+    first = queue.lease('worker-1')
+    assert queue.lease('worker-2') is None
+
+    time.sleep(0.1)
+    second = queue.lease('worker-2')
+    assert second.id == first.id
+    assert second.attempts == 2
+    assert not queue.extend_lease(first, 'worker-1')
+
+
+def test_stale_worker_cannot_fail_or_complete_a_re_leased_unit(queue_path):
+    queue = make_queue(queue_path, lease_seconds=0.05)
+    queue.enqueue_run('run', UNITS[:1])
+    stale = queue.lease('worker-1')
+    time.sleep(0.1)
+    current = queue.lease('worker-2')
+
+    assert not queue.fail(stale, RuntimeError('worker-1 gave up'))
+    assert not queue.complete(stale, [{'title': 'stale'}])
+    assert queue.counts('run') == {'leased': 1}
+    assert queue.lease('worker-3') is None
+
+    assert queue.complete(current, [{'title': 'current'}])
+    assert queue.results('run', 'radiology') == [{'title': 'current'}]
+
+
+def test_keep_leased_renews_the_lease_while_the_unit_runs(queue_path):
+    queue = make_queue(queue_path, lease_seconds=0.15)
+    queue.enqueue_run('run', UNITS[:1])
+    job = queue.lease('worker-1')
+    with queue.keep_leased(job, 'worker-1'):
+        time.sleep(0.4)
+        assert queue.lease('worker-2') is None
+    assert queue.complete(job, [])
+
+
+def test_completion_is_idempotent(queue_path):
+    queue = make_queue(queue_path)
+    queue.enqueue_run('run', UNITS[:1])
+    job = queue.lease('worker-1')
+    assert queue.complete(job, [{'title': 'first'}])
+    assert not queue.complete(job, [{'title': 'second'}])
+    assert queue.results('run', 'radiology') == [{'title': 'first'}]
+    assert queue.counts('run') == {DONE: 1}
+
+
+def test_concurrent_workers_lease_each_unit_once(queue_path):
+    units = [('radiology', f'query {i}', 'example.com') for i in range(40)]
+    make_queue(queue_path).enqueue_run('run', units)
+    leased = []
+
+    def worker(name):
+        queue = make_queue(queue_path)
+        while True:
+            job = queue.lease(name)
+            if job is None:
+                break
+            leased.append(job.id)
+            queue.complete(job, [])
+        queue.close()
+
+    threads = [threading.Thread(target=worker, args=(f'worker-{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(leased) == sorted(set(leased))
+    assert len(leased) == len(units)
+    assert make_queue(queue_path).counts('run') == {DONE: len(units)}
+
+
+def test_only_one_worker_claims_an_aggregation(queue_path):
+    make_queue(queue_path).enqueue_run('run', UNITS)
+    barrier = threading.Barrier(4)
+    claims = []
+
+    def claim(name):
+        queue = make_queue(queue_path)
+        barrier.wait()
+        claims.append(queue.claim_aggregation('run', 'radiology', name))
+        queue.close()
+
+    threads = [threading.Thread(target=claim, args=(f'worker-{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(claims) == [False, False, False, True]
+
+
+def test_failed_unit_is_retried_until_max_attempts(queue_path):
+    queue = make_queue(queue_path, max_attempts=2)
+    queue.enqueue_run('run', UNITS[:1])
+    queue.fail(queue.lease('worker-1'), RuntimeError('boom'))
+    assert queue.counts('run') == {'pending': 1}
+    queue.fail(queue.lease('worker-1'), RuntimeError('boom'))
+    assert queue.counts('run') == {FAILED: 1}
+    assert queue.lease('worker-1') is None
+    assert not queue.has_unfinished('run')
+
+
+def test_unit_whose_lease_keeps_expiring_is_marked_failed(queue_path):
+    queue = make_queue(queue_path, lease_seconds=0.05, max_attempts=2)
+    queue.enqueue_run('run', UNITS[:1])
+    assert queue.lease('worker-1').attempts == 1
+    time.sleep(0.1)
+    assert queue.lease('worker-2').attempts == 2
+    time.sleep(0.1)
+    assert queue.lease('worker-3') is None
+    assert queue.counts('run') == {FAILED: 1}
+    assert queue.finished_categories('run') == [('run', 'radiology')]
+
+
+def test_failing_aggregation_is_given_up_after_max_attempts(queue_path):
+    queue = make_queue(queue_path, max_attempts=2)
+    queue.enqueue_run('run', UNITS[:1])
+    queue.complete(queue.lease('worker-1'), [])
+
+    for _ in range(2):
+        assert queue.claim_aggregation('run', 'radiology', 'worker-1')
+        queue.release_aggregation('run', 'radiology', error=RuntimeError('send failed'))
+    assert not queue.claim_aggregation('run', 'radiology', 'worker-1')
+    assert queue.finished_categories('run') == []
+    assert queue.aggregated_articles('run') == {}
+    assert queue.runs_awaiting_final('run') == ['run']
+
+
+def test_released_aggregation_waits_for_its_retry(queue_path):
+    queue = make_queue(queue_path, retry_delay=60)
+    queue.enqueue_run('run', UNITS[:1])
+    queue.complete(queue.lease('worker-1'), [])
+    assert queue.claim_aggregation('run', ALL_CATEGORIES, 'worker-1')
+    queue.release_aggregation('run', ALL_CATEGORIES, error='send failed')
+    assert not queue.claim_aggregation('run', ALL_CATEGORIES, 'worker-2')
+
+
+def test_opens_a_queue_created_before_aggregation_attempts(queue_path):
+    conn = sqlite3.connect(queue_path)
+    conn.execute("CREATE TABLE aggregations (run_id TEXT NOT NULL, category TEXT NOT NULL, owner TEXT, "
+                 "lease_expires REAL, completed_at REAL, articles TEXT, PRIMARY KEY (run_id, category))")
+    conn.close()
+    queue = make_queue(queue_path)
+    assert queue.claim_aggregation('run', 'radiology', 'worker-1')
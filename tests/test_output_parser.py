@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from agents import crew_streaming
+from agents.output_parser import StreamingArticleParser, parse_articles, validate_articles
+
+OUTPUT = (
+    "Thought: I now know the final answer\n"
+    "Final Answer: TITLE: AI reads chest X-rays\n"
+    "URL: https://example.com/xray\n"
+    "SUMMARY: A deep learning model matched radiologists\n"
+    "on 100,000 studies.\n"
+    "\n"
+    "TITLE: Robots in the operating room\n"
+    "URL: https://example.com/robots\n"
+    "SUMMARY: A hospital trial cut operating time.\n"
+)
+EXPECTED = [
+    {'title': 'AI reads chest X-rays', 'link': 'https://example.com/xray',
+     'snippet': 'A deep learning model matched radiologists on 100,000 studies.'},
+    {'title': 'Robots in the operating room', 'link': 'https://example.com/robots',
+     'snippet': 'A hospital trial cut operating time.'},
+]
+
+
+def test_parse_articles():
+    assert parse_articles(OUTPUT) == EXPECTED
+
+
+@pytest.mark.parametrize('size', [1, 3, 7, 16])
+def test_chunks_split_mid_field_give_the_same_articles(size):
+    parser = StreamingArticleParser()
+    completed = []
+    for start in range(0, len(OUTPUT), size):
+        completed.extend(parser.feed(OUTPUT[start:start + size]))
+    # The first article is complete as soon as the blank line arrives, before the output ends
+    assert completed == EXPECTED[:1]
+    assert completed + parser.close() == EXPECTED
+
+
+def test_agent_markers_end_the_summary():
+    articles = parse_articles(
+        "TITLE: AI triage\nURL: https://example.com/triage\nSUMMARY: Faster triage.\n"
+        "Thought: I should search again\nAction: Search the internet\n"
+    )
+    assert articles == [{'title': 'AI triage', 'link': 'https://example.com/triage', 'snippet': 'Faster triage.'}]
+
+
+def test_validate_articles_drops_incomplete_blocks():
+    articles = parse_articles("TITLE: No link\nSUMMARY: Missing its URL.\n\n" + OUTPUT)
+    assert validate_articles(articles) == EXPECTED
+
+
+class FakeChunkEvent:
+    def __init__(self, chunk, agent_id=None):
+        self.chunk = chunk
+        self.agent_id = agent_id
+
+
+class FakeEventBus:
+    def __init__(self):
+        self.handlers = []
+
+    def on(self, event_type):
+        def register(handler):
+            self.handlers.append(handler)
+            return handler
+        return register
+
+    def emit(self, source, event):
+        for handler in self.handlers:
+            handler(source, event)
+
+
+class FakeAgent:
+    def __init__(self, agent_id):
+        self.id = agent_id
+        self.llm = object()
+
+
+class ExecutorThreadCrew:
+    """Emits its stream chunks from another thread, as some CrewAI versions do"""
+
+    def __init__(self, bus, agent_id, chunks, by_agent_id=False):
+        self.bus = bus
+        self.agents = [FakeAgent(agent_id)]
+        self.chunks = chunks
+        self.by_agent_id = by_agent_id
+
+    def kickoff(self, inputs=None):
+        agent = self.agents[0]
+
+        def emit():
+            for chunk in self.chunks:
+                source = object() if self.by_agent_id else agent.llm
+                self.bus.emit(source, FakeChunkEvent(chunk, agent.id if self.by_agent_id else None))
+
+        thread = threading.Thread(target=emit)
+        thread.start()
+        thread.join()
+        return 'done'
+
+
+@pytest.fixture
+def event_bus(monkeypatch):
+    bus = FakeEventBus()
+    monkeypatch.setattr(crew_streaming, '_streaming_api', (FakeChunkEvent, bus))
+    monkeypatch.setattr(crew_streaming, '_registered', False)
+    monkeypatch.setattr(crew_streaming, '_listeners', {})
+    return bus
+
+
+@pytest.mark.parametrize('by_agent_id', [False, True])
+def test_chunks_from_an_executor_thread_reach_their_kickoff(event_bus, by_agent_id):
+    received = {'a': [], 'b': []}
+    crews = {name: ExecutorThreadCrew(event_bus, f'agent-{name}', [f'{name}1', f'{name}2'], by_agent_id)
+             for name in received}
+    threads = [threading.Thread(target=crew_streaming.kickoff_streaming, args=(crew, {}, received[name].append))
+               for name, crew in crews.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert received == {'a': ['a1', 'a2'], 'b': ['b1', 'b2']}
+    assert crew_streaming._listeners == {}
@@ -0,0 +1,50 @@
+import pytest
+
+from agents.prompts import PromptBuilder, TokenBudget, TokenBudgetExceeded, usage_total_tokens
+from agents.staged_pipeline import summarize_hits
+from benchmarks.fakes import FakeUsage
+
+HITS = [{'title': 'AI reads chest X-rays', 'link': 'https://example.com/a', 'snippet': 'A model...'}]
+
+
+class FailingCrew:
+    def __init__(self, description=None):
+        pass
+
+    def kickoff(self, inputs=None):
+        raise RuntimeError('LLM unavailable')
+
+
+def test_usage_total_tokens_reads_objects_and_dicts():
+    assert usage_total_tokens(FakeUsage(100, 20)) == 120
+    assert usage_total_tokens({'total_tokens': 42}) == 42
+    assert usage_total_tokens(None) is None
+
+
+def test_budget_settles_and_releases_reservations():
+    budget = TokenBudget(limit=1000)
+    budget.reserve(600)
+    with pytest.raises(TokenBudgetExceeded):
+        budget.reserve(600)
+    budget.settle(600, 250)
+    budget.reserve(300)
+    budget.release(300)
+    assert budget.stats() == {'limit': 1000, 'used': 250, 'refused': 1}
+
+
+def test_failed_summary_gives_its_reservation_back():
+    budget = TokenBudget(limit=100000)
+    with pytest.raises(RuntimeError):
+        summarize_hits(HITS, crew_factory=FailingCrew, prompts=PromptBuilder(mode='compact'), token_budget=budget)
+    assert budget.used == 0
+
+
+def test_failed_search_gives_its_reservation_back(monkeypatch):
+    pytest.importorskip('dotenv')
+    from agents.news_reader import NewsReaderAgent
+
+    monkeypatch.delenv('NEWS_STREAMING', raising=False)
+    budget = TokenBudget(limit=100000)
+    news_reader = NewsReaderAgent(crew_factory=FailingCrew, token_budget=budget)
+    assert news_reader.search_news('AI radiology', 'example.com') == []
+    assert budget.used == 0
@@ -0,0 +1,57 @@
+import os
+import threading
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+from agents.news_reader import NewsReaderAgent  # noqa: E402
+from benchmarks.fakes import FakeSearchCrew  # noqa: E402
+from Gateway.delivery import DeliveryService, RecordingTransport  # noqa: E402
+from job_queue import DONE, FAILED, JobQueue  # noqa: E402
+import news_manager  # noqa: E402
+
+
+class HangingCrew:
+    def kickoff(self, inputs=None):
+        threading.Event().wait()
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.setenv('NEWS_DATA_DIR', str(tmp_path))
+    monkeypatch.setenv('EMAIL_RECIPIENTS', 'doctor@example.com')
+    monkeypatch.delenv('NEWS_SUBSCRIPTIONS_FILE', raising=False)
+    monkeypatch.delenv('NEWS_STREAMING', raising=False)
+    return tmp_path
+
+
+def run_worker(queue, news_reader, **options):
+    worker = threading.Thread(target=news_manager.run_queue_worker, args=(queue, news_reader),
+                              kwargs=dict(idle_seconds=0.01, **options), daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    return not worker.is_alive()
+
+
+def test_worker_finishes_when_the_digest_is_spooled(env):
+    spool = env / 'outbox'
+    delivery = DeliveryService(RecordingTransport(failures=10 ** 6), spool_dir=str(spool),
+                               sleep=lambda seconds: None)
+    news_reader = NewsReaderAgent(crew_factory=FakeSearchCrew, delivery=delivery)
+    queue = JobQueue(str(env / 'jobs.sqlite3'), retry_delay=0)
+    queue.enqueue_run('run', [('radiology', 'AI radiology', 'example.com')])
+
+    assert run_worker(queue, news_reader)
+    assert queue.counts('run') == {DONE: 1}
+    assert queue.finished_categories('run') == []
+    assert len(os.listdir(spool)) == 1
+
+
+def test_worker_gives_up_on_a_search_that_never_returns(env):
+    news_reader = NewsReaderAgent(crew_factory=HangingCrew, delivery=DeliveryService(RecordingTransport()))
+    queue = JobQueue(str(env / 'jobs.sqlite3'), max_attempts=2, retry_delay=0)
+    queue.enqueue_run('run', [('radiology', 'AI radiology', 'example.com')])
+
+    assert run_worker(queue, news_reader, search_timeout=0.1)
+    assert queue.counts('run') == {FAILED: 1}
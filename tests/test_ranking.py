@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+from agents import ranking
+from agents.ranking import RankingContext, RankingEngine, QualityStop, recency_score
+
+NOW = time.mktime((2026, 10, 17, 12, 0, 0, 0, 0, -1))
+
+
+def article(title, link, query='AI radiology', source='example.com', snippet='', date=''):
+    return {'title': title, 'link': link, 'query': query, 'source': source,
+            'snippet': snippet, 'date': date}
+
+
+@pytest.fixture
+def context():
+    return RankingContext(queries=['AI radiology'], sources=['example.com', 'other.org'], now=NOW)
+
+
+def test_rank_orders_by_query_match_source_and_recency(context):
+    articles = [
+        article('Hospital budget update', 'https://example.com/budget', date='1 month ago'),
+        article('AI radiology model', 'https://other.org/model', source='other.org', date='1 day ago'),
+        article('AI radiology screening', 'https://example.com/old', date='1 year ago'),
+        article('AI radiology triage', 'https://example.com/new', date='2 hours ago'),
+    ]
+    ranked = RankingEngine().rank(articles, context)
+    assert [item['link'] for item in ranked] == [
+        'https://example.com/new', 'https://other.org/model',
+        'https://example.com/old', 'https://example.com/budget',
+    ]
+    assert all(ranked[i]['score'] >= ranked[i + 1]['score'] for i in range(len(ranked) - 1))
+
+
+def test_undated_articles_are_ranked_without_recency(context):
+    assert recency_score(article('AI radiology', 'https://example.com/a'), context) is None
+    engine = RankingEngine()
+    undated = article('AI radiology', 'https://example.com/a')
+    # Without a date, the recency weight drops out instead of scoring every article 0.5
+    expected = RankingEngine(scorers={
+        name: scorer for name, scorer in engine.scorers.items() if name != 'recency'
+    }).base_score(undated, context)
+    assert engine.base_score(undated, context) == pytest.approx(expected)
+
+
+def test_similar_titles_are_pushed_down(context):
+    articles = [
+        article('AI radiology model detects nodules', 'https://example.com/a'),
+        article('AI radiology model detects nodules early', 'https://example.com/b'),
+        article('AI radiology triage in emergency care', 'https://example.com/c'),
+    ]
+    ranked = RankingEngine(uniqueness_weight=0.5).rank(articles, context)
+    assert [item['link'] for item in ranked] == [
+        'https://example.com/a', 'https://example.com/c', 'https://example.com/b',
+    ]
+
+
+def test_malformed_link_does_not_stop_ranking():
+    context = RankingContext(queries=['AI'], sources=['example.com'], now=NOW)
+    ranked = RankingEngine().rank([article('AI', 'http://[::1', source='')], context)
+    assert len(ranked) == 1
+
+
+def test_top_scores_each_article_once_and_compares_n_times_limit(context, monkeypatch):
+    articles = [article(f'AI radiology story {i}', f'https://example.com/{i}') for i in range(50)]
+    scored = []
+    compared = []
+    jaccard = ranking.jaccard
+
+    def counting_scorer(item, _context):
+        scored.append(item['link'])
+        return 0.5
+
+    def counting_jaccard(a, b):
+        compared.append(1)
+        return jaccard(a, b)
+
+    monkeypatch.setattr(ranking, 'jaccard', counting_jaccard)
+    engine = RankingEngine(scorers={'flat': (1.0, counting_scorer)})
+    top = engine.top(articles, context, limit=3)
+
+    assert len(top) == 3
+    assert len(scored) == 50
+    assert len(compared) <= 50 * 3
+
+
+def test_quality_stop_stops_once_enough_distinct_good_articles(context):
+    stop = RankingEngine().quality_stop(context, target=2, threshold=0.5)
+    assert isinstance(stop, QualityStop)
+    good = article('AI radiology triage', 'https://example.com/good', snippet='AI radiology')
+    weak = article('Hospital budget', 'https://example.com/weak')
+
+    stop.add(good)
+    # The same story again, under a tracking-tagged URL, still counts once
+    assert not stop([dict(good, link='https://www.example.com/good?utm_source=x'), weak])
+    assert stop([article('AI radiology model', 'https://example.com/second', snippet='AI radiology')])
+
+
+def test_quality_stop_scores_each_article_once(context):
+    calls = []
+    engine = RankingEngine(scorers={'flat': (1.0, lambda item, _context: calls.append(1) or 1.0)})
+    stop = engine.quality_stop(context, target=5, threshold=0.5)
+    item = article('AI radiology', 'https://example.com/a')
+    stop.add(item)
+    stop([item, item])
+    assert len(calls) == 1
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+import rate_limiter
+from rate_limiter import (PRIORITY_HIGH, PRIORITY_LOW, ProviderLimiter, RateLimitExceeded,
+                          rate_limited_call, retry_after_from)
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after=0.0):
+        super().__init__('429 Too Many Requests')
+        self.retry_after = retry_after
+
+
+class FakeResponse:
+    def __init__(self, headers, status_code=429):
+        self.headers = headers
+        self.status_code = status_code
+
+
+class HTTPError(Exception):
+    def __init__(self, response):
+        super().__init__(f'{response.status_code} error')
+        self.response = response
+
+
+def test_higher_priority_caller_gets_quota_first():
+    # 10 requests a second; penalizing drains the bucket, so each caller waits its turn
+    limiter = ProviderLimiter('test', requests_per_minute=600)
+    limiter.penalize(0.0)
+    order = []
+
+    def acquire(name, priority):
+        limiter.acquire(priority=priority)
+        order.append(name)
+
+    low = threading.Thread(target=acquire, args=('low', PRIORITY_LOW))
+    high = threading.Thread(target=acquire, args=('high', PRIORITY_HIGH))
+    low.start()
+    time.sleep(0.02)
+    high.start()
+    low.join(timeout=5)
+    high.join(timeout=5)
+    # The low-priority caller queued first but still waits behind the high-priority one
+    assert order == ['high', 'low']
+
+
+def test_penalize_blocks_for_retry_after():
+    limiter = ProviderLimiter('test')
+    limiter.penalize(0.2)
+    assert limiter.acquire() >= 0.19
+    assert limiter.acquire() < 0.05
+
+
+def test_penalize_without_retry_after_uses_the_default(monkeypatch):
+    monkeypatch.setattr(rate_limiter, 'DEFAULT_RETRY_AFTER', 0.1)
+    limiter = ProviderLimiter('test')
+    limiter.penalize()
+    assert limiter.acquire() >= 0.09
+
+
+def test_rate_limited_call_retries_429s():
+    calls = []
+
+    def request():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise RateLimitError()
+        return 'ok'
+
+    assert rate_limited_call('test', request, max_attempts=3) == 'ok'
+    assert len(calls) == 3
+
+
+def test_rate_limited_call_gives_up_after_max_attempts():
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise RateLimitError()
+
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        rate_limited_call('test', request, max_attempts=2)
+    assert len(calls) == 2
+    assert isinstance(excinfo.value.__cause__, RateLimitError)
+
+
+def test_rate_limited_call_does_not_retry_other_errors():
+    calls = []
+
+    def request():
+        calls.append(1)
+        raise HTTPError(FakeResponse({}, status_code=500))
+
+    with pytest.raises(HTTPError):
+        rate_limited_call('test', request, max_attempts=3)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize('error, expected', [
+    (RateLimitError(retry_after=3.0), 3.0),
+    (HTTPError(FakeResponse({'Retry-After': '2.5'})), 2.5),
+    (HTTPError(FakeResponse({'retry-after': '-1'})), 0.0),
+    (HTTPError(FakeResponse({'Retry-After': 'Wed, 21 Oct 2026 07:28:00 GMT'})), None),
+    (HTTPError(FakeResponse({})), None),
+    (ValueError('no response'), None),
+])
+def test_retry_after_from(error, expected):
+    assert retry_after_from(error) == expected
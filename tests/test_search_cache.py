@@ -0,0 +1,119 @@
+import pytest
+
+from agents import search_cache
+from agents.search_cache import SearchCache
+
+ARTICLES = [{'title': 'AI radiology', 'link': 'https://example.com/a', 'snippet': 'Summary'}]
+HOUR = 3600
+
+
+class FakeClock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(search_cache, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / 'cache' / 'search_cache.sqlite3')
+
+
+def test_hit_and_miss_are_counted(cache_path, clock):
+    cache = SearchCache(cache_path)
+    assert cache.get('AI radiology', 'example.com') is None
+    cache.put('AI radiology', 'example.com', ARTICLES)
+    # Query and source are compared case- and whitespace-insensitively
+    assert cache.get(' ai Radiology ', 'Example.com') == ARTICLES
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'entries': 1}
+
+
+def test_entries_expire_after_ttl(cache_path, clock):
+    cache = SearchCache(cache_path, ttl_hours=2, freshness_hours=24)
+    clock.now = (clock.now // (24 * HOUR)) * 24 * HOUR
+    cache.put('AI radiology', 'example.com', ARTICLES)
+
+    clock.now += 2 * HOUR - 1
+    assert cache.get('AI radiology', 'example.com') == ARTICLES
+    clock.now += 2
+    assert cache.get('AI radiology', 'example.com') is None
+
+
+def test_a_new_freshness_window_misses(cache_path, clock):
+    cache = SearchCache(cache_path, ttl_hours=48, freshness_hours=1)
+    clock.now = (clock.now // HOUR) * HOUR + HOUR - 1
+    cache.put('AI radiology', 'example.com', ARTICLES)
+    clock.now += 2
+    assert cache.get('AI radiology', 'example.com') is None
+
+
+def test_least_recently_used_entry_is_evicted(cache_path, clock):
+    cache = SearchCache(cache_path, max_entries=2)
+    cache.put('first', 'example.com', ARTICLES)
+    clock.now += 1
+    cache.put('second', 'example.com', ARTICLES)
+    clock.now += 1
+    assert cache.get('first', 'example.com') == ARTICLES
+    clock.now += 1
+    cache.put('third', 'example.com', ARTICLES)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.get('second', 'example.com') is None
+    assert cache.get('first', 'example.com') == ARTICLES
+    assert cache.get('third', 'example.com') == ARTICLES
+
+
+def test_results_are_keyed_on_the_prompt(cache_path, clock):
+    cache = SearchCache(cache_path)
+    cache.put('AI radiology', 'example.com', ARTICLES, prompt='full-fingerprint')
+    assert cache.get('AI radiology', 'example.com', prompt='compact-fingerprint') is None
+    assert cache.get('AI radiology', 'example.com') is None
+    assert cache.get('AI radiology', 'example.com', prompt='full-fingerprint') == ARTICLES
+
+
+def test_cache_survives_a_restart(cache_path, clock):
+    SearchCache(cache_path).put('AI radiology', 'example.com', ARTICLES)
+    assert SearchCache(cache_path).get('AI radiology', 'example.com') == ARTICLES
+
+
+def test_purge_removes_every_entry(cache_path, clock):
+    cache = SearchCache(cache_path)
+    cache.put('first', 'example.com', ARTICLES)
+    cache.put('second', 'example.com', ARTICLES)
+    assert cache.purge() == 2
+    assert cache.stats()['entries'] == 0
+
+
+def test_news_reader_reuses_results_only_for_the_same_prompt(cache_path, monkeypatch):
+    pytest.importorskip('dotenv')
+    from agents.news_reader import NewsReaderAgent
+    from agents.prompts import PromptBuilder
+    from benchmarks.fakes import FakeSearchCrew
+    from instrumentation import reset_metrics
+
+    monkeypatch.delenv('NEWS_STREAMING', raising=False)
+    reset_metrics()
+    kickoffs = []
+
+    class CountingCrew(FakeSearchCrew):
+        def kickoff(self, inputs=None):
+            kickoffs.append(inputs['query'])
+            return super().kickoff(inputs)
+
+    cache = SearchCache(cache_path)
+    full = NewsReaderAgent(cache=cache, crew_factory=CountingCrew, prompts=PromptBuilder(mode='full'))
+    first = full.search_news('AI radiology', 'example.com')
+    assert first and full.search_news('AI radiology', 'example.com') == first
+    assert len(kickoffs) == 1
+
+    compact = NewsReaderAgent(cache=cache, crew_factory=CountingCrew, prompts=PromptBuilder(mode='compact'))
+    compact.search_news('AI radiology', 'example.com')
+    assert len(kickoffs) == 2
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('dotenv')
+
+from agents.news_reader import NewsReaderAgent  # noqa: E402
+from agents.search_runner import SearchScheduler, raise_if_abandoned  # noqa: E402
+from benchmarks.fakes import FakeSearchCrew  # noqa: E402
+from instrumentation import reset_metrics  # noqa: E402
+from rate_limiter import rate_limited_call  # noqa: E402
+
+
+class RecordingCrew(FakeSearchCrew):
+    """FakeSearchCrew noting when each kickoff starts and finishes; `latencies` maps a query to its latency"""
+
+    def __init__(self, log, latencies=None):
+        super().__init__()
+        self.log = log
+        self.latencies = latencies or {}
+
+    def kickoff(self, inputs=None):
+        self.log.append(('start', inputs['query'], time.monotonic()))
+        self.latency = self.latencies.get(inputs['query'], 0.0)
+        try:
+            return super().kickoff(inputs)
+        finally:
+            self.log.append(('end', inputs['query'], time.monotonic()))
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    monkeypatch.delenv('NEWS_STREAMING', raising=False)
+    return reset_metrics()
+
+
+def make_reader(log, latencies=None):
+    return NewsReaderAgent(crew_factory=lambda: RecordingCrew(log, latencies))
+
+
+def test_single_worker_without_limits_runs_on_the_calling_thread(metrics):
+    threads = []
+    news_reader = make_reader([])
+    search = news_reader.search_news
+
+    def search_news(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return search(*args, **kwargs)
+
+    news_reader.search_news = search_news
+    SearchScheduler(news_reader).run(['AI radiology', 'AI imaging'], ['example.com'])
+    assert threads == [threading.current_thread()] * 2
+
+
+def test_timed_out_search_is_abandoned_and_keeps_its_slot(metrics):
+    log = []
+    news_reader = make_reader(log, {'slow': 0.45})
+    scheduler = SearchScheduler(news_reader, search_timeout=0.3)
+    with metrics.for_category('radiology'):
+        articles = scheduler.run(['slow', 'fast'], ['example.com'])
+
+    assert scheduler.searches_timed_out == 1
+    assert {article['query'] for article in articles} == {'fast'}
+    # The replacement only started once the abandoned search's thread finished
+    slow_end = next(at for event, query, at in log if (event, query) == ('end', 'slow'))
+    fast_start = next(at for event, query, at in log if (event, query) == ('start', 'fast'))
+    assert fast_start >= slow_end
+
+    # Only the completed search's tokens are recorded; the abandoned one keeps its reservation
+    time.sleep(0.05)
+    tokens = metrics.report()['tokens']['by_category']
+    assert tokens['radiology']['requests'] == 1
+    slow_estimate = news_reader.prompts.estimate_search_tokens('slow', 'example.com')
+    assert news_reader.token_budget.used == slow_estimate + tokens['radiology']['total']
+
+
+class RateLimitError(Exception):
+    retry_after = 0.0
+
+
+class ThrottledCrew(RecordingCrew):
+    """
+    Sends its LLM requests through the OpenAI limiter as RateLimitedLLM does.
+    The first request is slow and gets a 429; a retry would succeed.
+    """
+
+    def kickoff(self, inputs=None):
+        def request():
+            raise_if_abandoned()
+            if not self.log:
+                time.sleep(0.3)
+                self.log.append(('throttled', inputs['query'], time.monotonic()))
+                raise RateLimitError('429 Too Many Requests')
+            self.log.append(('request', inputs['query'], time.monotonic()))
+
+        rate_limited_call('openai', request)
+        return super().kickoff(inputs)
+
+
+def test_abandoned_search_is_not_retried(metrics):
+    log = []
+    news_reader = NewsReaderAgent(crew_factory=lambda: ThrottledCrew(log))
+    scheduler = SearchScheduler(news_reader, search_timeout=0.1)
+    assert scheduler.run(['AI radiology'], ['example.com']) == []
+    time.sleep(0.4)
+    # The 429 would normally be retried, but the search was abandoned meanwhile
+    assert [event for event, _, _ in log] == ['throttled']
@@ -0,0 +1,98 @@
+import pytest
+
+from agents import seen_ledger
+from agents.seen_ledger import SeenLedger, title_hash
+
+DAY = 86400
+
+
+class FakeClock:
+    def __init__(self, now=1_800_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(seen_ledger, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def ledger_path(tmp_path):
+    return str(tmp_path / 'ledger' / 'seen_articles.sqlite3')
+
+
+def article(title, link):
+    return {'title': title, 'link': link, 'snippet': 'Summary'}
+
+
+def test_title_hash_ignores_case_and_punctuation():
+    assert title_hash('AI Detects Nodules!') == title_hash('ai detects  nodules')
+    assert title_hash('AI detects nodules') != title_hash('AI detects tumors')
+
+
+def test_only_sent_articles_are_filtered(ledger_path, clock):
+    ledger = SeenLedger(ledger_path)
+    returned = article('AI triage in the ER', 'https://example.com/triage')
+    sent = article('AI detects nodules', 'https://example.com/nodules')
+    ledger.record_returned([returned, sent])
+    ledger.record_sent([sent])
+
+    new_articles, skipped = ledger.filter_unseen([returned, sent])
+    assert new_articles == [returned]
+    assert skipped == 1
+    assert ledger.stats() == {'entries': 2, 'sent': 1, 'skipped_this_run': 1}
+
+
+def test_sent_articles_match_by_canonical_url_or_title(ledger_path, clock):
+    ledger = SeenLedger(ledger_path)
+    ledger.record_sent([article('AI detects nodules', 'https://example.com/nodules')])
+
+    same_url = article('A different headline', 'https://www.example.com/nodules/?utm_source=feed')
+    same_title = article('AI Detects Nodules', 'https://other.org/syndicated')
+    new = article('AI triage in the ER', 'https://example.com/triage')
+    assert ledger.filter_unseen([same_url, same_title, new]) == ([new], 2)
+
+
+def test_returning_an_article_again_keeps_it_sent(ledger_path, clock):
+    ledger = SeenLedger(ledger_path)
+    item = article('AI detects nodules', 'https://example.com/nodules')
+    ledger.record_sent([item])
+    ledger.record_returned([item])
+    assert ledger.filter_unseen([item]) == ([], 1)
+
+
+def test_filter_unseen_handles_more_articles_than_one_query_batch(ledger_path, clock):
+    ledger = SeenLedger(ledger_path)
+    articles = [article(f'Story {i}', f'https://example.com/{i}') for i in range(1200)]
+    ledger.record_sent(articles[::2])
+    new_articles, skipped = ledger.filter_unseen(articles)
+    assert skipped == 600
+    assert new_articles == articles[1::2]
+
+
+def test_compact_removes_rows_not_seen_within_retention(ledger_path, clock):
+    ledger = SeenLedger(ledger_path, retention_days=30)
+    old = article('AI detects nodules', 'https://example.com/nodules')
+    recent = article('AI triage in the ER', 'https://example.com/triage')
+    ledger.record_sent([old, recent])
+
+    clock.now += 20 * DAY
+    # Seeing an article again moves its retention window
+    ledger.record_returned([recent])
+    clock.now += 15 * DAY
+    assert ledger.compact() == 1
+    assert ledger.filter_unseen([old, recent]) == ([old], 1)
+    assert ledger.compact() == 0
+
+
+def test_ledger_survives_a_restart(ledger_path, clock):
+    item = article('AI detects nodules', 'https://example.com/nodules')
+    first = SeenLedger(ledger_path)
+    first.record_sent([item])
+    first.close()
+    assert SeenLedger(ledger_path).filter_unseen([item]) == ([], 1)
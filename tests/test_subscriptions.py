@@ -0,0 +1,110 @@
+import json
+
+import pytest
+
+from Gateway.digest_renderer import DigestRenderer
+from Gateway.subscriptions import DigestAssembler, group_recipients, load_subscriptions
+
+CATEGORIES = ['radiology', 'surgery', 'medicine']
+
+
+def write_json(tmp_path, data):
+    path = tmp_path / 'subscriptions.json'
+    path.write_text(json.dumps(data), encoding='utf-8')
+    return str(path)
+
+
+def article(category, index=0):
+    return {'title': f'{category} story {index}', 'link': f'https://example.com/{category}/{index}',
+            'snippet': f'Summary of {category} story {index}'}
+
+
+class CountingRenderer(DigestRenderer):
+    def __init__(self):
+        super().__init__()
+        self.renders = 0
+
+    def render_sections(self, title, sections):
+        self.renders += 1
+        return super().render_sections(title, sections)
+
+
+def test_load_subscriptions_accepts_both_formats(tmp_path):
+    as_dict = write_json(tmp_path, {'A@Example.com': ['radiology'], 'b@example.com': 'all'})
+    assert load_subscriptions(as_dict, CATEGORIES) == {
+        'a@example.com': frozenset({'radiology'}),
+        'b@example.com': frozenset(CATEGORIES),
+    }
+
+    as_list = write_json(tmp_path, [
+        {'email': 'a@example.com', 'categories': ['radiology']},
+        {'email': 'a@example.com', 'categories': ['surgery']},
+    ])
+    # A recipient listed twice gets the union of their choices
+    assert load_subscriptions(as_list, CATEGORIES) == {'a@example.com': frozenset({'radiology', 'surgery'})}
+
+
+@pytest.mark.parametrize('data', [
+    {'a@example.com': ['oncology']},
+    [{'email': '', 'categories': ['radiology']}],
+])
+def test_load_subscriptions_rejects_invalid_entries(tmp_path, data):
+    with pytest.raises(ValueError):
+        load_subscriptions(write_json(tmp_path, data), CATEGORIES)
+
+
+def test_group_recipients_by_combination_in_category_order():
+    subscriptions = {
+        'c@example.com': frozenset({'surgery', 'radiology'}),
+        'a@example.com': frozenset({'radiology', 'surgery'}),
+        'b@example.com': frozenset({'medicine'}),
+        'd@example.com': frozenset(),
+    }
+    assert group_recipients(subscriptions, CATEGORIES) == {
+        ('radiology', 'surgery'): ['a@example.com', 'c@example.com'],
+        ('medicine',): ['b@example.com'],
+    }
+    # Restricted to one category, recipients without it are left out
+    assert group_recipients(subscriptions, CATEGORIES, only=['surgery']) == {
+        ('surgery',): ['a@example.com', 'c@example.com'],
+    }
+
+
+def test_each_combination_is_rendered_once():
+    renderer = CountingRenderer()
+    assembler = DigestAssembler({'radiology': [article('radiology')], 'surgery': [article('surgery')]},
+                                renderer=renderer)
+    groups = {
+        ('radiology',): [f'r{i}@example.com' for i in range(5)],
+        ('radiology', 'surgery'): [f'rs{i}@example.com' for i in range(5)],
+    }
+    messages = [message for chunk in assembler.iter_message_chunks(groups, lambda *args: args)
+                for message in chunk]
+
+    assert len(messages) == 10
+    assert renderer.renders == 2 and assembler.rendered_count == 2
+    single = messages[0]
+    combined = messages[-1]
+    assert single[2] == ['r0@example.com']
+    assert 'Latest AI in Radiology Updates' in single[0] and 'surgery story' not in single[0]
+    assert '<h2>Latest AI in Surgery Updates</h2>' in combined[0]
+    # Recipients of the same combination share the rendered digest
+    assert messages[1][0] is single[0]
+
+
+def test_combination_without_news_is_skipped():
+    assembler = DigestAssembler({'radiology': [article('radiology')], 'surgery': []})
+    groups = {('surgery',): ['s@example.com'], ('radiology', 'surgery'): ['rs@example.com']}
+    chunks = list(assembler.iter_message_chunks(groups, lambda html, text, recipients: recipients))
+    assert chunks == [[['rs@example.com']]]
+    assert assembler.render(('surgery',)) is None
+    # A combination reduced to one category with news renders as that category's digest
+    assert assembler.render(('radiology', 'surgery')).title == 'Latest AI in Radiology Updates'
+
+
+def test_messages_are_yielded_in_chunks():
+    assembler = DigestAssembler({'radiology': [article('radiology')]})
+    groups = {('radiology',): [f'r{i}@example.com' for i in range(7)]}
+    chunks = list(assembler.iter_message_chunks(groups, lambda html, text, recipients: recipients,
+                                                chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]